@@ -13,6 +13,9 @@ from ocpp.v16.enums import AuthorizationStatus
 
 from .api import CentralSystem
 from .const import (
+    CONF_AUTH_CACHE_SIZE,
+    CONF_AUTH_CACHE_TTL,
+    CONF_AUTH_FILE,
     CONF_AUTH_LIST,
     CONF_AUTH_STATUS,
     CONF_CPIDS,
@@ -39,6 +42,8 @@ from .const import (
     CONF_WEBSOCKET_PING_INTERVAL,
     CONF_WEBSOCKET_PING_TIMEOUT,
     CONFIG,
+    DEFAULT_AUTH_CACHE_SIZE,
+    DEFAULT_AUTH_CACHE_TTL,
     DEFAULT_CPID,
     DEFAULT_IDLE_INTERVAL,
     DEFAULT_MAX_CURRENT,
@@ -81,6 +86,13 @@ CONFIG_SCHEMA = vol.Schema(
         vol.Optional(CONF_AUTH_LIST, default={}): vol.Schema(
             {cv.string: AUTH_LIST_SCHEMA}
         ),
+        vol.Optional(CONF_AUTH_FILE): cv.string,
+        vol.Optional(
+            CONF_AUTH_CACHE_SIZE, default=DEFAULT_AUTH_CACHE_SIZE
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_AUTH_CACHE_TTL, default=DEFAULT_AUTH_CACHE_TTL
+        ): cv.positive_int,
     },
     extra=vol.ALLOW_EXTRA,
 )
@@ -240,8 +252,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if entry.entry_id in hass.data[DOMAIN]:
             # Close server
             central_sys = hass.data[DOMAIN][entry.entry_id]
-            central_sys._server.close()
-            await central_sys._server.wait_closed()
+            await central_sys.async_stop()
             # Unload services
             # print(hass.services.async_services_for_domain(DOMAIN))
             for service in hass.services.async_services_for_domain(DOMAIN):
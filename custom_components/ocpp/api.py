@@ -2,37 +2,65 @@
 
 from __future__ import annotations
 
+import asyncio
 import contextlib
+from datetime import datetime, UTC
+import importlib
 import json
 import logging
+import os
 import re
 import ssl
+import sys
 
 from functools import partial
-from homeassistant.config_entries import ConfigEntry, SOURCE_INTEGRATION_DISCOVERY
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import STATE_OK, STATE_UNAVAILABLE
 from homeassistant.core import HomeAssistant, ServiceResponse, SupportsResponse
 from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
 import voluptuous as vol
 from websockets import Subprotocol, NegotiationError
 import websockets.server
 from websockets.asyncio.server import ServerConnection
-
-from .ocppv16 import ChargePoint as ChargePointv16
-from .ocppv201 import ChargePoint as ChargePointv201
+from websockets.extensions.permessage_deflate import enable_server_permessage_deflate
+from websockets.http11 import Request
 
 from .const import (
     CentralSystemSettings,
+    COMPRESSION_OFF,
+    COMPRESSION_ON,
+    CONF_CPID,
+    CONF_CPIDS,
+    CONF_NUM_CONNECTORS,
+    CONF_WEBSOCKET_COMPRESSION_OVERRIDE,
+    DEFAULT_NUM_CONNECTORS,
     DOMAIN,
+    ENTITY_BATCH_SIZE,
+    FLEET_MAX_PARALLEL,
+    TLS_RELOAD_INTERVAL,
+    ROLLOUT_MAX_FAILURES,
+    ROLLOUT_UPDATE_TIMEOUT,
+    ROLLOUT_WINDOW,
     OCPP_2_0,
+    STORAGE_VERSION,
     ChargerSystemSettings,
 )
 from .enums import (
+    HAChargerDetails as cdet,
     HAChargerServices as csvcs,
     HAChargerStatuses as cstat,
 )
-from .chargepoint import SetVariableResult
+from .authorization import Authorization
+from .chargepoint import SetVariableResult, TimeSeries
+from .balancer import SiteLoadBalancer
+from .degradation import DegradationController, DegradationLevel
+from .digest import NotificationDigest
+from .host import HomeAssistantHost, OcppHost
+from .ledger import GROUP_BY, MAX_PAGE_SIZE, SessionLedger
+from .localauth import LocalListStore
+from .rollout import FirmwareRollout
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 logging.getLogger(DOMAIN).setLevel(logging.INFO)
@@ -40,35 +68,45 @@ logging.getLogger(DOMAIN).setLevel(logging.INFO)
 # logging.getLogger("asyncio").setLevel(logging.DEBUG)
 # logging.getLogger("websockets").setLevel(logging.DEBUG)
 
+# Selects the chargers of a service: one devid, a list of devids or "all",
+# narrowed down by vendor, model and firmware version
+ALL_CHARGERS = "all"
+FLEET_SERVICE_FIELDS = {
+    vol.Optional("devid"): vol.Any(cv.string, [cv.string]),
+    vol.Optional("vendor"): cv.string,
+    vol.Optional("model"): cv.string,
+    vol.Optional("firmware"): cv.string,
+}
+
 UFW_SERVICE_DATA_SCHEMA = vol.Schema(
     {
-        vol.Optional("devid"): cv.string,
+        **FLEET_SERVICE_FIELDS,
         vol.Required("firmware_url"): cv.string,
         vol.Optional("delay_hours"): cv.positive_int,
     }
 )
 CONF_SERVICE_DATA_SCHEMA = vol.Schema(
     {
-        vol.Optional("devid"): cv.string,
+        **FLEET_SERVICE_FIELDS,
         vol.Required("ocpp_key"): cv.string,
         vol.Required("value"): cv.string,
     }
 )
 GCONF_SERVICE_DATA_SCHEMA = vol.Schema(
     {
-        vol.Optional("devid"): cv.string,
+        **FLEET_SERVICE_FIELDS,
         vol.Required("ocpp_key"): cv.string,
     }
 )
 GDIAG_SERVICE_DATA_SCHEMA = vol.Schema(
     {
-        vol.Optional("devid"): cv.string,
+        **FLEET_SERVICE_FIELDS,
         vol.Required("upload_url"): cv.string,
     }
 )
 TRANS_SERVICE_DATA_SCHEMA = vol.Schema(
     {
-        vol.Optional("devid"): cv.string,
+        **FLEET_SERVICE_FIELDS,
         vol.Required("vendor_id"): cv.string,
         vol.Optional("message_id"): cv.string,
         vol.Optional("data"): cv.string,
@@ -76,110 +114,232 @@ TRANS_SERVICE_DATA_SCHEMA = vol.Schema(
 )
 CHRGR_SERVICE_DATA_SCHEMA = vol.Schema(
     {
-        vol.Optional("devid"): cv.string,
+        **FLEET_SERVICE_FIELDS,
         vol.Optional("limit_amps"): cv.positive_float,
         vol.Optional("limit_watts"): cv.positive_int,
         vol.Optional("conn_id"): cv.positive_int,
         vol.Optional("custom_profile"): vol.Any(cv.string, dict),
     }
 )
-CUSTMSG_SERVICE_DATA_SCHEMA = vol.Schema(
+HIST_SERVICE_DATA_SCHEMA = vol.Schema(
     {
         vol.Optional("devid"): cv.string,
+        vol.Required("measurand"): cv.string,
+        vol.Optional("conn_id", default=0): cv.positive_int,
+        vol.Optional("window"): cv.positive_int,
+    }
+)
+SESS_SERVICE_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Optional("devid"): cv.string,
+        vol.Optional("conn_id"): cv.positive_int,
+        vol.Optional("id_tag"): cv.string,
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("group_by"): vol.In(list(GROUP_BY)),
+        vol.Optional("limit", default=100): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_PAGE_SIZE)
+        ),
+        vol.Optional("offset", default=0): cv.positive_int,
+    }
+)
+CUSTMSG_SERVICE_DATA_SCHEMA = vol.Schema(
+    {
+        **FLEET_SERVICE_FIELDS,
         vol.Required("requested_message"): cv.string,
     }
 )
+CLEAR_SERVICE_DATA_SCHEMA = vol.Schema(FLEET_SERVICE_FIELDS)
+RESET_SERVICE_DATA_SCHEMA = vol.Schema(
+    {
+        **FLEET_SERVICE_FIELDS,
+        vol.Optional("type", default="Hard"): vol.In(["Hard", "Soft"]),
+    }
+)
+ROLLOUT_SERVICE_DATA_SCHEMA = vol.Schema(
+    {
+        **FLEET_SERVICE_FIELDS,
+        vol.Optional("action", default="start"): vol.In(
+            ["start", "pause", "resume", "cancel", "status"]
+        ),
+        vol.Optional("firmware_url"): cv.url,
+        vol.Optional("delay_hours", default=0): cv.positive_int,
+        vol.Optional("window", default=ROLLOUT_WINDOW): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional("max_failures", default=ROLLOUT_MAX_FAILURES): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional("update_timeout", default=ROLLOUT_UPDATE_TIMEOUT): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+
+
+def _charge_point_module(subprotocol: str | None) -> str:
+    """Return the name of the module implementing an OCPP subprotocol."""
+    if subprotocol and subprotocol.startswith(OCPP_2_0):
+        return f"{__package__}.ocppv201"
+    return f"{__package__}.ocppv16"
 
 
 def _norm(s: str) -> str:
     return re.sub(r"[^a-z0-9]", "", str(s).lower())
 
 
+async def async_add_in_batches(async_add_entities, entities: list):
+    """Add entities ENTITY_BATCH_SIZE at a time, letting other tasks run between."""
+    for i in range(0, len(entities), ENTITY_BATCH_SIZE):
+        async_add_entities(entities[i : i + ENTITY_BATCH_SIZE], False)
+        await asyncio.sleep(0)
+
+
 class CentralSystem:
     """Server for handling OCPP connections."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
-        """Instantiate instance of a CentralSystem."""
-        self.hass = hass
+    def __init__(
+        self,
+        hass: HomeAssistant | None,
+        entry: ConfigEntry,
+        host: OcppHost | None = None,
+    ):
+        """Instantiate instance of a CentralSystem.
+
+        Without a host the central system runs inside Home Assistant, pass eg
+        a StandaloneHost (with hass None) to run it without Home Assistant.
+        """
+        self.host = host if host is not None else HomeAssistantHost(hass)
+        self.hass = self.host.hass
         self.entry = entry
         self.settings = CentralSystemSettings(**entry.data)
         self.subprotocols = self.settings.subprotocols
         self._server = None
+        self.ssl_context = None
+        # context of new handshakes and the state of the files it was loaded from
+        self._tls_context = None
+        self._tls_stamp = None
+        self._tls_watcher = None
         self.id = self.settings.csid
         self.charge_points = {}  # uses cp_id as reference to charger instance
         self.cpids = {}  # dict of {cpid:cp_id}
         self.connections = 0
+        ledger_path = self.host.storage_path(f"{DOMAIN}_sessions.db")
+        self.ledger = SessionLedger(ledger_path) if ledger_path else None
+        self.balancer = (
+            SiteLoadBalancer(self.host, self.settings.site_max_current)
+            if self.settings.site_max_current > 0
+            else None
+        )
+        self.rollout = FirmwareRollout(
+            self.host,
+            self.host.store(f"{DOMAIN}.firmware_rollout.{self.id}", STORAGE_VERSION),
+            lambda cpid: self.charge_points.get(self.cpids.get(cpid, cpid)),
+        )
+        self.local_lists = LocalListStore(
+            self.host.store(f"{DOMAIN}.local_lists.{self.id}", STORAGE_VERSION)
+        )
+        self.authorization = Authorization.from_config(self.host)
+        self.degradation = DegradationController(
+            self.host, self._pending_tasks, self._degradation_changed
+        )
+        self.digest = (
+            NotificationDigest(
+                self.host, self.settings.notification_window, self.degradation
+            )
+            if self.settings.notification_window > 0
+            else None
+        )
 
-        # Register custom services with home assistant
-        self.hass.services.async_register(
-            DOMAIN,
+        # Register custom services with the host
+        self.host.register_service(
             csvcs.service_configure.value,
             self.handle_configure,
             CONF_SERVICE_DATA_SCHEMA,
             supports_response=SupportsResponse.OPTIONAL,
         )
-        self.hass.services.async_register(
-            DOMAIN,
+        self.host.register_service(
             csvcs.service_get_configuration.value,
             self.handle_get_configuration,
             GCONF_SERVICE_DATA_SCHEMA,
             supports_response=SupportsResponse.ONLY,
         )
-        self.hass.services.async_register(
-            DOMAIN,
+        self.host.register_service(
             csvcs.service_data_transfer.value,
             self.handle_data_transfer,
             TRANS_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
         )
-        self.hass.services.async_register(
-            DOMAIN,
+        self.host.register_service(
             csvcs.service_trigger_custom_message.value,
             self.handle_trigger_custom_message,
             CUSTMSG_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
         )
-        self.hass.services.async_register(
-            DOMAIN,
+        self.host.register_service(
             csvcs.service_clear_profile.value,
             self.handle_clear_profile,
+            CLEAR_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+        self.host.register_service(
+            csvcs.service_reset.value,
+            self.handle_reset,
+            RESET_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
         )
-        self.hass.services.async_register(
-            DOMAIN,
+        self.host.register_service(
             csvcs.service_set_charge_rate.value,
             self.handle_set_charge_rate,
             CHRGR_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
         )
-        self.hass.services.async_register(
-            DOMAIN,
+        self.host.register_service(
             csvcs.service_update_firmware.value,
             self.handle_update_firmware,
             UFW_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
         )
-        self.hass.services.async_register(
-            DOMAIN,
+        self.host.register_service(
             csvcs.service_get_diagnostics.value,
             self.handle_get_diagnostics,
             GDIAG_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+        self.host.register_service(
+            csvcs.service_get_history.value,
+            self.handle_get_history,
+            HIST_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+        self.host.register_service(
+            csvcs.service_get_sessions.value,
+            self.handle_get_sessions,
+            SESS_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+        self.host.register_service(
+            csvcs.service_firmware_rollout.value,
+            self.handle_firmware_rollout,
+            ROLLOUT_SERVICE_DATA_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
         )
 
     @staticmethod
-    async def create(hass: HomeAssistant, entry: ConfigEntry):
+    async def create(
+        hass: HomeAssistant | None, entry: ConfigEntry, host: OcppHost | None = None
+    ):
         """Create instance and start listening for OCPP connections on given port."""
-        self = CentralSystem(hass, entry)
+        self = CentralSystem(hass, entry, host)
+        await self.rollout.async_load()
 
         if self.settings.ssl:
-            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
             # see https://community.home-assistant.io/t/certificate-authority-and-self-signed-certificate-for-ssl-tls/196970
-            localhost_certfile = self.settings.ssl_certfile_path
-            localhost_keyfile = self.settings.ssl_keyfile_path
-            await self.hass.async_add_executor_job(
-                partial(
-                    self.ssl_context.load_cert_chain,
-                    localhost_certfile,
-                    keyfile=localhost_keyfile,
-                )
+            self.ssl_context, self._tls_stamp = await self.host.async_add_executor_job(
+                self._load_tls
             )
-        else:
-            self.ssl_context = None
+            self._tls_context = self.ssl_context
+            self.ssl_context.sni_callback = self._select_tls_context
 
         server = await websockets.serve(
             self.on_connect,
@@ -191,10 +351,39 @@ class CentralSystem:
             ping_timeout=None,
             close_timeout=self.settings.websocket_close_timeout,
             ssl=self.ssl_context,
+            compression="deflate" if self.settings.websocket_compression else None,
+            max_size=self.settings.websocket_max_size or None,
+            max_queue=self.settings.websocket_max_queue or None,
+            process_request=self.process_request,
         )
         self._server = server
+        if self.ssl_context is not None:
+            self._tls_watcher = self.host.create_background_task(
+                self._async_watch_tls(), f"{DOMAIN} {self.id} TLS certificate watcher"
+            )
+        self.degradation.start()
+        # import the protocol modules off the event loop before chargers connect
+        missing = {_charge_point_module(sp) for sp in self.subprotocols}
+        missing.difference_update(sys.modules)
+        if missing:
+            self.host.create_task(self._async_import_protocols(sorted(missing)))
         return self
 
+    async def _async_import_protocols(self, names: list[str]):
+        """Import the ChargePoint modules of the offered subprotocols."""
+        for name in names:
+            with contextlib.suppress(Exception):
+                await self._async_charge_point_class(name)
+
+    async def _async_charge_point_class(self, name: str) -> type:
+        """Return the ChargePoint class of a module, importing it on first use."""
+        module = sys.modules.get(name)
+        if module is None:
+            module = await self.host.async_add_executor_job(
+                importlib.import_module, name
+            )
+        return module.ChargePoint
+
     @staticmethod
     def _norm_conn(connector_id: int | None) -> int:
         if connector_id is None:
@@ -225,6 +414,112 @@ class CentralSystem:
             "invalid subprotocol; expected one of " + ", ".join(self.subprotocols)
         )
 
+    def _tls_files_stamp(self) -> tuple:
+        """Return the modification time and size of the certificate files."""
+        stamp = []
+        for path in (self.settings.ssl_certfile_path, self.settings.ssl_keyfile_path):
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _load_tls(self) -> tuple[ssl.SSLContext, tuple]:
+        """Return a TLS context with the certificate and the files' stamp."""
+        stamp = self._tls_files_stamp()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(
+            self.settings.ssl_certfile_path, keyfile=self.settings.ssl_keyfile_path
+        )
+        return context, stamp
+
+    def _select_tls_context(self, ssl_object, server_name, context):
+        """Handshake with the latest certificate.
+
+        Called for every handshake on the listening context. Sessions and
+        tickets stay with the listening context, so chargers can resume
+        their sessions after the certificate is reloaded.
+        """
+        if self._tls_context is not context:
+            ssl_object.context = self._tls_context
+
+    async def async_reload_tls(self) -> bool:
+        """Load the certificate again if its files changed, True if reloaded.
+
+        Only new handshakes use it, open connections are kept.
+        """
+        try:
+            stamp = await self.host.async_add_executor_job(self._tls_files_stamp)
+            if stamp == self._tls_stamp:
+                return False
+            context, stamp = await self.host.async_add_executor_job(self._load_tls)
+        except (OSError, ssl.SSLError) as e:
+            # eg files renewed one at a time, retried when they change again
+            _LOGGER.warning(
+                "Failed to reload TLS certificate %s: %s",
+                self.settings.ssl_certfile_path,
+                e,
+            )
+            with contextlib.suppress(OSError):
+                self._tls_stamp = await self.host.async_add_executor_job(
+                    self._tls_files_stamp
+                )
+            return False
+        self._tls_context, self._tls_stamp = context, stamp
+        _LOGGER.info("Reloaded TLS certificate %s", self.settings.ssl_certfile_path)
+        return True
+
+    async def _async_watch_tls(self):
+        """Reload the certificate when its files change."""
+        while True:
+            await asyncio.sleep(TLS_RELOAD_INTERVAL)
+            await self.async_reload_tls()
+
+    async def async_stop(self):
+        """Stop listening for connections, open connections are closed."""
+        if self._tls_watcher is not None:
+            self._tls_watcher.cancel()
+        self.degradation.stop()
+        self.rollout.stop()
+        if self.digest is not None:
+            await self.digest.async_send()
+        self._server.close()
+        await self._server.wait_closed()
+        await self.host.async_flush_stores()
+
+    def _pending_tasks(self) -> int:
+        """Return the background tasks pending over all chargers."""
+        return sum(cp.pending_tasks for cp in self.charge_points.values())
+
+    def _degradation_changed(self, level: DegradationLevel):
+        """Show the new degradation level on the sensors of the chargers."""
+        for cp in self.charge_points.values():
+            if cp.status != STATE_UNAVAILABLE:
+                cp.create_task(cp.update(cp.settings.cpid))
+
+    @staticmethod
+    def _cp_id_from_path(path: str) -> str:
+        """Return the charger id, the last element of the websocket path."""
+        cp_id = path.strip("/")
+        return cp_id[cp_id.rfind("/") + 1 :]
+
+    def _charger_config(self, cp_id: str) -> dict | None:
+        """Return the configuration flow settings of a charger, if any."""
+        for cfg in self.settings.cpids:
+            if cfg.get(cp_id):
+                return list(cfg.values())[0]
+        return None
+
+    def process_request(self, connection: ServerConnection, request: Request):
+        """Apply the per charger compression override before the handshake."""
+        cfg = self._charger_config(self._cp_id_from_path(request.path)) or {}
+        override = cfg.get(CONF_WEBSOCKET_COMPRESSION_OVERRIDE)
+        if override == COMPRESSION_ON and not self.settings.websocket_compression:
+            connection.protocol.available_extensions = enable_server_permessage_deflate(
+                None
+            )
+        elif override == COMPRESSION_OFF and self.settings.websocket_compression:
+            connection.protocol.available_extensions = []
+        return None
+
     async def on_connect(self, websocket: ServerConnection):
         """Request handler executed for every new OCPP connection."""
         if websocket.subprotocol is not None:
@@ -235,8 +530,7 @@ class CentralSystem:
             )
 
         _LOGGER.info(f"Charger websocket path={websocket.request.path}")
-        cp_id = websocket.request.path.strip("/")
-        cp_id = cp_id[cp_id.rfind("/") + 1 :]
+        cp_id = self._cp_id_from_path(websocket.request.path)
         if cp_id not in self.charge_points:
             try:
                 config_flow = False
@@ -250,13 +544,7 @@ class CentralSystem:
                         _LOGGER.debug(f"Central settings: {self.settings}")
 
                 if not config_flow:
-                    # discovery_info for flow
-                    info = {"cp_id": cp_id, "entry": self.entry}
-                    await self.hass.config_entries.flow.async_init(
-                        DOMAIN,
-                        context={"source": SOURCE_INTEGRATION_DISCOVERY},
-                        data=info,
-                    )
+                    await self.host.async_discover_charger(self.entry, cp_id)
                     # use return to wait for config entry to reload after discovery
                     return
 
@@ -265,14 +553,19 @@ class CentralSystem:
                 _LOGGER.error(f"Failed to setup charger {cp_id}: {str(e)}")
                 return
 
-            if websocket.subprotocol and websocket.subprotocol.startswith(OCPP_2_0):
-                charge_point = ChargePointv201(
-                    cp_id, websocket, self.hass, self.entry, self.settings, cp_settings
-                )
-            else:
-                charge_point = ChargePointv16(
-                    cp_id, websocket, self.hass, self.entry, self.settings, cp_settings
-                )
+            charge_point_class = await self._async_charge_point_class(
+                _charge_point_module(websocket.subprotocol)
+            )
+            charge_point = charge_point_class(
+                cp_id, websocket, self.host, self.entry, self.settings, cp_settings
+            )
+            charge_point.ledger = self.ledger
+            charge_point.balancer = self.balancer
+            charge_point.rollout = self.rollout
+            charge_point.degradation = self.degradation
+            charge_point.digest = self.digest
+            charge_point.local_lists = self.local_lists
+            charge_point.authorization = self.authorization
             self.charge_points[cp_id] = charge_point
             self.connections += 1
             _LOGGER.info(
@@ -309,6 +602,20 @@ class CentralSystem:
             else (None, None, None, None)
         )
 
+    def configured_chargers(self) -> list[tuple[str, dict, int]]:
+        """Return the cpid, settings and number of connectors of each charger."""
+        chargers = []
+        connectors: dict[str, int] = {}
+        for charger in self.entry.data.get(CONF_CPIDS, []):
+            for cfg in charger.values():
+                connectors.setdefault(
+                    cfg.get(CONF_CPID),
+                    int(cfg.get(CONF_NUM_CONNECTORS, DEFAULT_NUM_CONNECTORS)),
+                )
+            settings = list(charger.values())[0]
+            chargers.append((settings[CONF_CPID], settings))
+        return [(cpid, settings, connectors[cpid]) for cpid, settings in chargers]
+
     def get_metric(self, id: str, measurand: str, connector_id: int | None = None):
         """Return last known value for given measurand."""
         cp_id, m, cp, n_connectors = self._get_metrics(id)
@@ -351,6 +658,16 @@ class CentralSystem:
 
         return None
 
+    def get_history(
+        self, id: str, measurand: str, connector_id: int | None = None
+    ) -> TimeSeries | None:
+        """Return recent values of given measurand, None if not kept."""
+        cp_id, m, cp, n_connectors = self._get_metrics(id)
+
+        if cp is None:
+            return None
+        return m.history(self._norm_conn(connector_id), measurand)
+
     def del_metric(self, id: str, measurand: str, connector_id: int | None = None):
         """Set given measurand to None."""
         cp_id, m, cp, n_connectors = self._get_metrics(id)
@@ -555,7 +872,13 @@ class CentralSystem:
         cp_id = self.cpids.get(id, id)
 
         if cp_id in self.charge_points:
-            return await self.charge_points[cp_id].set_charge_rate(
+            if self.balancer is not None:
+                # caps the share of the charger, applied by the balancer
+                # while it has a session
+                self.balancer.set_cap(cp_id, value)
+                if self.balancer.is_active(cp_id):
+                    return True
+            return await self.charge_points[cp_id].request_charge_rate(
                 limit_amps=value, conn_id=connector_id
             )
         return False
@@ -597,15 +920,95 @@ class CentralSystem:
             "identifiers": {(DOMAIN, self.id)},
         }
 
+    def select_chargers(self, data) -> list[str] | None:
+        """Return the devids a service call selects, None for a single charger.
+
+        A list of devids, "all" or a vendor, model or firmware filter select
+        chargers, filters match case and punctuation insensitive.
+        """
+        devid = data.get("devid")
+        filters = {
+            key: data[field]
+            for key, field in (
+                (cdet.vendor.value, "vendor"),
+                (cdet.model.value, "model"),
+                (cdet.firmware_version.value, "firmware"),
+            )
+            if data.get(field) is not None
+        }
+        single = devid is None or (isinstance(devid, str) and devid != ALL_CHARGERS)
+        if single and not filters:
+            return None
+        if devid is None or devid == ALL_CHARGERS:
+            devids = list(self.charge_points)
+        elif isinstance(devid, str):
+            devids = [devid]
+        else:
+            devids = devid
+        return [
+            d
+            for d in devids
+            if all(
+                _norm(self.get_metric(d, key) or "") == _norm(value)
+                for key, value in filters.items()
+            )
+        ]
+
+    async def fan_out(self, func, call, devids: list[str]) -> ServiceResponse:
+        """Run a service handler for each charger, FLEET_MAX_PARALLEL at a time.
+
+        Returns the result of each charger by its charger id.
+        """
+        semaphore = asyncio.Semaphore(FLEET_MAX_PARALLEL)
+
+        async def run(cp) -> dict:
+            if cp.status == STATE_UNAVAILABLE:
+                return {"success": False, "error": "unavailable"}
+            async with semaphore:
+                try:
+                    response = await func(self, call, cp)
+                except Exception as e:
+                    _LOGGER.warning("%s: %s failed: %s", cp.id, call.service, e)
+                    return {"success": False, "error": str(e) or type(e).__name__}
+            if response is None:
+                return {"success": True}
+            return {"success": True, "response": response}
+
+        results = {}
+        chargers = []
+        for devid in dict.fromkeys(devids):
+            cp = self.charge_points.get(self.cpids.get(devid, devid))
+            if cp is None:
+                results[devid] = {"success": False, "error": "unknown charger"}
+            else:
+                chargers.append(cp)
+        responses = await asyncio.gather(*(run(cp) for cp in chargers))
+        for cp, result in zip(chargers, responses):
+            results[cp.settings.cpid] = result
+        return {"results": results}
+
     def check_charger_available(func):
-        """Check charger is available before executing service with Decorator."""
+        """Check charger is available before executing service with Decorator.
+
+        Calls selecting several chargers run for each of them, see fan_out.
+        Handlers without a response of their own return {"success": True}, as
+        services supporting a response must return one when it is asked for.
+        """
 
         async def wrapper(self, call, *args, **kwargs):
+            devids = self.select_chargers(call.data)
+            if devids is not None:
+                return await self.fan_out(func, call, devids)
             try:
                 cp_id = self.cpids.get(call.data["devid"], call.data["devid"])
                 cp = self.charge_points[cp_id]
             except KeyError:
                 cp = list(self.charge_points.values())[0]
+                if len(self.charge_points) > 1:
+                    _LOGGER.warning(
+                        "No charger %s, using %s", call.data.get("devid", ""), cp.id
+                    )
+                cp_id = cp.id
             if cp.status == STATE_UNAVAILABLE:
                 _LOGGER.warning(f"{cp_id}: charger is currently unavailable")
                 raise HomeAssistantError(
@@ -613,7 +1016,8 @@ class CentralSystem:
                     translation_key="unavailable",
                     translation_placeholders={"message": cp_id},
                 )
-            return await func(self, call, cp, *args, **kwargs)
+            response = await func(self, call, cp, *args, **kwargs)
+            return {"success": True} if response is None else response
 
         return wrapper
 
@@ -629,6 +1033,13 @@ class CentralSystem:
         """Handle the clear profile service call."""
         await cp.clear_profile()
 
+    @check_charger_available
+    async def handle_reset(self, call, cp) -> ServiceResponse:
+        """Handle the reset service call."""
+        accepted = await cp.reset(call.data.get("type"))
+        # 2.0.1 chargers raise when the reset is rejected
+        return {"accepted": accepted is not False}
+
     @check_charger_available
     async def handle_update_firmware(self, call, cp):
         """Handle the firmware update service call."""
@@ -661,11 +1072,11 @@ class CentralSystem:
             if type(custom_profile) is str:
                 custom_profile = custom_profile.replace("'", '"')
                 custom_profile = json.loads(custom_profile)
-            await cp.set_charge_rate(profile=custom_profile, conn_id=id)
+            await cp.request_charge_rate(profile=custom_profile, conn_id=id)
         elif watts is not None:
-            await cp.set_charge_rate(limit_watts=watts, conn_id=id)
+            await cp.request_charge_rate(limit_watts=watts, conn_id=id)
         elif amps is not None:
-            await cp.set_charge_rate(limit_amps=amps, conn_id=id)
+            await cp.request_charge_rate(limit_amps=amps, conn_id=id)
 
     @check_charger_available
     async def handle_configure(self, call, cp) -> ServiceResponse:
@@ -681,3 +1092,91 @@ class CentralSystem:
         key = call.data.get("ocpp_key")
         value = await cp.get_configuration(key)
         return {"value": value}
+
+    async def handle_get_history(self, call) -> ServiceResponse:
+        """Handle the get history service call, also for offline chargers."""
+        devid = call.data.get("devid") or next(iter(self.charge_points), "")
+        measurand = call.data.get("measurand")
+        conn = call.data.get("conn_id", 0)
+        window = call.data.get("window")
+        series = self.get_history(devid, measurand, conn)
+        samples = series.samples(window) if series is not None else []
+        return {
+            "unit": self.get_unit(devid, measurand, conn),
+            "samples": [
+                {"time": datetime.fromtimestamp(t, UTC).isoformat(), "value": v}
+                for t, v in samples
+            ],
+            "mean": series.mean(window) if series is not None else None,
+            "rate": series.rate(window) if series is not None else None,
+        }
+
+    async def handle_firmware_rollout(self, call) -> ServiceResponse:
+        """Handle the firmware rollout service call, returns its progress."""
+        action = call.data.get("action", "start")
+        try:
+            if action == "start":
+                url = call.data.get("firmware_url")
+                if not url:
+                    raise ValueError("firmware_url is required")
+                devids = self.select_chargers(call.data)
+                if devids is None:
+                    devid = call.data.get("devid")
+                    devids = [devid] if devid else list(self.charge_points)
+                cpids = []
+                for devid in devids:
+                    cp = self.charge_points.get(self.cpids.get(devid, devid))
+                    cpids.append(cp.settings.cpid if cp is not None else devid)
+                await self.rollout.start(
+                    cpids,
+                    url,
+                    window=call.data.get("window", ROLLOUT_WINDOW),
+                    max_failures=call.data.get("max_failures", ROLLOUT_MAX_FAILURES),
+                    wait_time=call.data.get("delay_hours", 0),
+                    update_timeout=call.data.get(
+                        "update_timeout", ROLLOUT_UPDATE_TIMEOUT
+                    ),
+                )
+            elif action != "status":
+                await getattr(self.rollout, action)()
+        except ValueError as e:
+            raise HomeAssistantError(
+                translation_domain=DOMAIN,
+                translation_key="firmware_rollout_error",
+                translation_placeholders={"message": str(e)},
+            ) from e
+        return self.rollout.status
+
+    async def handle_get_sessions(self, call) -> ServiceResponse:
+        """Handle the get sessions service call, a page of sessions or totals."""
+        if self.ledger is None:
+            return {"sessions": []}
+        devid = call.data.get("devid")
+        if devid is not None:
+            cp = self.charge_points.get(self.cpids.get(devid, devid))
+            # chargers no longer configured can still be queried by cpid
+            devid = cp.settings.cpid if cp is not None else devid
+        filters = {
+            "cpid": devid,
+            "connector_id": call.data.get("conn_id"),
+            "id_tag": call.data.get("id_tag"),
+            "start": dt_util.as_utc(call.data["start"])
+            if "start" in call.data
+            else None,
+            "end": dt_util.as_utc(call.data["end"]) if "end" in call.data else None,
+        }
+        group_by = call.data.get("group_by")
+        if group_by is not None:
+            totals = await self.host.async_add_executor_job(
+                partial(self.ledger.aggregate, group_by, **filters)
+            )
+            return {"totals": totals}
+        sessions = await self.host.async_add_executor_job(
+            partial(
+                self.ledger.query,
+                limit=call.data.get("limit", 100),
+                offset=call.data.get("offset", 0),
+                **filters,
+            )
+        )
+        return {"sessions": sessions}
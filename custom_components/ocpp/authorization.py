@@ -0,0 +1,261 @@
+"""Authorization of id_tags by the configured list and external stores."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from collections import OrderedDict
+import contextlib
+import csv
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+
+from .const import (
+    AUTH_CACHE_NEGATIVE_TTL,
+    AUTH_FILE_TABLE,
+    AUTH_LOOKUP_TIMEOUT,
+    CONF_AUTH_CACHE_SIZE,
+    CONF_AUTH_CACHE_TTL,
+    CONF_AUTH_FILE,
+    CONF_AUTH_LIST,
+    CONF_AUTH_STATUS,
+    CONF_ID_TAG,
+    DEFAULT_AUTH_CACHE_SIZE,
+    DEFAULT_AUTH_CACHE_TTL,
+)
+from .host import OcppHost
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# returned by the cache for an id_tag it has no status of
+_MISS = object()
+
+
+class AuthorizationProvider(ABC):
+    """A store of id_tags and their authorization status.
+
+    Subclasses implement async_get_status. A provider answering from memory
+    sets cached to False, its answers are not cached.
+    """
+
+    cached = True
+
+    @abstractmethod
+    async def async_get_status(self, id_tag: str, default_status: str) -> str | None:
+        """Return the status of an id_tag, None if the id_tag is unknown.
+
+        An id_tag known without a status gets default_status.
+        """
+
+
+class ConfigListProvider(AuthorizationProvider):
+    """The authorization_list of the YAML configuration."""
+
+    cached = False
+
+    def __init__(self, host: OcppHost):
+        """Initialize, the list is read from the configuration on each lookup."""
+        self.host = host
+
+    def entries(self, default_status: str) -> dict[str, str]:
+        """Return the status of each id_tag, the first entry of an id_tag is used."""
+        entries: dict[str, str] = {}
+        for auth_entry in self.host.get_config().get(CONF_AUTH_LIST, {}):
+            id_tag = auth_entry.get(CONF_ID_TAG, None)
+            if id_tag is not None:
+                entries.setdefault(
+                    id_tag, auth_entry.get(CONF_AUTH_STATUS, default_status)
+                )
+        return entries
+
+    async def async_get_status(self, id_tag: str, default_status: str) -> str | None:
+        """Return the status of the first entry of the id_tag."""
+        for auth_entry in self.host.get_config().get(CONF_AUTH_LIST, {}):
+            if auth_entry.get(CONF_ID_TAG, None) == id_tag:
+                status = auth_entry.get(CONF_AUTH_STATUS, default_status)
+                _LOGGER.debug(
+                    f"id_tag='{id_tag}' found in auth_list, authorization_status='{status}'"
+                )
+                return status
+        return None
+
+
+class FileProvider(AuthorizationProvider):
+    """A local file of id_tags, read in the executor.
+
+    A .csv file has an id_tag and an optional authorization_status column. It
+    is indexed in memory and read again when it changes. Other files are
+    SQLite databases with an id_tags table of the same columns, id_tag
+    should be its primary key so a lookup uses the index.
+    """
+
+    def __init__(self, host: OcppHost, path: str):
+        """Initialize, the file is read on first use."""
+        self.host = host
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        # status by id_tag, "" without a status, and the mtime it was read at
+        self._index: dict[str, str] = {}
+        self._mtime: int | None = None
+
+    def _lookup_csv(self, id_tag: str) -> str | None:
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            index: dict[str, str] = {}
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    if row.get(CONF_ID_TAG):
+                        index.setdefault(
+                            row[CONF_ID_TAG], row.get(CONF_AUTH_STATUS) or ""
+                        )
+            self._index = index
+            self._mtime = mtime
+        return self._index.get(id_tag)
+
+    def _lookup_sqlite(self, id_tag: str) -> str | None:
+        uri = f"{pathlib.Path(self.path).resolve().as_uri()}?mode=ro"
+        with contextlib.closing(sqlite3.connect(uri, uri=True, timeout=10)) as db:
+            row = db.execute(
+                f"SELECT {CONF_AUTH_STATUS} FROM {AUTH_FILE_TABLE} "
+                f"WHERE {CONF_ID_TAG} = ?",
+                (id_tag,),
+            ).fetchone()
+        return None if row is None else row[0] or ""
+
+    async def async_get_status(self, id_tag: str, default_status: str) -> str | None:
+        """Look the id_tag up in the file."""
+        lookup = self._lookup_csv if self.is_csv else self._lookup_sqlite
+        status = await self.host.async_add_executor_job(lookup, id_tag)
+        if status is None:
+            return None
+        return status or default_status
+
+
+class AuthorizationCache:
+    """The least recently used statuses, of unknown id_tags too.
+
+    A status is kept for ttl seconds, an unknown id_tag for negative_ttl
+    seconds so a tag added to the store is accepted soon. At most maxsize
+    id_tags are kept, a maxsize of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_AUTH_CACHE_SIZE,
+        ttl: float = DEFAULT_AUTH_CACHE_TTL,
+        negative_ttl: float = AUTH_CACHE_NEGATIVE_TTL,
+    ):
+        """Initialize an empty cache."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # expiry (monotonic) and status, None if unknown, by id_tag
+        self._entries: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Return the number of id_tags cached."""
+        return len(self._entries)
+
+    def get(self, id_tag: str):
+        """Return the cached status, None if unknown, _MISS if not cached."""
+        entry = self._entries.get(id_tag)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(id_tag, None)
+            self.misses += 1
+            return _MISS
+        self._entries.move_to_end(id_tag)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, id_tag: str, status: str | None):
+        """Cache the status of an id_tag, None if it is unknown."""
+        ttl = self.ttl if status is not None else self.negative_ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        self._entries[id_tag] = (time.monotonic() + ttl, status)
+        self._entries.move_to_end(id_tag)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget all statuses, eg after the store changed."""
+        self._entries.clear()
+
+
+class Authorization:
+    """Ask the providers in turn for the status of an id_tag.
+
+    Providers answering from memory, like the authorization_list, are asked
+    first. The answer of the others is cached, so a repeated swipe does not
+    reach the store. A store failing or not answering within timeout seconds
+    is skipped and the answer is not cached.
+    """
+
+    def __init__(
+        self,
+        providers: list[AuthorizationProvider],
+        cache: AuthorizationCache | None = None,
+        timeout: float = AUTH_LOOKUP_TIMEOUT,
+    ):
+        """Initialize with the providers in the order they are asked."""
+        self.providers = list(providers)
+        self.cache = cache if cache is not None else AuthorizationCache()
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, host: OcppHost) -> Authorization:
+        """Return the authorization_list and file of the YAML configuration."""
+        config = host.get_config()
+        providers: list[AuthorizationProvider] = [ConfigListProvider(host)]
+        path = config.get(CONF_AUTH_FILE)
+        if path:
+            if not os.path.isabs(path):
+                path = host.storage_path(path) or path
+            providers.append(FileProvider(host, path))
+        cache = AuthorizationCache(
+            config.get(CONF_AUTH_CACHE_SIZE, DEFAULT_AUTH_CACHE_SIZE),
+            config.get(CONF_AUTH_CACHE_TTL, DEFAULT_AUTH_CACHE_TTL),
+        )
+        return cls(providers, cache)
+
+    async def async_get_status(self, id_tag: str, default_status: str) -> str | None:
+        """Return the status of an id_tag, None if no provider knows it."""
+        stores = []
+        for provider in self.providers:
+            if provider.cached:
+                stores.append(provider)
+                continue
+            status = await provider.async_get_status(id_tag, default_status)
+            if status is not None:
+                return status
+        if not stores:
+            return None
+        status = self.cache.get(id_tag)
+        if status is not _MISS:
+            return status
+        status = None
+        failed = False
+        for provider in stores:
+            try:
+                status = await asyncio.wait_for(
+                    provider.async_get_status(id_tag, default_status), self.timeout
+                )
+            except Exception as e:
+                _LOGGER.warning(
+                    "%s failed to authorize id_tag '%s': %r",
+                    type(provider).__name__,
+                    id_tag,
+                    e,
+                )
+                failed = True
+                continue
+            if status is not None:
+                break
+        if not failed:
+            self.cache.set(id_tag, status)
+        return status
@@ -0,0 +1,178 @@
+"""Site level load balancing of the chargers of a central system."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from typing import TYPE_CHECKING
+
+from .const import SITE_DEADBAND, SITE_HEADROOM, SITE_MAX_PARALLEL_PUSHES
+from .host import OcppHost
+
+if TYPE_CHECKING:
+    from .chargepoint import ChargePoint
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class SiteLoadBalancer:
+    """Share the current of the site between chargers with an active session.
+
+    Chargers report sessions starting and stopping and their measured
+    Current.Import. The limits are recomputed when a session starts or stops
+    or the current of a charger moved more than the deadband since the last
+    allocation. Only changed limits are pushed, with at most max_parallel
+    SetChargingProfile requests in flight.
+
+    Limits apply to the whole charger, like set_charge_rate, and a charger
+    keeps its share while it is offline during a session.
+    """
+
+    def __init__(
+        self,
+        host: OcppHost,
+        site_limit: float,
+        deadband: float = SITE_DEADBAND,
+        max_parallel: int = SITE_MAX_PARALLEL_PUSHES,
+    ):
+        """Balance site_limit amps between the chargers."""
+        self.host = host
+        self.site_limit = float(site_limit)
+        self.deadband = deadband
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        self._chargers: dict[str, ChargePoint] = {}
+        self._sessions: dict[str, set[int]] = {}
+        self._current: dict[tuple[str, int], float] = {}
+        self._caps: dict[str, float] = {}
+        # measured current of each charger when limits were last allocated
+        self._basis: dict[str, float] = {}
+        self._limits: dict[str, float] = {}
+        # demand of chargers limited by their vehicle
+        self._ev_limits: dict[str, float] = {}
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def limits(self) -> dict[str, float]:
+        """Return the limit last pushed to each charger with a session."""
+        return dict(self._limits)
+
+    def is_active(self, cp_id: str) -> bool:
+        """Return True if the charger has a session being balanced."""
+        return bool(self._sessions.get(cp_id))
+
+    def session_started(self, cp: ChargePoint, connector_id: int):
+        """Include a new session in the allocation."""
+        self._chargers[cp.id] = cp
+        self._sessions.setdefault(cp.id, set()).add(connector_id)
+        self._ev_limits.pop(cp.id, None)
+        self.schedule()
+
+    def session_stopped(self, cp: ChargePoint, connector_id: int):
+        """Release the share of a session that stopped."""
+        sessions = self._sessions.get(cp.id, set())
+        sessions.discard(connector_id)
+        self._current.pop((cp.id, connector_id), None)
+        if not sessions:
+            self._sessions.pop(cp.id, None)
+            self._basis.pop(cp.id, None)
+            self._limits.pop(cp.id, None)
+            self._ev_limits.pop(cp.id, None)
+        self.schedule()
+
+    def set_cap(self, cp_id: str, amps: float):
+        """Limit the share of a charger, eg from its maximum current slider."""
+        self._caps[cp_id] = float(amps)
+        if self.is_active(cp_id):
+            self.schedule()
+
+    def update_current(self, cp: ChargePoint, connector_id: int, amps: float):
+        """Take a measured Current.Import, rebalance if it moved past the deadband.
+
+        A charger drawing clearly less than its limit is limited by the
+        vehicle, its demand becomes SITE_HEADROOM above what it draws until
+        it draws close to its limit again.
+        """
+        self._current[(cp.id, connector_id)] = float(amps)
+        if not self.is_active(cp.id):
+            return
+        measured = self._measured(cp.id)
+        limit = self._limits.get(cp.id)
+        if limit is not None and measured < limit - SITE_HEADROOM:
+            self._ev_limits[cp.id] = measured + SITE_HEADROOM
+        elif limit is not None and measured >= limit - self.deadband:
+            self._ev_limits.pop(cp.id, None)
+        basis = self._basis.get(cp.id)
+        if basis is None or abs(measured - basis) > self.deadband:
+            self.schedule()
+
+    def _measured(self, cp_id: str) -> float:
+        return sum(self._current.get((cp_id, c), 0.0) for c in self._sessions[cp_id])
+
+    def demand(self, cp_id: str) -> float:
+        """Return the current a charger can use."""
+        cp = self._chargers[cp_id]
+        cap = float(getattr(cp.settings, "max_current", self.site_limit))
+        cap = min(cap, self._caps.get(cp_id, cap))
+        return min(cap, self._ev_limits.get(cp_id, cap))
+
+    def allocate(self) -> dict[str, float]:
+        """Return the max-min fair share of the site limit of each charger.
+
+        Shares are weighted by the number of sessions and no charger gets
+        more than its demand, what it cannot use goes to the others.
+        """
+        weights = {cp_id: len(c) for cp_id, c in self._sessions.items() if c}
+        demands = {cp_id: self.demand(cp_id) for cp_id in weights}
+        remaining = self.site_limit
+        total = sum(weights.values())
+        allocation: dict[str, float] = {}
+        for cp_id in sorted(weights, key=lambda c: demands[c] / weights[c]):
+            share = remaining * weights[cp_id] / total
+            amps = math.floor(min(demands[cp_id], share) * 10) / 10
+            allocation[cp_id] = amps
+            remaining -= amps
+            total -= weights[cp_id]
+        return allocation
+
+    def schedule(self):
+        """Rebalance soon, coalescing changes that arrive meanwhile."""
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = self.host.create_task(self._rebalance())
+
+    async def _rebalance(self):
+        while self._dirty:
+            self._dirty = False
+            allocation = self.allocate()
+            for cp_id in allocation:
+                self._basis[cp_id] = self._measured(cp_id)
+            decreases, increases = [], []
+            for cp_id, amps in allocation.items():
+                old = self._limits.get(cp_id)
+                if old is None or amps < old:
+                    decreases.append((cp_id, amps))
+                elif amps - old >= self.deadband:
+                    increases.append((cp_id, amps))
+            # lower limits first so the site limit is not exceeded meanwhile
+            for changes in (decreases, increases):
+                await asyncio.gather(
+                    *(self._push(cp_id, amps) for cp_id, amps in changes)
+                )
+
+    async def _push(self, cp_id: str, amps: float):
+        async with self._semaphore:
+            cp = self._chargers[cp_id]
+            try:
+                # queued with the other charge rate requests of the charger
+                ok = await cp.request_charge_rate(limit_amps=amps, conn_id=0)
+            except Exception as e:
+                _LOGGER.warning("%s: failed to set site limit: %s", cp_id, e)
+                ok = False
+        if ok is False:
+            # pushed again on the next rebalance
+            self._limits.pop(cp_id, None)
+        elif self.is_active(cp_id):
+            self._limits[cp_id] = amps
+            _LOGGER.debug("%s: site limit set to %s A", cp_id, amps)
@@ -14,12 +14,8 @@ from homeassistant.components.button import (
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 
-from .api import CentralSystem
+from .api import CentralSystem, async_add_in_batches
 from .const import (
-    CONF_CPID,
-    CONF_CPIDS,
-    CONF_NUM_CONNECTORS,
-    DEFAULT_NUM_CONNECTORS,
     DOMAIN,
 )
 from .enums import HAChargerServices
@@ -59,22 +55,7 @@ async def async_setup_entry(hass, entry, async_add_devices):
     entities: list[ChargePointButton] = []
     ent_reg = er.async_get(hass)
 
-    for charger in entry.data[CONF_CPIDS]:
-        cp_id_settings = list(charger.values())[0]
-        cpid = cp_id_settings[CONF_CPID]
-
-        num_connectors = 1
-        for item in entry.data.get(CONF_CPIDS, []):
-            for _, cfg in item.items():
-                if cfg.get(CONF_CPID) == cpid:
-                    num_connectors = int(
-                        cfg.get(CONF_NUM_CONNECTORS, DEFAULT_NUM_CONNECTORS)
-                    )
-                    break
-            else:
-                continue
-            break
-
+    for cpid, _settings, num_connectors in central_system.configured_chargers():
         if num_connectors > 1:
             for desc in BUTTONS:
                 if not desc.per_connector:
@@ -118,7 +99,7 @@ async def async_setup_entry(hass, entry, async_add_devices):
                     )
                 )
 
-    async_add_devices(entities, False)
+    await async_add_in_batches(async_add_devices, entities)
 
 
 class ChargePointButton(ButtonEntity):
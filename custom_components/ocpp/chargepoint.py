@@ -1,28 +1,37 @@
 """Common classes for charge points of all OCPP versions."""
 
+from array import array
 import asyncio
-from collections import defaultdict
-from collections.abc import MutableMapping
+from collections import Counter, defaultdict
+from collections.abc import Coroutine, MutableMapping
+from contextlib import asynccontextmanager
+import copy
 from dataclasses import dataclass
-from enum import Enum
+from datetime import datetime, UTC
+from enum import Enum, IntEnum
+import functools
+import heapq
+import inspect
+import itertools
 import logging
 from math import sqrt
 import secrets
+import sqlite3
 import string
 import time
 
-from homeassistant.components.persistent_notification import DOMAIN as PN_DOMAIN
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import STATE_OK, STATE_UNAVAILABLE, STATE_UNKNOWN
-from homeassistant.const import UnitOfTime
-from homeassistant.helpers import device_registry, entity_component, entity_registry
-from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.const import UnitOfInformation, UnitOfTime
 from websockets.asyncio.server import ServerConnection
 from websockets.exceptions import WebSocketException
+from websockets.extensions.base import Extension
+from websockets.frames import DATA_OPCODES, Frame
 from websockets.protocol import State
 
 from ocpp.charge_point import ChargePoint as cp
+from ocpp.charge_point import remove_nones, serialize_as_dict, snake_to_camel_case
 from ocpp.v16 import call as callv16
 from ocpp.v16 import call_result as call_resultv16
 from ocpp.v16.enums import (
@@ -30,10 +39,9 @@ from ocpp.v16.enums import (
     Measurand,
     Phase,
     ReadingContext,
+    UpdateStatus,
 )
-from ocpp.v201 import call as callv201
-from ocpp.v201 import call_result as call_resultv201
-from ocpp.messages import CallError
+from ocpp.messages import CallError, CallResult, validate_payload
 from ocpp.exceptions import NotImplementedError
 
 from .enums import (
@@ -47,16 +55,20 @@ from .enums import (
 from .const import (
     CentralSystemSettings,
     ChargerSystemSettings,
-    CONF_AUTH_LIST,
-    CONF_AUTH_STATUS,
     CONF_DEFAULT_AUTH_STATUS,
-    CONF_ID_TAG,
     CONF_MONITORED_VARIABLES,
     CONF_NUM_CONNECTORS,
     CONF_CPIDS,
-    CONFIG,
-    DATA_UPDATED,
+    BACKLOG_AGE,
+    BACKLOG_DEBOUNCE,
+    CALL_TIMEOUT_CONFIGURATION,
+    CALL_TIMEOUT_CONTROL,
+    CALL_TIMEOUT_DIAGNOSTICS,
+    CALL_TIMEOUT_SAFETY,
     DEFAULT_ENERGY_UNIT,
+    DEFAULT_HISTORY_MEMORY,
+    DEFAULT_MAX_TASKS,
+    LOAD_PUBLISH_INTERVAL,
     DEFAULT_NUM_CONNECTORS,
     DEFAULT_POWER_UNIT,
     DEFAULT_MEASURAND,
@@ -65,6 +77,14 @@ from .const import (
     HA_POWER_UNIT,
     UNITS_OCCP_TO_HA,
 )
+from .authorization import Authorization, ConfigListProvider
+from .degradation import DegradationController, DegradationLevel
+from .digest import NotificationDigest
+from .host import HistoricalSample, HomeAssistantHost, OcppHost
+from .localauth import LocalListStore, chunked, list_changes
+from .balancer import SiteLoadBalancer
+from .ledger import SessionLedger, SessionRecord
+from .rollout import FirmwareRollout
 
 TIME_MINUTES = UnitOfTime.MINUTES
 _LOGGER: logging.Logger = logging.getLogger(__package__)
@@ -116,6 +136,90 @@ class Metric:
         self._extra_attr = extra_attr
 
 
+class TimeSeries:
+    """Fixed capacity ring buffer of (timestamp, value) samples.
+
+    Timestamps (epoch seconds) and values are stored in two array('d'), so a
+    series takes 16 bytes per sample of capacity. Samples are expected in
+    time order, the oldest is overwritten once the buffer is full.
+    """
+
+    __slots__ = ("_count", "_next", "_t", "_v")
+
+    SAMPLE_BYTES = 16
+
+    def __init__(self, capacity: int):
+        """Allocate a series holding up to capacity samples."""
+        self._t = array("d", bytes(8 * capacity))
+        self._v = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    @property
+    def capacity(self) -> int:
+        """Return the maximum number of samples kept."""
+        return len(self._t)
+
+    def __len__(self):
+        """Return the number of samples kept."""
+        return self._count
+
+    def resize(self, capacity: int):
+        """Change the capacity, keeping the newest samples that fit."""
+        if capacity == len(self._t):
+            return
+        kept = self.samples()[-capacity:] if capacity > 0 else []
+        self._t = array("d", bytes(8 * capacity))
+        self._v = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+        for timestamp, value in kept:
+            self.append(timestamp, value)
+
+    def append(self, timestamp: float, value: float):
+        """Add a sample, overwriting the oldest when full."""
+        i = self._next
+        self._t[i] = timestamp
+        self._v[i] = value
+        self._next = (i + 1) % len(self._t)
+        self._count = min(self._count + 1, len(self._t))
+
+    def samples(self, window: float | None = None, now: float | None = None):
+        """Return (timestamp, value) pairs oldest first.
+
+        With a window (seconds) only samples newer than now - window are
+        returned, now defaults to the current time.
+        """
+        cap = len(self._t)
+        start = (self._next - self._count) % cap if cap else 0
+        since = None
+        if window is not None:
+            since = (time.time() if now is None else now) - window
+        result = []
+        for k in range(self._count):
+            i = (start + k) % cap
+            if since is None or self._t[i] >= since:
+                result.append((self._t[i], self._v[i]))
+        return result
+
+    def mean(self, window: float | None = None, now: float | None = None):
+        """Return the mean value of the samples in the window, None if empty."""
+        values = [v for _, v in self.samples(window, now)]
+        return sum(values) / len(values) if values else None
+
+    def rate(self, window: float | None = None, now: float | None = None):
+        """Return the change in value per hour over the window.
+
+        For an energy register in kWh this is the average power in kW, for a
+        current it shows whether it is ramping up or down.
+        """
+        samples = self.samples(window, now)
+        if len(samples) < 2 or samples[-1][0] <= samples[0][0]:
+            return None
+        (t0, v0), (t1, v1) = samples[0], samples[-1]
+        return (v1 - v0) / (t1 - t0) * 3600
+
+
 class _ConnectorAwareMetrics(MutableMapping):
     """Backwards compatible mapping for metrics.
 
@@ -124,10 +228,17 @@ class _ConnectorAwareMetrics(MutableMapping):
     - m[2]                             -> dict[str -> Metric] for connector 2
 
     Iteration, len, keys(), values(), items() operate on connector 0 (flat view).
+
+    With history_bytes, recent values passed to record() are kept in a
+    TimeSeries per (connector, measurand). The bytes are shared evenly by the
+    series, which shrink when another one is added.
     """
 
-    def __init__(self):
+    def __init__(self, history_bytes: int = 0):
         self._by_conn = defaultdict(lambda: defaultdict(lambda: Metric(None, None)))
+        self.history_bytes = history_bytes
+        self._history: dict[tuple[int, str], TimeSeries] = {}
+        self._valued: set[tuple[int, str]] = set()
 
     def __getitem__(self, key):
         if isinstance(key, tuple) and len(key) == 2 and isinstance(key[0], int):
@@ -185,6 +296,60 @@ class _ConnectorAwareMetrics(MutableMapping):
 
     def clear(self):
         self._by_conn.clear()
+        self._history.clear()
+        self._valued.clear()
+
+    def record(self, conn: int, meas: str, timestamp: float | None = None):
+        """Append the current numeric value of a metric to its history."""
+        if self.history_bytes <= 0:
+            return
+        value = self._by_conn[conn][meas].value
+        if isinstance(value, bool) or not isinstance(value, int | float):
+            return
+        series = self._history.get((conn, meas))
+        if series is None:
+            series = self._add_series(conn, meas)
+            if series is None:
+                return
+        series.append(time.time() if timestamp is None else timestamp, value)
+
+    def _add_series(self, conn: int, meas: str) -> TimeSeries | None:
+        """Add a series, None if the budget leaves less than 2 samples each."""
+        count = len(self._history) + 1
+        capacity = self.history_bytes // (TimeSeries.SAMPLE_BYTES * count)
+        if capacity < 2:
+            return None
+        for series in self._history.values():
+            series.resize(capacity)
+        series = self._history[(conn, meas)] = TimeSeries(capacity)
+        return series
+
+    def history(self, conn: int, meas: str) -> TimeSeries | None:
+        """Return the recent values of a metric, None if none were recorded."""
+        return self._history.get((conn, meas))
+
+    def history_keys(self) -> list[tuple[int, str]]:
+        """Return the (connector, measurand) pairs with a history."""
+        return list(self._history)
+
+    def new_values(self) -> list[tuple[int, str]]:
+        """Return the (connector, measurand) pairs given a value since last asked."""
+        new = [
+            (conn, meas)
+            for conn, metrics in self._by_conn.items()
+            for meas, metric in metrics.items()
+            if metric.value is not None and (conn, meas) not in self._valued
+        ]
+        self._valued.update(new)
+        return new
+
+    def snapshot(self) -> dict[tuple[int, str], tuple]:
+        """Return (value, unit) of every metric keyed by (connector, measurand)."""
+        return {
+            (conn, meas): (metric.value, metric.unit)
+            for conn, metrics in self._by_conn.items()
+            for meas, metric in metrics.items()
+        }
 
     def __contains__(self, key):
         if isinstance(key, tuple) and len(key) == 2 and isinstance(key[0], int):
@@ -222,6 +387,312 @@ class MeasurandValue:
     location: str | None
 
 
+@dataclass
+class TrafficStats:
+    """Websocket payload bytes of a charger, raw and as sent on the wire."""
+
+    received_raw: int = 0
+    received_wire: int = 0
+    sent_raw: int = 0
+    sent_wire: int = 0
+    compressed: bool = False
+
+
+class _TrafficCounter(Extension):
+    """Pass-through websocket extension counting data frame payload bytes.
+
+    One instance is placed on each end of the negotiated extensions, so the
+    application end sees raw bytes and the wire end compressed bytes.
+    """
+
+    name = "x-ocpp-traffic-counter"
+
+    def __init__(self, stats: TrafficStats, wire: bool):
+        self.stats = stats
+        self.wire = wire
+
+    def decode(self, frame: Frame, *, max_size: int | None = None) -> Frame:
+        if frame.opcode in DATA_OPCODES:
+            if self.wire:
+                self.stats.received_wire += len(frame.data)
+            else:
+                self.stats.received_raw += len(frame.data)
+        return frame
+
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode in DATA_OPCODES:
+            if self.wire:
+                self.stats.sent_wire += len(frame.data)
+            else:
+                self.stats.sent_raw += len(frame.data)
+        return frame
+
+
+class CallPriority(IntEnum):
+    """Priority class of an outbound request, lower classes are sent first."""
+
+    safety = 0
+    control = 1
+    configuration = 2
+    diagnostics = 3
+
+
+# Actions of both OCPP versions by priority class, others are control
+CALL_PRIORITIES: dict[str, CallPriority] = {
+    **dict.fromkeys(
+        (
+            "RemoteStopTransaction",
+            "RequestStopTransaction",
+            "Reset",
+            "UnlockConnector",
+            "ChangeAvailability",
+        ),
+        CallPriority.safety,
+    ),
+    **dict.fromkeys(
+        (
+            "GetConfiguration",
+            "ChangeConfiguration",
+            "GetVariables",
+            "SetVariables",
+            "SetVariableMonitoring",
+            "ClearVariableMonitoring",
+            "GetLocalListVersion",
+            "SendLocalList",
+            "ClearCache",
+        ),
+        CallPriority.configuration,
+    ),
+    **dict.fromkeys(
+        (
+            "GetDiagnostics",
+            "GetLog",
+            "GetBaseReport",
+            "GetReport",
+            "GetMonitoringReport",
+            "UpdateFirmware",
+            "DataTransfer",
+        ),
+        CallPriority.diagnostics,
+    ),
+}
+
+CALL_TIMEOUTS: dict[CallPriority, int] = {
+    CallPriority.safety: CALL_TIMEOUT_SAFETY,
+    CallPriority.control: CALL_TIMEOUT_CONTROL,
+    CallPriority.configuration: CALL_TIMEOUT_CONFIGURATION,
+    CallPriority.diagnostics: CALL_TIMEOUT_DIAGNOSTICS,
+}
+
+
+class OutboundQueue:
+    """Grant sending outbound requests one at a time, most urgent first.
+
+    Requests of the same class are sent in the order they were made. A
+    safety request does not wait for the response to a diagnostics request
+    in flight, which is cancelled instead. The number waiting, sent and
+    timed out is kept per class for diagnostics.
+    """
+
+    def __init__(self):
+        """Initialize with nothing in flight."""
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._busy = False
+        self._in_flight: tuple[CallPriority, asyncio.Future] | None = None
+        self.sent: Counter[str] = Counter()
+        self.timeouts: Counter[str] = Counter()
+        self.dropped = 0
+        self.preempted = 0
+
+    def depth(self) -> dict[str, int]:
+        """Return the number of requests waiting in each class."""
+        depth = dict.fromkeys((p.name for p in CallPriority), 0)
+        for priority, _, future in self._waiting:
+            if not future.done():
+                depth[CallPriority(priority).name] += 1
+        return depth
+
+    @asynccontextmanager
+    async def slot(self, priority: CallPriority):
+        """Wait until no request is in flight and none more urgent is waiting."""
+        if self._busy:
+            if priority == CallPriority.safety and self._in_flight is not None:
+                in_flight_priority, request = self._in_flight
+                if in_flight_priority == CallPriority.diagnostics:
+                    request.cancel()
+                    self._in_flight = None
+                    self.preempted += 1
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (priority, next(self._order), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # granted just before the cancellation
+                    self._release()
+                raise
+        else:
+            self._busy = True
+        try:
+            yield
+        finally:
+            self._in_flight = None
+            self._release()
+
+    async def send(self, priority: CallPriority, request: Coroutine):
+        """Await the response to a request sent in the slot of priority.
+
+        Raise TimeoutError if a safety request cancelled it.
+        """
+        future = asyncio.ensure_future(request)
+        self._in_flight = (priority, future)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if not future.cancelled() or (current and current.cancelling()):
+                raise
+            raise TimeoutError("cancelled for a safety request") from None
+
+    def _release(self):
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._busy = False
+
+    def drop_stale(self, below: CallPriority = CallPriority.configuration):
+        """Fail waiting requests of class below and less urgent ones."""
+        for priority, _, future in self._waiting:
+            if priority >= below and not future.done():
+                future.set_exception(ConnectionError("charger disconnected"))
+                self.dropped += 1
+        self._waiting = [w for w in self._waiting if not w[2].done()]
+        heapq.heapify(self._waiting)
+
+
+class TaskGroup:
+    """Background tasks of a charger, at most a limit pending at a time.
+
+    Tasks are scheduled with the host so it keeps track of them, and are
+    cancelled together when the charger disconnects. A task over the limit
+    is not started but counted as dropped, a failed task is logged.
+    """
+
+    def __init__(self, host: OcppHost, name: str, limit: int = DEFAULT_MAX_TASKS):
+        """Initialize with no tasks."""
+        self.host = host
+        self.name = name
+        self.limit = limit
+        self._tasks: set[asyncio.Task] = set()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        """Return the number of pending tasks."""
+        return len(self._tasks)
+
+    def create_task(self, target: Coroutine) -> asyncio.Task | None:
+        """Schedule a coroutine, return None if it was dropped."""
+        if len(self._tasks) >= self.limit:
+            target.close()
+            self.dropped += 1
+            _LOGGER.debug(
+                "%s: %i tasks pending, dropped %s",
+                self.name,
+                self.limit,
+                target.__qualname__,
+            )
+            return None
+        task = self.host.create_task(target)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.error(
+                "%s: background task failed", self.name, exc_info=task.exception()
+            )
+
+    def cancel(self):
+        """Cancel the pending tasks, except the one calling."""
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+
+
+class ValidationMode(str, Enum):
+    """How often inbound requests of an action are schema validated."""
+
+    always = "always"
+    never = "never"
+    sampled = "sampled"
+
+
+@dataclass
+class ActionValidationPolicy:
+    """Validation policy and counters for a single OCPP action."""
+
+    mode: ValidationMode
+    every: int = 1  # validate 1-in-every requests when sampled
+    received: int = 0
+    validated: int = 0
+    time_ms: float = 0.0
+
+    def should_validate(self) -> bool:
+        """Count a received request and return True if it must be validated."""
+        self.received += 1
+        if self.mode == ValidationMode.always:
+            return True
+        if self.mode == ValidationMode.never:
+            return False
+        return (self.received - 1) % self.every == 0
+
+
+def parse_validation_policy(
+    policy: str | None, skip_schema_validation: bool = False
+) -> tuple[dict[str, ActionValidationPolicy], ActionValidationPolicy]:
+    """Parse a policy string such as "MeterValues:10,BootNotification:always".
+
+    Each comma separated entry is an action name (or "*" for all other
+    actions) followed by "always", "never" or an integer N to validate
+    1-in-N requests. Actions without an entry follow skip_schema_validation.
+    Returns the per action policies and the default policy, raises ValueError
+    if the string is malformed.
+    """
+    default_mode = (
+        ValidationMode.never if skip_schema_validation else ValidationMode.always
+    )
+    default = ActionValidationPolicy(default_mode)
+    actions: dict[str, ActionValidationPolicy] = {}
+    for item in (policy or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        action, sep, rule = item.partition(":")
+        action = action.strip()
+        rule = rule.strip().lower()
+        if not sep or not action or not rule:
+            raise ValueError(f"Invalid schema validation policy entry '{item}'")
+        if rule in (ValidationMode.always.value, ValidationMode.never.value):
+            entry = ActionValidationPolicy(ValidationMode(rule))
+        elif rule.isdigit() and int(rule) > 0:
+            every = int(rule)
+            mode = ValidationMode.always if every == 1 else ValidationMode.sampled
+            entry = ActionValidationPolicy(mode, every)
+        else:
+            raise ValueError(f"Invalid schema validation policy entry '{item}'")
+        if action == "*":
+            default = entry
+        else:
+            actions[action] = entry
+    return actions, default
+
+
 class ChargePoint(cp):
     """Server side representation of a charger."""
 
@@ -230,33 +701,45 @@ class ChargePoint(cp):
         id,  # is charger cp_id not HA cpid
         connection,
         version: OcppVersion,
-        hass: HomeAssistant,
+        host: HomeAssistant | OcppHost,
         entry: ConfigEntry,
         central: CentralSystemSettings,
         charger: ChargerSystemSettings,
     ):
-        """Instantiate a ChargePoint."""
+        """Instantiate a ChargePoint.
+
+        host is either an OcppHost, eg a StandaloneHost to run without Home
+        Assistant, or a Home Assistant instance.
+        """
 
         super().__init__(id, connection, 10)
         if version == OcppVersion.V16:
             self._call = callv16
             self._call_result = call_resultv16
             self._ocpp_version = "1.6"
-        elif version == OcppVersion.V201:
-            self._call = callv201
-            self._call_result = call_resultv201
-            self._ocpp_version = "2.0.1"
-        elif version == OcppVersion.V21:
+        else:
+            # imported here so sites running only OCPP 1.6 do not load them
+            from ocpp.v201 import call as callv201
+            from ocpp.v201 import call_result as call_resultv201
+
             self._call = callv201
             self._call_result = call_resultv201
-            self._ocpp_version = "2.1"
-
-        for action in self.route_map:
-            self.route_map[action]["_skip_schema_validation"] = (
-                charger.skip_schema_validation
-            )
+            self._ocpp_version = "2.1" if version == OcppVersion.V21 else "2.0.1"
+
+        # The library validates nothing, requests are validated in _handle_call
+        # according to the per action policy and responses unless
+        # skip_schema_validation is set, see _validating_response
+        self._validation_policy: dict[str, ActionValidationPolicy] | None = None
+        self._default_validation_policy: ActionValidationPolicy | None = None
+        for action, handlers in self.route_map.items():
+            handlers["_skip_schema_validation"] = True
+            if "_on_action" in handlers:
+                handlers["_on_action"] = self._validating_response(
+                    action, handlers["_on_action"]
+                )
 
-        self.hass = hass
+        self.host = host if isinstance(host, OcppHost) else HomeAssistantHost(host)
+        self.hass = self.host.hass
         self.entry = entry
         self.cs_settings = central
         self.settings = charger
@@ -271,9 +754,47 @@ class ChargePoint(cp):
         self.post_connect_success = False
         self.tasks = None
         self._charger_reports_session_energy = False
+        self._traffic = TrafficStats()
+        self._attach_traffic_counters(connection)
+        self._outbound = OutboundQueue()
+        self._task_group = TaskGroup(
+            self.host, id, getattr(charger, "max_tasks", DEFAULT_MAX_TASKS)
+        )
+        # Completed sessions are stored here, set by the central system
+        self.ledger: SessionLedger | None = None
+        # Site load balancing, set by the central system when enabled
+        self.balancer: SiteLoadBalancer | None = None
+        # Firmware rollout of the central system
+        self.rollout: FirmwareRollout | None = None
+        # Load shedding of the central system, see _degraded
+        self.degradation: DegradationController | None = None
+        # Notification digest of the central system, None sends each one
+        self.digest: NotificationDigest | None = None
+        # Local authorization lists sent, set by the central system
+        self.local_lists: LocalListStore | None = None
+        # Providers of id_tag statuses, the central system sets its own
+        self.authorization = Authorization([ConfigListProvider(self.host)])
+        # When sensors were last updated, and the update deferred at the
+        # minimal degradation level
+        self._published_at = 0.0
+        self._publish_timer: asyncio.TimerHandle | None = None
+        # Latest per phase attributes received while degraded, by metric key
+        self._deferred_phases: dict[tuple[int, str], dict] = {}
+        # Charging profiles the charger accepted, by (connector, purpose, id)
+        self._accepted_profiles: dict[tuple[int, str, int], dict] = {}
+        # Latest charge rate request waiting per connector, see request_charge_rate
+        self._pending_rates: dict[int, tuple[asyncio.Future, dict]] = {}
+        self._rate_senders: dict[int, asyncio.Task] = {}
+        # Meter values queued by the charger while offline, see schedule_update
+        self._backlog: list[HistoricalSample] = []
+        self._backlog_timer: asyncio.TimerHandle | None = None
+        # charger clock minus ours (s), see observe_clock
+        self._clock_offset = 0.0
 
         # Connector-aware, but backwards compatible:
-        self._metrics: _ConnectorAwareMetrics = _ConnectorAwareMetrics()
+        self._metrics: _ConnectorAwareMetrics = _ConnectorAwareMetrics(
+            getattr(charger, "history_memory", DEFAULT_HISTORY_MEMORY) * 1024
+        )
 
         # Init standard metrics for connector 0
         self._metrics[(0, cdet.identifier.value)].value = id
@@ -284,6 +805,101 @@ class ChargePoint(cp):
         self._remote_id_tag = "".join(secrets.choice(alphabet) for i in range(20))
         self.num_connectors: int = DEFAULT_NUM_CONNECTORS
 
+    def _attach_traffic_counters(self, connection):
+        """Count payload bytes on both ends of the negotiated extensions."""
+        protocol = getattr(connection, "protocol", None)
+        if protocol is None:
+            return
+        extensions = protocol.extensions
+        self._traffic.compressed = len(extensions) > 0
+        extensions.insert(0, _TrafficCounter(self._traffic, wire=False))
+        extensions.append(_TrafficCounter(self._traffic, wire=True))
+
+    def _update_traffic_metrics(self):
+        """Report wire bytes with raw bytes and compression ratio as attributes."""
+        t = self._traffic
+        for key, wire, raw in (
+            (cstat.traffic_received.value, t.received_wire, t.received_raw),
+            (cstat.traffic_sent.value, t.sent_wire, t.sent_raw),
+        ):
+            metric = self._metrics[(0, key)]
+            metric.value = wire
+            metric.unit = UnitOfInformation.BYTES
+            metric.extra_attr = {
+                "raw_bytes": raw,
+                "compressed": t.compressed,
+                "compression_ratio": round(wire / raw, 3) if raw else None,
+            }
+
+    def _update_queue_metrics(self):
+        """Report requests waiting, with per class counts as attributes."""
+        q = self._outbound
+        depth = q.depth()
+        metric = self._metrics[(0, cstat.outbound_queue.value)]
+        metric.value = sum(depth.values())
+        metric.extra_attr = {
+            "waiting": depth,
+            "sent": dict(q.sent),
+            "timeouts": dict(q.timeouts),
+            "dropped": q.dropped,
+            "preempted": q.preempted,
+        }
+
+    def _update_task_metrics(self):
+        """Report pending background tasks, with dropped ones as attribute."""
+        metric = self._metrics[(0, cstat.tasks.value)]
+        metric.value = len(self._task_group)
+        metric.extra_attr = {
+            "dropped": self._task_group.dropped,
+            "limit": self._task_group.limit,
+        }
+
+    def _update_degradation_metrics(self):
+        """Report the degradation level of the central system."""
+        if self.degradation is None:
+            return
+        metric = self._metrics[(0, cstat.degradation.value)]
+        metric.value = self.degradation.level.name
+        metric.extra_attr = {
+            "event_loop_lag_ms": round(self.degradation.lag * 1000),
+            "pending_tasks": self.degradation.pending,
+        }
+
+    def create_task(self, target: Coroutine) -> asyncio.Task | None:
+        """Run a coroutine in the background until the charger disconnects."""
+        return self._task_group.create_task(target)
+
+    @property
+    def pending_tasks(self) -> int:
+        """Return the number of background tasks pending."""
+        return len(self._task_group)
+
+    def _degraded(self, level: DegradationLevel = DegradationLevel.reduced) -> bool:
+        """Return if work deferred from level on should be skipped now."""
+        return self.degradation is not None and self.degradation.level >= level
+
+    async def call(
+        self, payload, suppress=True, unique_id=None, skip_schema_validation=False
+    ):
+        """Send a request once more urgent requests waiting were sent.
+
+        The response timeout depends on the priority class of the action,
+        see CALL_PRIORITIES and CALL_TIMEOUTS.
+        """
+        priority = CALL_PRIORITIES.get(payload.__class__.__name__, CallPriority.control)
+        async with self._outbound.slot(priority):
+            # only one request is in flight, so the timeout is its own
+            self._response_timeout = CALL_TIMEOUTS[priority]
+            self._outbound.sent[priority.name] += 1
+            try:
+                return await self._outbound.send(
+                    priority,
+                    super().call(payload, suppress, unique_id, skip_schema_validation),
+                )
+            except TimeoutError:
+                self._outbound.timeouts[priority.name] += 1
+                raise
+
     def _init_connector_slots(self, conn_id: int) -> None:
         """Ensure connector-scoped metrics exist and carry the right units."""
         _ = self._metrics[(conn_id, cstat.status_connector.value)]
@@ -334,6 +950,11 @@ class ChargePoint(cp):
             await self.get_heartbeat_interval()
 
             accepted_measurands: str = await self.get_supported_measurands()
+            # slots of the monitored measurands, zeroed when a transaction stops
+            # even before they have a value
+            for meas in filter(None, map(str.strip, accepted_measurands.split(","))):
+                for conn in range(1, self.num_connectors + 1):
+                    _ = self._metrics[(conn, meas)]
             updated_entry = {**self.entry.data}
             for i in range(len(updated_entry[CONF_CPIDS])):
                 if self.id in updated_entry[CONF_CPIDS][i]:
@@ -345,7 +966,7 @@ class ChargePoint(cp):
                         s[CONF_NUM_CONNECTORS] = int(self.num_connectors)
                     break
             # if an entry differs this will unload/reload and stop/restart the central system/websocket
-            self.hass.config_entries.async_update_entry(self.entry, data=updated_entry)
+            self.host.update_entry(self.entry, updated_entry)
 
             await self.set_standard_configuration()
 
@@ -361,6 +982,20 @@ class ChargePoint(cp):
             except Exception as ex:
                 _LOGGER.debug("post_connect: set_availability ignored error: %s", ex)
 
+            try:
+                await self.set_monitoring()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                _LOGGER.debug("post_connect: set_monitoring ignored error: %s", ex)
+
+            try:
+                await self.sync_local_list()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                _LOGGER.debug("post_connect: sync_local_list ignored error: %s", ex)
+
             if prof.REM in self._attr_supported_features:
                 if self.received_boot_notification is False:
                     try:
@@ -383,6 +1018,10 @@ class ChargePoint(cp):
         """Trigger a boot notification."""
         pass
 
+    async def set_monitoring(self):
+        """Ask the charger to push changes of variables it monitors."""
+        pass
+
     async def trigger_status_notification(self):
         """Trigger status notifications for all connectors."""
         pass
@@ -398,6 +1037,71 @@ class ChargePoint(cp):
         """Clear all charging profiles."""
         pass
 
+    def profile_accepted(self, key: tuple[int, str, int], profile: dict) -> bool:
+        """Return True if the charger already accepted this profile under key."""
+        return self._accepted_profiles.get(key) == profile
+
+    def remember_profile(self, key: tuple[int, str, int], profile: dict):
+        """Keep an accepted profile, sending it again is skipped."""
+        self._accepted_profiles[key] = copy.deepcopy(profile)
+
+    def forget_profiles(self):
+        """Forget the accepted profiles, once cleared or possibly lost."""
+        self._accepted_profiles.clear()
+
+    async def request_charge_rate(self, conn_id: int = 0, **kwargs) -> bool | None:
+        """Set the charge rate of a connector, the latest request wins.
+
+        Requests are sent one at a time per connector. A request arriving
+        while one is being sent waits and replaces the one waiting before
+        it, which resolves to None without being sent, as do the requests
+        of a charger that stops. Takes the arguments of set_charge_rate and
+        returns its result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        superseded = self._pending_rates.pop(conn_id, None)
+        if superseded is not None and not superseded[0].done():
+            superseded[0].set_result(None)
+        self._pending_rates[conn_id] = (future, kwargs)
+        sender = self._rate_senders.get(conn_id)
+        if sender is None or sender.done():
+            sender = self.create_task(self._send_charge_rates(conn_id))
+            if sender is None:
+                # too many tasks pending, the request is not sent
+                del self._pending_rates[conn_id]
+                return None
+            self._rate_senders[conn_id] = sender
+            sender.add_done_callback(functools.partial(self._rate_sender_done, conn_id))
+        return await future
+
+    async def _send_charge_rates(self, conn_id: int):
+        while conn_id in self._pending_rates:
+            future, kwargs = self._pending_rates.pop(conn_id)
+            try:
+                result = await self.set_charge_rate(conn_id=conn_id, **kwargs)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                # when cancelled the request being sent resolves to None
+                if not future.done():
+                    future.set_result(None)
+
+    def _rate_sender_done(self, conn_id: int, sender: asyncio.Task):
+        if self._rate_senders.get(conn_id) is not sender:
+            # replaced by the sender of a later request
+            return
+        del self._rate_senders[conn_id]
+        # so does the one waiting, also if cancelled before sending, callers
+        # do not wait for a charger that stopped
+        if conn_id in self._pending_rates:
+            future, _ = self._pending_rates.pop(conn_id)
+            if not future.done():
+                future.set_result(None)
+
     async def set_charge_rate(
         self,
         limit_amps: int = 32,
@@ -479,7 +1183,7 @@ class ChargePoint(cp):
         # after 10s to allow for when a boot notification has not been received
         await asyncio.sleep(10)
         if not self.post_connect_success:
-            self.hass.async_create_task(self.post_connect())
+            self.create_task(self.post_connect())
 
         while connection.state is State.OPEN:
             try:
@@ -527,8 +1231,80 @@ class ChargePoint(cp):
                 _LOGGER.debug(f"monitor_connection stopping due to exception: {ex}")
                 break
 
+    def _get_validation_policy(self, action: str) -> ActionValidationPolicy:
+        """Return the validation policy of an action, creating it if needed."""
+        if self._validation_policy is None:
+            self._validation_policy, self._default_validation_policy = (
+                parse_validation_policy(
+                    self.settings.schema_validation_policy,
+                    self.settings.skip_schema_validation,
+                )
+            )
+        policy = self._validation_policy.get(action)
+        if policy is None:
+            default = self._default_validation_policy
+            policy = ActionValidationPolicy(default.mode, default.every)
+            self._validation_policy[action] = policy
+        return policy
+
+    def _validating_response(self, action: str, handler):
+        """Wrap a handler so its response is validated unless skipped.
+
+        The response is validated as the library sends it, an invalid one is
+        answered with a CallError instead.
+        """
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            response = handler(*args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+            if not self.settings.skip_schema_validation:
+                payload = snake_to_camel_case(remove_nones(serialize_as_dict(response)))
+                await validate_payload(
+                    CallResult("", payload, action), self._ocpp_version
+                )
+            return response
+
+        return wrapper
+
+    async def _validate_call(self, msg):
+        """Validate an inbound request if its action policy requires it."""
+        action = getattr(msg, "action", None)
+        if action not in self.route_map:
+            return
+        policy = self._get_validation_policy(action)
+        if not policy.should_validate():
+            return
+        time0 = time.perf_counter()
+        try:
+            await validate_payload(msg, self._ocpp_version)
+        finally:
+            policy.validated += 1
+            policy.time_ms += (time.perf_counter() - time0) * 1000
+            self._update_validation_metric()
+
+    def _update_validation_metric(self):
+        """Report total validation time with per action counters as attributes."""
+        metric = self._metrics[(0, cstat.schema_validation.value)]
+        metric.unit = "ms"
+        metric.value = round(
+            sum(p.time_ms for p in self._validation_policy.values()), 3
+        )
+        metric.extra_attr = {
+            action: {
+                "mode": p.mode.value,
+                "every": p.every,
+                "received": p.received,
+                "validated": p.validated,
+                "time_ms": round(p.time_ms, 3),
+            }
+            for action, p in self._validation_policy.items()
+        }
+
     async def _handle_call(self, msg):
         try:
+            await self._validate_call(msg)
             await super()._handle_call(msg)
         except NotImplementedError as e:
             response = msg.create_call_error(e).to_json()
@@ -558,11 +1334,21 @@ class ChargePoint(cp):
     async def stop(self):
         """Close connection and cancel ongoing tasks."""
         self.status = STATE_UNAVAILABLE
+        # configuration and diagnostics are asked again after reconnecting
+        self._outbound.drop_stale()
         if self._connection.state is State.OPEN:
             _LOGGER.debug(f"Closing websocket to '{self.id}'")
             await self._connection.close()
         for task in self.tasks:
             task.cancel()
+        self._task_group.cancel()
+        if self._publish_timer is not None:
+            self._publish_timer.cancel()
+            self._publish_timer = None
+        # queued samples are kept and imported after the next burst
+        if self._backlog_timer is not None:
+            self._backlog_timer.cancel()
+            self._backlog_timer = None
 
     async def reconnect(self, connection: ServerConnection):
         """Reconnect charge point."""
@@ -571,6 +1357,8 @@ class ChargePoint(cp):
         await self.stop()
         self.status = STATE_OK
         self._connection = connection
+        self._attach_traffic_counters(connection)
+        self.forget_profiles()
         self._metrics[(0, cstat.reconnects.value)].value += 1
         # post connect now handled on receiving boot notification or with backstop in monitor connection
         await self.run([super().start(), self.monitor_connection()])
@@ -587,86 +1375,301 @@ class ChargePoint(cp):
 
         identifiers = {(DOMAIN, self.id), (DOMAIN, self.settings.cpid)}
 
-        registry = device_registry.async_get(self.hass)
-        registry.async_get_or_create(
-            config_entry_id=self.entry.entry_id,
-            identifiers=identifiers,
-            manufacturer=vendor,
-            model=model,
-            sw_version=firmware_version,
+        await self.host.async_update_device_info(
+            self.entry, identifiers, vendor, model, firmware_version
         )
 
     def _register_boot_notification(self):
+        # profiles may not survive a reboot
+        self.forget_profiles()
+        if self.rollout is not None:
+            # start the update if it was this charger's turn while offline
+            self.create_task(self.rollout.advance())
         if self.triggered_boot_notification is False:
-            self.hass.async_create_task(self.notify_ha(f"Charger {self.id} rebooted"))
+            self.create_task(self.notify_ha(f"Charger {self.id} rebooted"))
             if not self.post_connect_success:
-                self.hass.async_create_task(self.post_connect())
+                self.create_task(self.post_connect())
 
     async def update(self, cpid: str):
-        """Update sensors values in HA (charger + connector child devices)."""
-        er = entity_registry.async_get(self.hass)
-        dr = device_registry.async_get(self.hass)
-        identifiers = {(DOMAIN, cpid), (DOMAIN, self.id)}
-        root_dev = dr.async_get_device(identifiers)
-        if root_dev is None:
-            return
+        """Update sensors values in HA (charger + connector child devices).
+
+        Diagnostic metrics are not refreshed while degraded, and at the
+        minimal level updates closer than LOAD_PUBLISH_INTERVAL are combined.
+        """
+        loop = asyncio.get_running_loop()
+        if self._degraded(DegradationLevel.minimal):
+            wait = self._published_at + LOAD_PUBLISH_INTERVAL - loop.time()
+            if wait > 0:
+                if self._publish_timer is None:
+                    self._publish_timer = loop.call_later(
+                        wait, self._deferred_update, cpid
+                    )
+                return
+        if not self._degraded():
+            self._apply_deferred_phases()
+            self._update_traffic_metrics()
+            self._update_queue_metrics()
+            self._update_task_metrics()
+        self._update_degradation_metrics()
+        self._published_at = loop.time()
+        new = self._metrics.new_values()
+        if new:
+            self.host.publish_new_metrics(cpid, new)
+        await self.host.async_publish_update(self.id, cpid, self._metrics)
+
+    def _apply_deferred_phases(self):
+        """Set the per phase attributes received while degraded."""
+        for key, attrs in self._deferred_phases.items():
+            self._metrics[key].extra_attr.update(attrs)
+        self._deferred_phases.clear()
+
+    def _deferred_update(self, cpid: str):
+        self._publish_timer = None
+        self.create_task(self.update(cpid))
+
+    @staticmethod
+    def parse_timestamp(timestamp: str | None) -> datetime | None:
+        """Parse an OCPP timestamp, naive timestamps are taken as UTC."""
+        if not timestamp:
+            return None
+        try:
+            t = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        except (ValueError, AttributeError):
+            return None
+        return t if t.tzinfo else t.replace(tzinfo=UTC)
 
-        to_visit = [root_dev.id]
-        visited = set()
-        updated_entities = 0
-        found_children = 0
+    def observe_clock(self, t: datetime | None):
+        """Take the time of a message the charger sent live as its clock.
 
-        while to_visit:
-            dev_id = to_visit.pop(0)
-            if dev_id in visited:
+        StatusNotification is not queued while offline, its timestamp tells
+        how far the clock of the charger is off. Heartbeat and
+        BootNotification carry no time of the charger.
+        """
+        if t is not None:
+            self._clock_offset = (t - datetime.now(tz=UTC)).total_seconds()
+
+    def is_historical(self, t: datetime | None) -> bool:
+        """Return True for samples older than BACKLOG_AGE, ie queued while offline.
+
+        The age is measured on the clock of the charger, see observe_clock.
+        """
+        if t is None:
+            return False
+        age = (datetime.now(tz=UTC) - t).total_seconds() + self._clock_offset
+        return age > BACKLOG_AGE
+
+    def record_backlog(
+        self, t: datetime, connector_id: int, bucket: list[MeasurandValue]
+    ):
+        """Keep the phase totals of a historical bucket for long-term statistics."""
+        for sv in bucket:
+            if sv.phase is not None:
                 continue
-            visited.add(dev_id)
+            measurand = sv.measurand or DEFAULT_MEASURAND
+            value, unit = sv.value, sv.unit
+            if measurand == DEFAULT_MEASURAND and unit is None:
+                unit = DEFAULT_ENERGY_UNIT
+            if unit == DEFAULT_ENERGY_UNIT:
+                value, unit = value / 1000, HA_ENERGY_UNIT
+            elif unit == DEFAULT_POWER_UNIT:
+                value, unit = value / 1000, HA_POWER_UNIT
+            self._backlog.append(
+                HistoricalSample(t, connector_id, measurand, value, unit)
+            )
 
-            for ent in entity_registry.async_entries_for_device(er, dev_id):
-                self.hass.async_create_task(
-                    entity_component.async_update_entity(self.hass, ent.entity_id)
-                )
-                updated_entities += 1
+    def schedule_update(self, historical: bool = False):
+        """Publish metrics, coalescing a burst of historical messages.
+
+        After an outage chargers flush queued meter values in a burst, only
+        the state after the last of them is published, once no historical
+        message arrived for BACKLOG_DEBOUNCE seconds.
+        """
+        if self._backlog_timer is not None:
+            self._backlog_timer.cancel()
+            self._backlog_timer = None
+        if historical:
+            self._backlog_timer = asyncio.get_running_loop().call_later(
+                BACKLOG_DEBOUNCE, self._flush_backlog
+            )
+        else:
+            self._flush_backlog()
+
+    def _flush_backlog(self):
+        """Publish metrics and import the collected backlog as statistics."""
+        self._backlog_timer = None
+        if self._backlog:
+            self.create_task(self._import_backlog())
+        self.create_task(self.update(self.settings.cpid))
+
+    async def _import_backlog(self):
+        # taken once running, samples stay queued if the charger disconnects first
+        samples, self._backlog = self._backlog, []
+        if samples:
+            _LOGGER.debug("%s: importing %i queued samples", self.id, len(samples))
+            await self.host.async_import_statistics(
+                self.id, self.settings.cpid, samples
+            )
 
-            for dev in dr.devices.values():
-                if dev.via_device_id == dev_id and dev.id not in visited:
-                    found_children += 1
-                    to_visit.append(dev.id)
+    def record_session(
+        self,
+        connector_id: int,
+        transaction_id,
+        start: datetime | None,
+        stop: datetime,
+        stop_reason: str | None,
+    ):
+        """Add a completed session to the ledger, from the session metrics."""
+        if self.ledger is None:
+            return
+        energy = self._metrics[(connector_id, csess.session_energy.value)].value
+        if start is not None:
+            duration = round((stop - start).total_seconds() / 60, 1)
+        else:
+            duration = self._metrics[(connector_id, csess.session_time.value)].value
+        record = SessionRecord(
+            cpid=self.settings.cpid,
+            connector_id=connector_id,
+            transaction_id=None if transaction_id is None else str(transaction_id),
+            id_tag=self._metrics[(connector_id, cstat.id_tag.value)].value or None,
+            start=start,
+            stop=stop,
+            energy_kwh=energy if isinstance(energy, int | float) else None,
+            duration_min=duration if isinstance(duration, int | float) else None,
+            stop_reason=stop_reason,
+        )
+        # not a task of the charger, the session is stored even if the charger
+        # disconnects right after stopping the transaction
+        self.host.create_task(self._store_session(record))
 
-        async_dispatcher_send(self.hass, DATA_UPDATED)
+    async def _store_session(self, record: SessionRecord):
+        try:
+            await self.host.async_add_executor_job(self.ledger.add, record)
+        except sqlite3.Error as e:
+            _LOGGER.error("%s: failed to store session in ledger: %s", self.id, e)
 
-    def get_authorization_status(self, id_tag):
+    async def get_authorization_status(self, id_tag):
         """Get the authorization status for an id_tag."""
         # authorize if its the tag of this charger used for remote start_transaction
         if id_tag == self._remote_id_tag:
             return AuthorizationStatus.accepted.value
-        config = self.hass.data[DOMAIN].get(CONFIG, {})
+        config = self.host.get_config()
         # get the default authorization status. Use accept if not configured
         default_auth_status = config.get(
             CONF_DEFAULT_AUTH_STATUS, AuthorizationStatus.accepted.value
         )
-        # get the authorization list
-        auth_list = config.get(CONF_AUTH_LIST, {})
-        # search for the entry, based on the id_tag
-        auth_status = None
-        for auth_entry in auth_list:
-            id_entry = auth_entry.get(CONF_ID_TAG, None)
-            if id_tag == id_entry:
-                # get the authorization status, use the default if not configured
-                auth_status = auth_entry.get(CONF_AUTH_STATUS, default_auth_status)
-                _LOGGER.debug(
-                    f"id_tag='{id_tag}' found in auth_list, authorization_status='{auth_status}'"
-                )
-                break
-
+        # ask the auth_list, then the id_tag stores
+        auth_status = await self.authorization.async_get_status(
+            id_tag, default_auth_status
+        )
         if auth_status is None:
             auth_status = default_auth_status
             _LOGGER.debug(
-                f"id_tag='{id_tag}' not found in auth_list, default authorization_status='{auth_status}'"
+                f"id_tag='{id_tag}' not found, default authorization_status='{auth_status}'"
             )
         return auth_status
 
-    def process_phases(self, data: list[MeasurandValue], connector_id: int = 0):
+    def local_auth_list(self) -> dict[str, str]:
+        """Return the authorization status of each id_tag of the auth_list."""
+        default_auth_status = self.host.get_config().get(
+            CONF_DEFAULT_AUTH_STATUS, AuthorizationStatus.accepted.value
+        )
+        return ConfigListProvider(self.host).entries(default_auth_status)
+
+    async def get_local_list_version(self) -> int | None:
+        """Return the version of the local authorization list, -1 if unsupported."""
+        return None
+
+    async def send_local_list(
+        self, version: int, entries: dict[str, str | None], full: bool
+    ) -> str:
+        """Send a full or differential local authorization list, return the status.
+
+        An entry without a status removes the id_tag from the list.
+        """
+        return UpdateStatus.not_supported.value
+
+    async def get_local_list_limits(self) -> tuple[int | None, int | None]:
+        """Return the entries allowed per update and in the list, None if unlimited."""
+        return None, None
+
+    async def _send_local_list_chunks(
+        self,
+        version: int,
+        entries: dict[str, str | None],
+        full: bool,
+        per_message: int | None,
+    ) -> tuple[int, str]:
+        """Send entries in updates of at most per_message, return the last version.
+
+        Only the first update of a full list replaces the list, the rest are
+        differential updates, each with the next version.
+        """
+        status = UpdateStatus.accepted.value
+        for n, chunk in enumerate(chunked(entries, per_message)):
+            status = await self.send_local_list(
+                version + n, chunk, full=full and n == 0
+            )
+            if status != UpdateStatus.accepted.value:
+                return version + n, status
+        return version + n, status
+
+    async def sync_local_list(self) -> bool:
+        """Bring the local authorization list of the charger up to date.
+
+        When the charger has the version sent last only the changes are sent,
+        otherwise the full list, split into updates as small as the charger
+        requires. id_tags beyond the size of its list are left out. Return
+        True if the charger has the list.
+        """
+        if prof.AUTH not in self._attr_supported_features or self.local_lists is None:
+            return False
+        version = await self.get_local_list_version()
+        if version is None or version < 0:
+            return False
+        per_message, max_length = await self.get_local_list_limits()
+        wanted = self.local_auth_list()
+        if max_length is not None and len(wanted) > max_length:
+            _LOGGER.warning(
+                "%s: local authorization list holds only %d of %d id_tags",
+                self.id,
+                max_length,
+                len(wanted),
+            )
+            wanted = dict(list(wanted.items())[:max_length])
+        sent = await self.local_lists.async_get(self.id)
+        status = None
+        if sent is not None and sent[0] == version:
+            changes = list_changes(sent[1], wanted)
+            if changes:
+                version, status = await self._send_local_list_chunks(
+                    version + 1, changes, False, per_message
+                )
+            else:
+                status = UpdateStatus.accepted.value
+        elif sent is None and version == 0 and not wanted:
+            # nothing to send to an empty list
+            status = UpdateStatus.accepted.value
+        if status in (None, UpdateStatus.version_mismatch.value):
+            version, status = await self._send_local_list_chunks(
+                max(version, sent[0] if sent else 0) + 1, wanted, True, per_message
+            )
+        if status != UpdateStatus.accepted.value:
+            _LOGGER.warning(
+                "%s: local authorization list not updated: %s", self.id, status
+            )
+            return False
+        await self.local_lists.async_set(self.id, version, wanted)
+        metric = self._metrics[(0, cstat.local_list_version.value)]
+        metric.value = version
+        metric.extra_attr = {"entries": len(wanted)}
+        return True
+
+    def process_phases(
+        self,
+        data: list[MeasurandValue],
+        connector_id: int = 0,
+        timestamp: float | None = None,
+    ):
         """Process per-phase MeterValues and aggregate them into per-connector metrics.
 
         Rules:
@@ -691,6 +1694,11 @@ class ChargePoint(cp):
             return (sum(nonzero) / len(nonzero)) if nonzero else 0.0
 
         measurand_data: dict[str, dict[str, float]] = {}
+        # per phase attributes are deferred while degraded, those shown are
+        # removed as they are stale, and the latest set on recovery
+        keep_phases = not self._degraded()
+        if keep_phases:
+            self._apply_deferred_phases()
 
         for item in data:
             # create ordered Dict for each measurand, eg {"voltage":{"unit":"V","L1-N":"230"...}}
@@ -712,11 +1720,18 @@ class ChargePoint(cp):
                 self._metrics[(target_cid, measurand)].extra_attr[om.unit.value] = unit
 
             measurand_data[measurand][phase] = value
-            self._metrics[(target_cid, measurand)].extra_attr[phase] = value
-            if context is not None:
-                self._metrics[(target_cid, measurand)].extra_attr[om.context.value] = (
-                    context
-                )
+            extra_attr = self._metrics[(target_cid, measurand)].extra_attr
+            if keep_phases:
+                extra_attr[phase] = value
+                if context is not None:
+                    extra_attr[om.context.value] = context
+            else:
+                deferred = self._deferred_phases.setdefault((target_cid, measurand), {})
+                deferred[phase] = value
+                extra_attr.pop(phase, None)
+                if context is not None:
+                    deferred[om.context.value] = context
+                    extra_attr.pop(om.context.value, None)
 
         line_phases_all = [
             Phase.l1.value,
@@ -808,6 +1823,7 @@ class ChargePoint(cp):
                 else:
                     self._metrics[(target_cid, metric)].value = metric_value
                     self._metrics[(target_cid, metric)].unit = metric_unit
+                self._metrics.record(target_cid, metric, timestamp)
 
     @staticmethod
     def get_energy_kwh(measurand_value: MeasurandValue) -> float:
@@ -821,10 +1837,17 @@ class ChargePoint(cp):
         meter_values: list[list[MeasurandValue]],
         is_transaction: bool,
         connector_id: int = 0,
+        timestamps: list[datetime | None] | None = None,
     ):
-        """Process all values from OCPP 1.6 MeterValues or OCPP 2.0.1 TransactionEvent."""
+        """Process all values from OCPP 1.6 MeterValues or OCPP 2.0.1 TransactionEvent.
 
-        for bucket in meter_values:
+        timestamps holds the sample time of each bucket, used for the history
+        of the metrics, the time of processing is used where it is None.
+        """
+
+        for n, bucket in enumerate(meter_values):
+            t = timestamps[n] if timestamps and n < len(timestamps) else None
+            ts = t.timestamp() if t is not None else None
             # --- Preselect best EAIR in this bucket (ignore Transaction.Begin) ---
             best_eair_idx = None
             best_pr = -1
@@ -929,6 +1952,7 @@ class ChargePoint(cp):
 
                     self._metrics[(target_cid, measurand)].value = value
                     self._metrics[(target_cid, measurand)].unit = unit
+                    self._metrics.record(target_cid, measurand, ts)
 
                     if location is not None:
                         self._metrics[(target_cid, measurand)].extra_attr[
@@ -978,10 +2002,15 @@ class ChargePoint(cp):
                     unprocessed.append(sampled_value)
 
             try:
-                self.process_phases(unprocessed, connector_id)
+                self.process_phases(unprocessed, connector_id, timestamp=ts)
             except TypeError:
                 self.process_phases(unprocessed)
 
+        if self.balancer is not None:
+            current = self._metrics.get((connector_id, Measurand.current_import.value))
+            if current is not None and isinstance(current.value, int | float):
+                self.balancer.update_current(self, connector_id, current.value)
+
     @property
     def supported_features(self) -> int:
         """Flag of Ocpp features that are supported."""
@@ -999,20 +2028,31 @@ class ChargePoint(cp):
             candidates.append(f"sensor.{base}_{meas_slug}")
 
         for entity_id in candidates:
-            st = self.hass.states.get(entity_id)
-            if st and st.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN, None):
-                return st.state
+            state = self.host.get_state(entity_id)
+            if state not in (STATE_UNAVAILABLE, STATE_UNKNOWN, None):
+                return state
         return None
 
-    async def notify_ha(self, msg: str, title: str = "Ocpp integration"):
-        """Notify user via HA web frontend."""
-        await self.hass.services.async_call(
-            PN_DOMAIN,
-            "create",
-            service_data={
-                "title": title,
-                "message": msg,
-            },
-            blocking=False,
-        )
-        return True
+    async def notify_ha(
+        self,
+        msg: str,
+        title: str = "Ocpp integration",
+        kind: str | None = None,
+        immediate: bool = False,
+    ):
+        """Notify user via HA web frontend, later while degraded.
+
+        With a digest, only the latest notification of a kind is sent, or
+        of the same message without a kind. Notifications answering an action
+        of the user are sent immediately, bypassing both.
+        """
+        if immediate:
+            return await self.host.async_notify(msg, title)
+        if self.digest is not None:
+            self.digest.add(self.id, msg, title, kind)
+            return True
+        if self.degradation is not None and self.degradation.defer_notification(
+            msg, title
+        ):
+            return True
+        return await self.host.async_notify(msg, title)
@@ -10,29 +10,41 @@ from homeassistant.config_entries import (
 import voluptuous as vol
 
 from .const import (
+    COMPRESSION_OVERRIDES,
     CONF_CPID,
     CONF_CPIDS,
     CONF_CSID,
     CONF_FORCE_SMART_CHARGING,
+    CONF_HISTORY_MEMORY,
+    CONF_MAX_TASKS,
     CONF_HOST,
     CONF_IDLE_INTERVAL,
     CONF_MAX_CURRENT,
     CONF_METER_INTERVAL,
     CONF_MONITORED_VARIABLES,
     CONF_MONITORED_VARIABLES_AUTOCONFIG,
+    CONF_NOTIFICATION_WINDOW,
     CONF_NUM_CONNECTORS,
     CONF_PORT,
+    CONF_SCHEMA_VALIDATION_POLICY,
+    CONF_SITE_MAX_CURRENT,
     CONF_SKIP_SCHEMA_VALIDATION,
     CONF_SSL,
     CONF_SSL_CERTFILE_PATH,
     CONF_SSL_KEYFILE_PATH,
     CONF_WEBSOCKET_CLOSE_TIMEOUT,
+    CONF_WEBSOCKET_COMPRESSION,
+    CONF_WEBSOCKET_COMPRESSION_OVERRIDE,
+    CONF_WEBSOCKET_MAX_QUEUE,
+    CONF_WEBSOCKET_MAX_SIZE,
     CONF_WEBSOCKET_PING_INTERVAL,
     CONF_WEBSOCKET_PING_TIMEOUT,
     CONF_WEBSOCKET_PING_TRIES,
     DEFAULT_CPID,
     DEFAULT_CSID,
     DEFAULT_FORCE_SMART_CHARGING,
+    DEFAULT_HISTORY_MEMORY,
+    DEFAULT_MAX_TASKS,
     DEFAULT_HOST,
     DEFAULT_IDLE_INTERVAL,
     DEFAULT_MAX_CURRENT,
@@ -40,19 +52,28 @@ from .const import (
     DEFAULT_METER_INTERVAL,
     DEFAULT_MONITORED_VARIABLES,
     DEFAULT_MONITORED_VARIABLES_AUTOCONFIG,
+    DEFAULT_NOTIFICATION_WINDOW,
     DEFAULT_NUM_CONNECTORS,
     DEFAULT_PORT,
+    DEFAULT_SCHEMA_VALIDATION_POLICY,
+    DEFAULT_SITE_MAX_CURRENT,
     DEFAULT_SKIP_SCHEMA_VALIDATION,
     DEFAULT_SSL,
     DEFAULT_SSL_CERTFILE_PATH,
     DEFAULT_SSL_KEYFILE_PATH,
     DEFAULT_WEBSOCKET_CLOSE_TIMEOUT,
+    DEFAULT_WEBSOCKET_COMPRESSION,
+    DEFAULT_WEBSOCKET_COMPRESSION_OVERRIDE,
+    DEFAULT_WEBSOCKET_MAX_QUEUE,
+    DEFAULT_WEBSOCKET_MAX_SIZE,
     DEFAULT_WEBSOCKET_PING_INTERVAL,
     DEFAULT_WEBSOCKET_PING_TIMEOUT,
     DEFAULT_WEBSOCKET_PING_TRIES,
     DOMAIN,
+    MAX_HISTORY_MEMORY,
     MEASURANDS,
 )
+from .chargepoint import parse_validation_policy
 
 STEP_USER_CS_DATA_SCHEMA = vol.Schema(
     {
@@ -74,6 +95,19 @@ STEP_USER_CS_DATA_SCHEMA = vol.Schema(
         vol.Required(
             CONF_WEBSOCKET_PING_TIMEOUT, default=DEFAULT_WEBSOCKET_PING_TIMEOUT
         ): int,
+        vol.Required(
+            CONF_WEBSOCKET_COMPRESSION, default=DEFAULT_WEBSOCKET_COMPRESSION
+        ): bool,
+        vol.Required(CONF_WEBSOCKET_MAX_SIZE, default=DEFAULT_WEBSOCKET_MAX_SIZE): int,
+        vol.Required(
+            CONF_WEBSOCKET_MAX_QUEUE, default=DEFAULT_WEBSOCKET_MAX_QUEUE
+        ): int,
+        vol.Optional(CONF_SITE_MAX_CURRENT, default=DEFAULT_SITE_MAX_CURRENT): vol.All(
+            int, vol.Range(min=0)
+        ),
+        vol.Optional(
+            CONF_NOTIFICATION_WINDOW, default=DEFAULT_NOTIFICATION_WINDOW
+        ): vol.All(int, vol.Range(min=0)),
     }
 )
 
@@ -90,6 +124,19 @@ STEP_USER_CP_DATA_SCHEMA = vol.Schema(
         vol.Required(
             CONF_SKIP_SCHEMA_VALIDATION, default=DEFAULT_SKIP_SCHEMA_VALIDATION
         ): bool,
+        vol.Optional(
+            CONF_SCHEMA_VALIDATION_POLICY, default=DEFAULT_SCHEMA_VALIDATION_POLICY
+        ): str,
+        vol.Optional(
+            CONF_WEBSOCKET_COMPRESSION_OVERRIDE,
+            default=DEFAULT_WEBSOCKET_COMPRESSION_OVERRIDE,
+        ): vol.In(COMPRESSION_OVERRIDES),
+        vol.Optional(CONF_HISTORY_MEMORY, default=DEFAULT_HISTORY_MEMORY): vol.All(
+            int, vol.Range(min=0, max=MAX_HISTORY_MEMORY)
+        ),
+        vol.Optional(CONF_MAX_TASKS, default=DEFAULT_MAX_TASKS): vol.All(
+            int, vol.Range(min=1)
+        ),
         vol.Required(
             CONF_FORCE_SMART_CHARGING, default=DEFAULT_FORCE_SMART_CHARGING
         ): bool,
@@ -163,6 +210,16 @@ class ConfigFlow(ConfigFlow, domain=DOMAIN):
             # Don't allow duplicate cpids to be used
             self._async_abort_entries_match({CONF_CPID: user_input[CONF_CPID]})
 
+            try:
+                parse_validation_policy(user_input.get(CONF_SCHEMA_VALIDATION_POLICY))
+            except ValueError:
+                errors[CONF_SCHEMA_VALIDATION_POLICY] = "invalid_validation_policy"
+                return self.async_show_form(
+                    step_id="cp_user",
+                    data_schema=STEP_USER_CP_DATA_SCHEMA,
+                    errors=errors,
+                )
+
             cp_data = {
                 **user_input,
                 CONF_NUM_CONNECTORS: self._detected_num_connectors,
@@ -8,6 +8,9 @@ from homeassistant.components.sensor import SensorDeviceClass
 import homeassistant.const as ha
 from ocpp.v16.enums import Measurand, UnitOfMeasure
 
+CONF_AUTH_CACHE_SIZE = "authorization_cache_size"
+CONF_AUTH_CACHE_TTL = "authorization_cache_ttl"
+CONF_AUTH_FILE = "authorization_file"
 CONF_AUTH_LIST = "authorization_list"
 CONF_AUTH_STATUS = "authorization_status"
 CONF_CPI = "charge_point_identity"
@@ -17,17 +20,22 @@ CONF_CSID = "csid"
 CONF_DEFAULT_AUTH_STATUS = "default_authorization_status"
 CONF_HOST = ha.CONF_HOST
 CONF_ID_TAG = "id_tag"
+CONF_HISTORY_MEMORY = "history_memory"
 CONF_ICON = ha.CONF_ICON
 CONF_IDLE_INTERVAL = "idle_interval"
 CONF_MAX_CURRENT = "max_current"
+CONF_MAX_TASKS = "max_tasks"
 CONF_METER_INTERVAL = "meter_interval"
 CONF_MODE = ha.CONF_MODE
 CONF_MONITORED_VARIABLES = ha.CONF_MONITORED_VARIABLES
 CONF_MONITORED_VARIABLES_AUTOCONFIG = "monitored_variables_autoconfig"
 CONF_NAME = ha.CONF_NAME
+CONF_NOTIFICATION_WINDOW = "notification_window"
 CONF_NUM_CONNECTORS = "num_connectors"
 CONF_PASSWORD = ha.CONF_PASSWORD
 CONF_PORT = ha.CONF_PORT
+CONF_SCHEMA_VALIDATION_POLICY = "schema_validation_policy"
+CONF_SITE_MAX_CURRENT = "site_max_current"
 CONF_SKIP_SCHEMA_VALIDATION = "skip_schema_validation"
 CONF_FORCE_SMART_CHARGING = "force_smart_charging"
 CONF_SSL = "ssl"
@@ -38,16 +46,32 @@ CONF_SUBPROTOCOL = "subprotocol"
 CONF_UNIT_OF_MEASUREMENT = ha.CONF_UNIT_OF_MEASUREMENT
 CONF_USERNAME = ha.CONF_USERNAME
 CONF_WEBSOCKET_CLOSE_TIMEOUT = "websocket_close_timeout"
+CONF_WEBSOCKET_COMPRESSION = "websocket_compression"
+CONF_WEBSOCKET_COMPRESSION_OVERRIDE = "websocket_compression_override"
+CONF_WEBSOCKET_MAX_QUEUE = "websocket_max_queue"
+CONF_WEBSOCKET_MAX_SIZE = "websocket_max_size"
 CONF_WEBSOCKET_PING_TRIES = "websocket_ping_tries"
 CONF_WEBSOCKET_PING_INTERVAL = "websocket_ping_interval"
 CONF_WEBSOCKET_PING_TIMEOUT = "websocket_ping_timeout"
 DATA_UPDATED = "ocpp_data_updated"
+DATA_STORES = "ocpp_stores"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10  # s changes are collected before a store is saved
+# Sent per charger cpid with the (connector, measurand) pairs of first values
+SIGNAL_NEW_METRICS = "ocpp_new_metrics_{}"
+DEFAULT_AUTH_CACHE_SIZE = 10000  # id_tags with a cached status
+DEFAULT_AUTH_CACHE_TTL = 300  # s a cached status is used
 DEFAULT_CSID = "central"
 DEFAULT_CPID = "charger"
+DEFAULT_HISTORY_MEMORY = 0  # kB of recent values per charger, 0 disables
 DEFAULT_HOST = "0.0.0.0"
 DEFAULT_MAX_CURRENT = 32
+DEFAULT_MAX_TASKS = 50  # background tasks pending per charger
+DEFAULT_NOTIFICATION_WINDOW = 30  # s notifications are collected, 0 sends each
 DEFAULT_NUM_CONNECTORS = 1
 DEFAULT_PORT = 9000
+DEFAULT_SCHEMA_VALIDATION_POLICY = ""
+DEFAULT_SITE_MAX_CURRENT = 0  # amps shared by all chargers, 0 disables
 DEFAULT_SKIP_SCHEMA_VALIDATION = False
 DEFAULT_FORCE_SMART_CHARGING = False
 DEFAULT_SSL = False
@@ -58,6 +82,10 @@ OCPP_2_0 = "ocpp2"
 DEFAULT_METER_INTERVAL = 60
 DEFAULT_IDLE_INTERVAL = 900
 DEFAULT_WEBSOCKET_CLOSE_TIMEOUT = 10
+DEFAULT_WEBSOCKET_COMPRESSION = True
+DEFAULT_WEBSOCKET_COMPRESSION_OVERRIDE = "default"
+DEFAULT_WEBSOCKET_MAX_QUEUE = 16  # frames, 0 for no limit
+DEFAULT_WEBSOCKET_MAX_SIZE = 2**20  # bytes, 0 for no limit
 DEFAULT_WEBSOCKET_PING_TRIES = 2
 DEFAULT_WEBSOCKET_PING_INTERVAL = 20
 DEFAULT_WEBSOCKET_PING_TIMEOUT = 20
@@ -65,6 +93,66 @@ DOMAIN = "ocpp"
 CONFIG = "config"
 ICON = "mdi:ev-station"
 SLEEP_TIME = 60
+# Upper bound of history_memory (kB)
+MAX_HISTORY_MEMORY = 4096
+# Meter values older than this (s) are a backlog of samples queued while offline
+BACKLOG_AGE = 300
+# Backlog metrics are published once no queued sample arrived for this long (s)
+BACKLOG_DEBOUNCE = 1.0
+# Site load balancing: change of measured current (A) that triggers a rebalance
+SITE_DEADBAND = 1.0
+# Current (A) left above the draw of a charger limited by its vehicle
+SITE_HEADROOM = 2.0
+# Charging profiles sent concurrently when limits change
+SITE_MAX_PARALLEL_PUSHES = 4
+# Response timeouts (s) of outbound requests per priority class, urgent
+# requests fail fast, reports and uploads may take the charger longer
+CALL_TIMEOUT_SAFETY = 5
+CALL_TIMEOUT_CONTROL = 10
+CALL_TIMEOUT_CONFIGURATION = 10
+CALL_TIMEOUT_DIAGNOSTICS = 30
+# Chargers a service call selecting several chargers is run for at a time
+FLEET_MAX_PARALLEL = 20
+# Firmware rollout: chargers updating at a time, failures before it pauses,
+# minutes after the delay before an update without a final status failed
+ROLLOUT_WINDOW = 2
+ROLLOUT_MAX_FAILURES = 1
+ROLLOUT_UPDATE_TIMEOUT = 60
+# OCPP 2.0.1 device model: attribute values kept per charger, longer values
+# (up to 2500 characters allowed) are read from the charger when needed
+DEVICE_MODEL_MAX_ENTRIES = 5000
+DEVICE_MODEL_MAX_VALUE = 500
+# Change (W) of the power of an OCPP 2.0.1 EVSE the charger pushes
+MONITOR_POWER_DELTA = 100
+# Interval (s) the TLS certificate files are checked for changes
+TLS_RELOAD_INTERVAL = 60
+# Entities added to Home Assistant at a time, other tasks run in between
+ENTITY_BATCH_SIZE = 100
+# Load shedding: interval (s) the event loop lag is measured, lag (s) and
+# background tasks pending over all chargers that raise the degradation level,
+# calm checks before it is lowered again and the interval (s) sensors of a
+# charger are updated at the minimal level
+LOAD_CHECK_INTERVAL = 1.0
+LOAD_LAG_REDUCED = 0.1
+LOAD_LAG_MINIMAL = 0.5
+LOAD_PENDING_TASKS = 200
+LOAD_RECOVERY_CHECKS = 10
+LOAD_PUBLISH_INTERVAL = 10.0
+# Notifications kept while degraded, sent once the load is back to normal
+LOAD_MAX_DEFERRED = 50
+# Notifications listed in a digest, more are only counted
+NOTIFICATION_DIGEST_MAX = 50
+# Authorization: time (s) an unknown id_tag is cached, time (s) a store may
+# take to answer before the default status is used, table of a SQLite file
+AUTH_CACHE_NEGATIVE_TTL = 60
+AUTH_LOOKUP_TIMEOUT = 5.0
+AUTH_FILE_TABLE = "id_tags"
+
+# Per charger websocket compression choices
+COMPRESSION_DEFAULT = "default"
+COMPRESSION_ON = "on"
+COMPRESSION_OFF = "off"
+COMPRESSION_OVERRIDES = [COMPRESSION_DEFAULT, COMPRESSION_ON, COMPRESSION_OFF]
 
 # Platforms
 NUMBER = "number"
@@ -154,6 +242,14 @@ class ChargerSystemSettings:
     force_smart_charging: bool
     connection: int | None = None  # number of this connection in central server
     num_connectors: int = DEFAULT_NUM_CONNECTORS
+    # per action overrides of skip_schema_validation, eg "MeterValues:10,*:always"
+    schema_validation_policy: str = DEFAULT_SCHEMA_VALIDATION_POLICY
+    # "default" follows websocket_compression of the central system
+    websocket_compression_override: str = DEFAULT_WEBSOCKET_COMPRESSION_OVERRIDE
+    # kB of recent values per charger, shared by its measurands and connectors
+    history_memory: int = DEFAULT_HISTORY_MEMORY
+    # background tasks pending at a time, more are dropped
+    max_tasks: int = DEFAULT_MAX_TASKS
 
 
 @dataclass
@@ -170,6 +266,12 @@ class CentralSystemSettings:
     websocket_ping_interval: int
     websocket_ping_timeout: int
     websocket_ping_tries: int
+    websocket_compression: bool = DEFAULT_WEBSOCKET_COMPRESSION
+    websocket_max_size: int = DEFAULT_WEBSOCKET_MAX_SIZE
+    websocket_max_queue: int = DEFAULT_WEBSOCKET_MAX_QUEUE
+    site_max_current: int = DEFAULT_SITE_MAX_CURRENT
+    # notifications are sent as a digest of this window (s), 0 sends each
+    notification_window: int = DEFAULT_NOTIFICATION_WINDOW
     cpids: list = field(default_factory=list)  # holds cpid config flow settings
     subprotocols: list = field(default_factory=lambda: DEFAULT_SUBPROTOCOLS)
 
@@ -0,0 +1,151 @@
+"""Shed non-essential work of the chargers when the event loop is overloaded."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from enum import IntEnum
+import logging
+
+from .const import (
+    LOAD_CHECK_INTERVAL,
+    LOAD_LAG_MINIMAL,
+    LOAD_LAG_REDUCED,
+    LOAD_MAX_DEFERRED,
+    LOAD_PENDING_TASKS,
+    LOAD_RECOVERY_CHECKS,
+)
+from .host import OcppHost
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class DegradationLevel(IntEnum):
+    """How much non-essential work is deferred, higher defers more."""
+
+    normal = 0
+    # notifications, diagnostic metrics and per phase attributes are deferred
+    reduced = 1
+    # sensors of a charger are also updated at most every LOAD_PUBLISH_INTERVAL
+    minimal = 2
+
+
+class DegradationController:
+    """Set the degradation level from the event loop lag and pending tasks.
+
+    The lag is how late a sleep of check_interval woke up, the pending tasks
+    are the background tasks of all chargers. The level is raised as soon as
+    a check exceeds a threshold and lowered one step after recovery_checks
+    calm checks in a row. Answering OCPP calls is never deferred, only the
+    work the chargers do after answering.
+    """
+
+    def __init__(
+        self,
+        host: OcppHost,
+        pending_tasks: Callable[[], int],
+        on_change: Callable[[DegradationLevel], None] | None = None,
+        check_interval: float = LOAD_CHECK_INTERVAL,
+        lag_reduced: float = LOAD_LAG_REDUCED,
+        lag_minimal: float = LOAD_LAG_MINIMAL,
+        max_pending: int = LOAD_PENDING_TASKS,
+        recovery_checks: int = LOAD_RECOVERY_CHECKS,
+        max_deferred: int = LOAD_MAX_DEFERRED,
+    ):
+        """Start at the normal level, call start() to measure the lag."""
+        self.host = host
+        self._pending_tasks = pending_tasks
+        self._on_change = on_change
+        self.check_interval = check_interval
+        self.lag_reduced = lag_reduced
+        self.lag_minimal = lag_minimal
+        self.max_pending = max_pending
+        self.recovery_checks = recovery_checks
+        self.max_deferred = max_deferred
+        self.level = DegradationLevel.normal
+        self.lag = 0.0
+        self.pending = 0
+        self._calm = 0
+        self._deferred: list[tuple[str, str]] = []
+        self.dropped_notifications = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Measure the event loop lag in the background."""
+        self._task = self.host.create_background_task(
+            self._run(), "ocpp degradation controller"
+        )
+
+    def stop(self):
+        """Stop measuring."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.check_interval)
+            self.check(max(0.0, loop.time() - start - self.check_interval))
+
+    def check(self, lag: float):
+        """Update the level from a lag measurement and the pending tasks."""
+        self.lag = lag
+        self.pending = self._pending_tasks()
+        if lag >= self.lag_minimal:
+            target = DegradationLevel.minimal
+        elif lag >= self.lag_reduced or self.pending >= self.max_pending:
+            target = DegradationLevel.reduced
+        else:
+            target = DegradationLevel.normal
+
+        if target > self.level:
+            self._calm = 0
+            self._set_level(target)
+        elif target < self.level:
+            self._calm += 1
+            if self._calm >= self.recovery_checks:
+                self._calm = 0
+                self._set_level(DegradationLevel(self.level - 1))
+        else:
+            self._calm = 0
+
+    def _set_level(self, level: DegradationLevel):
+        if level > self.level:
+            _LOGGER.warning(
+                "Event loop lag %.0f ms with %i tasks pending, degrading to %s",
+                self.lag * 1000,
+                self.pending,
+                level.name,
+            )
+        else:
+            _LOGGER.info("Load decreased, degradation level %s", level.name)
+        self.level = level
+        if level is DegradationLevel.normal and (
+            self._deferred or self.dropped_notifications
+        ):
+            self.host.create_task(self._send_deferred())
+        if self._on_change is not None:
+            self._on_change(level)
+
+    def defer_notification(self, msg: str, title: str) -> bool:
+        """Keep a notification while degraded, return False to send it now."""
+        if self.level is DegradationLevel.normal:
+            return False
+        if len(self._deferred) < self.max_deferred:
+            self._deferred.append((msg, title))
+        else:
+            self.dropped_notifications += 1
+        return True
+
+    async def _send_deferred(self):
+        deferred, self._deferred = self._deferred, []
+        dropped, self.dropped_notifications = self.dropped_notifications, 0
+        for msg, title in deferred:
+            await self.host.async_notify(msg, title)
+        if dropped:
+            await self.host.async_notify(
+                f"{dropped} more notifications were dropped while overloaded",
+                "Ocpp integration",
+            )
@@ -0,0 +1,94 @@
+"""Index of the device model reported by an OCPP 2.0.1 charging station."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import sys
+
+from .const import DEVICE_MODEL_MAX_ENTRIES, DEVICE_MODEL_MAX_VALUE
+
+ACTUAL = "Actual"
+# indexed like an attribute type, the maxLimit of the variable characteristics
+MAX_LIMIT = "MaxLimit"
+
+
+class DeviceModel:
+    """Attribute values of component variables, bounded in size.
+
+    Values are indexed by component, EVSE, connector, variable and attribute
+    type. The names in the keys are interned, so a name repeated across
+    thousands of variables is stored once. Values longer than max_value are
+    not kept and once max_entries values are held the least recently updated
+    is dropped; such values are read from the charger again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEVICE_MODEL_MAX_ENTRIES,
+        max_value: int = DEVICE_MODEL_MAX_VALUE,
+    ):
+        """Initialize."""
+        self.max_entries = max_entries
+        self.max_value = max_value
+        self._values: OrderedDict[tuple, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of values held."""
+        return len(self._values)
+
+    @staticmethod
+    def key(component: dict, variable: dict, attribute_type: str | None = None):
+        """Return the index key of a component variable attribute."""
+        evse = component.get("evse") or {}
+        return (
+            sys.intern(str(component.get("name") or "")),
+            sys.intern(str(component.get("instance") or "")),
+            int(evse.get("id") or 0),
+            int(evse.get("connector_id") or 0),
+            sys.intern(str(variable.get("name") or "")),
+            sys.intern(str(variable.get("instance") or "")),
+            sys.intern(str(attribute_type or ACTUAL)),
+        )
+
+    def get(
+        self, component: dict, variable: dict, attribute_type: str | None = None
+    ) -> str | None:
+        """Return a value, None if it is not known."""
+        return self._values.get(self.key(component, variable, attribute_type))
+
+    def set(
+        self,
+        component: dict,
+        variable: dict,
+        value: str | None,
+        attribute_type: str | None = None,
+    ):
+        """Store a value, a value that is not kept drops the one stored."""
+        key = self.key(component, variable, attribute_type)
+        if value is None or len(str(value)) > self.max_value:
+            self._values.pop(key, None)
+            return
+        self._values[key] = str(value)
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_entries:
+            self._values.popitem(last=False)
+
+    def discard(
+        self, component: dict, variable: dict, attribute_type: str | None = None
+    ):
+        """Forget a value, eg one that changes after a reboot."""
+        self._values.pop(self.key(component, variable, attribute_type), None)
+
+    def add_report(self, report_data: dict):
+        """Store the attributes of a NotifyReport reportData entry."""
+        component: dict = report_data.get("component", {}) or {}
+        variable: dict = report_data.get("variable", {}) or {}
+        for attr in report_data.get("variable_attribute", []) or []:
+            self.set(component, variable, attr.get("value"), attr.get("type"))
+        characteristics = report_data.get("variable_characteristics") or {}
+        if characteristics.get("max_limit") is not None:
+            self.set(component, variable, characteristics["max_limit"], MAX_LIMIT)
+
+    def clear(self):
+        """Forget all values."""
+        self._values.clear()
@@ -0,0 +1,101 @@
+"""Collect the notifications of chargers and send them as a digest."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from .const import DEFAULT_NOTIFICATION_WINDOW, NOTIFICATION_DIGEST_MAX
+from .degradation import DegradationController, DegradationLevel
+from .host import OcppHost
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class NotificationDigest:
+    """Send the notifications of a time window as one notification.
+
+    Notifications are kept by charger and kind, a notification without a
+    kind by its message, and a repeated one only counts. The window starts
+    with the first notification, the digest waits while the central system
+    is degraded. At most max_events are listed, others are only counted.
+    """
+
+    def __init__(
+        self,
+        host: OcppHost,
+        window: float = DEFAULT_NOTIFICATION_WINDOW,
+        degradation: DegradationController | None = None,
+        max_events: int = NOTIFICATION_DIGEST_MAX,
+    ):
+        """Initialize with no notifications."""
+        self.host = host
+        self.window = window
+        self.degradation = degradation
+        self.max_events = max_events
+        # latest message, title and count by (charger, kind or message)
+        self._events: dict[tuple[str, str], list] = {}
+        self.dropped = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        """Return the number of notifications waiting."""
+        return len(self._events)
+
+    def add(self, cp_id: str, msg: str, title: str, kind: str | None = None):
+        """Keep a notification for the next digest."""
+        key = (cp_id, kind or msg)
+        event = self._events.get(key)
+        if event is not None:
+            event[0] = msg
+            event[2] += 1
+        elif len(self._events) < self.max_events:
+            self._events[key] = [msg, title, 1]
+        else:
+            self.dropped += 1
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, self._window_closed
+            )
+
+    def _window_closed(self):
+        self._timer = None
+        if (
+            self.degradation is not None
+            and self.degradation.level > DegradationLevel.normal
+        ):
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, self._window_closed
+            )
+            return
+        self.host.create_task(self.async_send())
+
+    def message(self) -> tuple[str, str] | None:
+        """Return the title and message of the digest, None if empty."""
+        if not self._events:
+            return None
+        events = list(self._events.items())
+        title = events[0][1][1]
+        if len(events) == 1 and not self.dropped:
+            (cp_id, _), (msg, _, count) = events[0]
+            if count == 1:
+                return title, msg
+        lines = [f"{len(events) + self.dropped} charger events:"]
+        for (cp_id, _), (msg, _, count) in events:
+            repeated = f" ({count} times)" if count > 1 else ""
+            lines.append(f"- {cp_id}: {msg}{repeated}")
+        if self.dropped:
+            lines.append(f"- and {self.dropped} more")
+        return title, "\n".join(lines)
+
+    async def async_send(self):
+        """Send the notifications waiting now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        digest = self.message()
+        self._events = {}
+        self.dropped = 0
+        if digest is not None:
+            title, msg = digest
+            await self.host.async_notify(msg, title)
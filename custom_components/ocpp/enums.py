@@ -20,6 +20,9 @@ class HAChargerServices(str, Enum):
     service_trigger_custom_message = "trigger_custom_message"
     service_clear_profile = "clear_profile"
     service_data_transfer = "data_transfer"
+    service_get_history = "get_history"
+    service_get_sessions = "get_sessions"
+    service_firmware_rollout = "firmware_rollout"
 
 
 class HAChargerStatuses(str, Enum):
@@ -36,6 +39,13 @@ class HAChargerStatuses(str, Enum):
     firmware_status = "Status.Firmware"
     reconnects = "Reconnects"
     id_tag = "Id.Tag"
+    schema_validation = "Time.Schema.Validation"  # in ms
+    traffic_received = "Traffic.Received"  # in bytes on the wire
+    traffic_sent = "Traffic.Sent"  # in bytes on the wire
+    outbound_queue = "Queue.Outbound"  # requests waiting to be sent
+    tasks = "Tasks"  # background tasks pending
+    degradation = "Degradation"  # load shedding level of the central system
+    local_list_version = "Local.List.Version"  # local authorization list
 
 
 class HAChargerDetails(str, Enum):
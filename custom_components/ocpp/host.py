@@ -0,0 +1,586 @@
+"""Host interface decoupling the OCPP engine from Home Assistant."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+import json
+import logging
+import os
+from typing import Any
+
+from homeassistant.components.persistent_notification import DOMAIN as PN_DOMAIN
+from homeassistant.config_entries import SOURCE_INTEGRATION_DISCOVERY
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry, entity_component, entity_registry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import CONFIG, DATA_STORES, DATA_UPDATED, DOMAIN, SIGNAL_NEW_METRICS
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@dataclass
+class HostEntry:
+    """Minimal stand in for a config entry when running without Home Assistant."""
+
+    entry_id: str
+    data: dict = field(default_factory=dict)
+
+
+@dataclass
+class HostServiceCall:
+    """Minimal stand in for a service call when running without Home Assistant."""
+
+    domain: str
+    service: str
+    data: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class StateDelta:
+    """Metrics of one charger that changed since its previous update.
+
+    changes maps (connector, measurand) to (value, unit) and only holds
+    plain values so it can be pickled and sent to another process.
+    """
+
+    cp_id: str
+    cpid: str
+    changes: dict[tuple[int, str], tuple[Any, str | None]]
+
+
+@dataclass(frozen=True)
+class HistoricalSample:
+    """A meter value the charger queued while it was offline."""
+
+    timestamp: datetime
+    connector_id: int
+    measurand: str
+    value: float
+    unit: str | None
+
+
+def hourly_statistics(
+    cpid: str, samples: list[HistoricalSample]
+) -> list[tuple[dict, list[dict]]]:
+    """Aggregate samples into hourly long-term statistics.
+
+    Returns (metadata, statistics) pairs, one per connector and measurand.
+    Registers are cumulative so their last value is used as state and sum,
+    other measurands get the mean, min and max of the hour.
+    """
+    series: dict[tuple[int, str, str | None], dict[datetime, list[float]]] = (
+        defaultdict(lambda: defaultdict(list))
+    )
+    for sample in sorted(samples, key=lambda s: s.timestamp):
+        hour = sample.timestamp.replace(minute=0, second=0, microsecond=0)
+        key = (sample.connector_id, sample.measurand, sample.unit)
+        series[key][hour].append(sample.value)
+
+    result = []
+    for (conn, measurand, unit), hours in series.items():
+        cumulative = measurand.endswith("Register")
+        name = f"{cpid} {measurand}" if conn == 0 else f"{cpid} {conn} {measurand}"
+        metadata = {
+            "has_mean": not cumulative,
+            "has_sum": cumulative,
+            "name": name,
+            "source": DOMAIN,
+            "statistic_id": f"{DOMAIN}:{slugify(name)}",
+            "unit_of_measurement": unit,
+        }
+        stats = []
+        for hour, values in sorted(hours.items()):
+            if cumulative:
+                stats.append({"start": hour, "state": values[-1], "sum": values[-1]})
+            else:
+                stats.append(
+                    {
+                        "start": hour,
+                        "mean": sum(values) / len(values),
+                        "min": min(values),
+                        "max": max(values),
+                    }
+                )
+        result.append((metadata, stats))
+    return result
+
+
+def latest_hour_samples(samples: list[HistoricalSample]) -> list[HistoricalSample]:
+    """Return the samples in the latest hour of each connector and measurand."""
+
+    def hour(sample: HistoricalSample) -> datetime:
+        return sample.timestamp.replace(minute=0, second=0, microsecond=0)
+
+    latest: dict[tuple[int, str, str | None], datetime] = {}
+    for sample in samples:
+        key = (sample.connector_id, sample.measurand, sample.unit)
+        if key not in latest or hour(sample) > latest[key]:
+            latest[key] = hour(sample)
+    return [
+        sample
+        for sample in samples
+        if hour(sample) == latest[(sample.connector_id, sample.measurand, sample.unit)]
+    ]
+
+
+class HostStore:
+    """Data kept by a standalone host, with the methods of helpers.storage.Store.
+
+    The data is saved as JSON with its version and key like Home Assistant
+    does, delayed saves are written at once. Data saved before is loaded
+    without reading the file again and a file that is not valid JSON is
+    taken as no data. Without a path the data is only kept in memory.
+    """
+
+    def __init__(self, host: OcppHost, path: str | None, version: int, key: str):
+        """Initialize, the file is read by async_load."""
+        self.host = host
+        self.path = path
+        self.version = version
+        self.key = key
+        self._data: Any = None
+        self._lock = asyncio.Lock()
+        self._pending: asyncio.Task | None = None
+
+    async def async_load(self) -> Any:
+        """Return the data saved last, None if there is none."""
+        if self._data is not None or self.path is None:
+            return self._data
+
+        def _read():
+            if not os.path.exists(self.path):
+                return None
+            with open(self.path, encoding="utf-8") as f:
+                try:
+                    return json.load(f)["data"]
+                except (ValueError, KeyError, TypeError) as e:
+                    _LOGGER.error("Error loading %s: %s", self.path, e)
+                    return None
+
+        return await self.host.async_add_executor_job(_read)
+
+    async def async_save(self, data: Any):
+        """Save the data, it is serialized before this returns to the loop."""
+        self._data = data
+        if self.path is None:
+            return
+        text = json.dumps({"version": self.version, "key": self.key, "data": data})
+
+        def _write():
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, self.path)
+
+        async with self._lock:
+            try:
+                await self.host.async_add_executor_job(_write)
+            except OSError as e:
+                _LOGGER.error("Error writing config for %s: %s", self.key, e)
+
+    def async_delay_save(self, data_func: Callable[[], Any], delay: float = 0):
+        """Save the data returned by data_func, loads return it from now on."""
+        self._data = data_func()
+        self._pending = self.host.create_task(self.async_save(self._data))
+
+    async def async_flush(self):
+        """Wait until the data of the last delayed save is written."""
+        if self._pending is not None:
+            await self._pending
+            self._pending = None
+
+
+class OcppHost(ABC):
+    """Services the OCPP engine needs from the application hosting it."""
+
+    hass: HomeAssistant | None = None
+
+    @abstractmethod
+    def create_task(self, target: Coroutine) -> asyncio.Task:
+        """Schedule a coroutine to run in the background."""
+
+    @abstractmethod
+    def create_background_task(self, target: Coroutine, name: str) -> asyncio.Task:
+        """Schedule a coroutine that runs until cancelled, eg a watcher."""
+
+    @abstractmethod
+    async def async_add_executor_job(self, target: Callable, *args) -> Any:
+        """Run a blocking function in an executor."""
+
+    @abstractmethod
+    async def async_notify(self, msg: str, title: str) -> bool:
+        """Notify the user of an event."""
+
+    def get_state(self, entity_id: str) -> str | None:
+        """Return the last known state of an entity, if any."""
+        return None
+
+    def get_config(self) -> dict:
+        """Return the YAML configuration of the integration."""
+        return {}
+
+    def storage_path(self, name: str) -> str | None:
+        """Return the path of a file the integration may store data in."""
+        return None
+
+    @abstractmethod
+    def store(self, key: str, version: int = 1) -> Store | HostStore:
+        """Return the store of key, the same one to every caller."""
+
+    async def async_flush_stores(self):
+        """Write the data of delayed saves, eg before shutting down."""
+
+    @abstractmethod
+    def register_service(
+        self, name: str, handler: Callable, schema=None, supports_response=None
+    ):
+        """Register a service of the integration."""
+
+    @abstractmethod
+    def update_entry(self, entry, data: dict):
+        """Store updated configuration data of an entry."""
+
+    @abstractmethod
+    async def async_discover_charger(self, entry, cp_id: str):
+        """Handle a connection from a charger that is not configured yet."""
+
+    @abstractmethod
+    async def async_update_device_info(
+        self,
+        entry,
+        identifiers: set[tuple[str, str]],
+        manufacturer: str,
+        model: str,
+        sw_version: str,
+    ):
+        """Store nameplate information of a charger."""
+
+    @abstractmethod
+    async def async_publish_update(self, cp_id: str, cpid: str, metrics):
+        """Publish updated metrics of a charger."""
+
+    @abstractmethod
+    def publish_new_metrics(self, cpid: str, keys: list[tuple[int, str]]):
+        """Announce the (connector, measurand) pairs given their first value."""
+
+    @abstractmethod
+    async def async_import_statistics(
+        self, cp_id: str, cpid: str, samples: list[HistoricalSample]
+    ):
+        """Store meter values a charger queued while it was offline."""
+
+
+class HomeAssistantHost(OcppHost):
+    """Host backed by a running Home Assistant instance."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Instantiate a host for the given Home Assistant instance."""
+        self.hass = hass
+        # samples of the latest hour imported per charger, imported again later
+        self._imported: dict[str, list[HistoricalSample]] = {}
+
+    def create_task(self, target: Coroutine) -> asyncio.Task:
+        """Schedule a coroutine as a Home Assistant task."""
+        return self.hass.async_create_task(target)
+
+    def create_background_task(self, target: Coroutine, name: str) -> asyncio.Task:
+        """Schedule a coroutine Home Assistant does not wait for."""
+        return self.hass.async_create_background_task(target, name)
+
+    async def async_add_executor_job(self, target: Callable, *args) -> Any:
+        """Run a blocking function in the Home Assistant executor."""
+        return await self.hass.async_add_executor_job(target, *args)
+
+    async def async_notify(self, msg: str, title: str) -> bool:
+        """Notify user via HA web frontend."""
+        await self.hass.services.async_call(
+            PN_DOMAIN,
+            "create",
+            service_data={
+                "title": title,
+                "message": msg,
+            },
+            blocking=False,
+        )
+        return True
+
+    def get_state(self, entity_id: str) -> str | None:
+        """Return the state of an entity from the state machine."""
+        st = self.hass.states.get(entity_id)
+        return st.state if st else None
+
+    def get_config(self) -> dict:
+        """Return the YAML configuration stored by async_setup."""
+        return self.hass.data.get(DOMAIN, {}).get(CONFIG, {})
+
+    def storage_path(self, name: str) -> str | None:
+        """Return a path in the Home Assistant configuration directory."""
+        return self.hass.config.path(name)
+
+    def store(self, key: str, version: int = 1) -> Store:
+        """Return a Home Assistant store, shared by all hosts of the instance."""
+        stores: dict[str, Store] = self.hass.data.setdefault(DATA_STORES, {})
+        if key not in stores:
+            stores[key] = Store(self.hass, version, key)
+        return stores[key]
+
+    def register_service(
+        self, name: str, handler: Callable, schema=None, supports_response=None
+    ):
+        """Register a service with Home Assistant."""
+        kwargs = {}
+        if supports_response is not None:
+            kwargs["supports_response"] = supports_response
+        self.hass.services.async_register(DOMAIN, name, handler, schema, **kwargs)
+
+    def update_entry(self, entry, data: dict):
+        """Update the config entry, this reloads it if the data changed."""
+        self.hass.config_entries.async_update_entry(entry, data=data)
+
+    async def async_discover_charger(self, entry, cp_id: str):
+        """Start a discovery config flow for the charger."""
+        info = {"cp_id": cp_id, "entry": entry}
+        await self.hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": SOURCE_INTEGRATION_DISCOVERY},
+            data=info,
+        )
+
+    async def async_update_device_info(
+        self,
+        entry,
+        identifiers: set[tuple[str, str]],
+        manufacturer: str,
+        model: str,
+        sw_version: str,
+    ):
+        """Update the charger device in the device registry."""
+        registry = device_registry.async_get(self.hass)
+        registry.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            identifiers=identifiers,
+            manufacturer=manufacturer,
+            model=model,
+            sw_version=sw_version,
+        )
+
+    async def async_publish_update(self, cp_id: str, cpid: str, metrics):
+        """Update sensors values in HA (charger + connector child devices)."""
+        er = entity_registry.async_get(self.hass)
+        dr = device_registry.async_get(self.hass)
+        identifiers = {(DOMAIN, cpid), (DOMAIN, cp_id)}
+        root_dev = dr.async_get_device(identifiers)
+        if root_dev is None:
+            return
+
+        # index the child devices once instead of scanning per visited device
+        children: dict[str, list[str]] = {}
+        for entry_id in root_dev.config_entries:
+            for dev in device_registry.async_entries_for_config_entry(dr, entry_id):
+                if dev.via_device_id is not None:
+                    children.setdefault(dev.via_device_id, []).append(dev.id)
+
+        to_visit = [root_dev.id]
+        visited = set()
+
+        while to_visit:
+            dev_id = to_visit.pop()
+            if dev_id in visited:
+                continue
+            visited.add(dev_id)
+
+            for ent in entity_registry.async_entries_for_device(er, dev_id):
+                self.hass.async_create_task(
+                    entity_component.async_update_entity(self.hass, ent.entity_id)
+                )
+
+            to_visit.extend(children.get(dev_id, ()))
+
+        async_dispatcher_send(self.hass, DATA_UPDATED)
+
+    def publish_new_metrics(self, cpid: str, keys: list[tuple[int, str]]):
+        """Signal the sensor platform to add the sensors of these metrics."""
+        async_dispatcher_send(self.hass, SIGNAL_NEW_METRICS.format(cpid), keys)
+
+    async def async_import_statistics(
+        self, cp_id: str, cpid: str, samples: list[HistoricalSample]
+    ):
+        """Add queued meter values to the long-term statistics of the recorder.
+
+        An import replaces the statistics of each hour it has samples of, so
+        the samples imported before in the latest hour are imported again
+        with those of a later backlog.
+        """
+        if "recorder" not in self.hass.config.components:
+            _LOGGER.debug("Recorder not loaded, dropping %i samples", len(samples))
+            return
+        samples = [*self._imported.get(cp_id, []), *samples]
+        self._imported[cp_id] = latest_hour_samples(samples)
+        # the recorder is optional, only import it when it is running
+        from homeassistant.components.recorder.models import StatisticMeanType
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        for metadata, stats in hourly_statistics(cpid, samples):
+            has_mean = metadata.pop("has_mean")
+            metadata["mean_type"] = (
+                StatisticMeanType.ARITHMETIC if has_mean else StatisticMeanType.NONE
+            )
+            async_add_external_statistics(self.hass, metadata, stats)
+
+
+class StandaloneHost(OcppHost):
+    """Host for running the central system without Home Assistant.
+
+    Metric updates are published as StateDelta objects to the listeners
+    added with subscribe(), eg to forward them from a worker process.
+    """
+
+    def __init__(
+        self,
+        config: dict | None = None,
+        states: dict[str, str] | None = None,
+        storage_dir: str | None = None,
+    ):
+        """Instantiate a standalone host.
+
+        - config is the equivalent of the YAML configuration (authorization)
+        - states holds values returned by get_state, eg restored meter values
+        - storage_dir is where files like the session ledger are kept, none
+          are written without it
+        """
+        self.config = config or {}
+        self.states = states if states is not None else {}
+        self.storage_dir = storage_dir
+        self.services: dict[str, tuple[Callable, Any]] = {}
+        self.devices: dict[frozenset, dict] = {}
+        self.notifications: list[tuple[str, str]] = []
+        self.undiscovered: set[str] = set()
+        self.statistics: dict[str, list[HistoricalSample]] = defaultdict(list)
+        self._listeners: list[Callable[[StateDelta], None]] = []
+        self._snapshots: dict[str, dict] = {}
+        self._stores: dict[str, HostStore] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._background: set[asyncio.Task] = set()
+
+    def subscribe(self, listener: Callable[[StateDelta], None]) -> Callable[[], None]:
+        """Add a listener for state deltas, returns a function to remove it."""
+        self._listeners.append(listener)
+        return partial(self._listeners.remove, listener)
+
+    def create_task(self, target: Coroutine) -> asyncio.Task:
+        """Schedule a coroutine on the running loop and keep a reference."""
+        task = asyncio.get_running_loop().create_task(target)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def create_background_task(self, target: Coroutine, name: str) -> asyncio.Task:
+        """Schedule a coroutine that is not waited for with the other tasks."""
+        task = asyncio.get_running_loop().create_task(target, name=name)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def async_add_executor_job(self, target: Callable, *args) -> Any:
+        """Run a blocking function in the default executor."""
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+    async def async_notify(self, msg: str, title: str) -> bool:
+        """Log the notification and keep it for the embedding application."""
+        _LOGGER.info("%s: %s", title, msg)
+        self.notifications.append((title, msg))
+        return True
+
+    def get_state(self, entity_id: str) -> str | None:
+        """Return a state supplied by the embedding application."""
+        return self.states.get(entity_id)
+
+    def get_config(self) -> dict:
+        """Return the configuration supplied by the embedding application."""
+        return self.config
+
+    def storage_path(self, name: str) -> str | None:
+        """Return a path in the storage directory, if one was given."""
+        if self.storage_dir is None:
+            return None
+        return os.path.join(self.storage_dir, name)
+
+    def store(self, key: str, version: int = 1) -> HostStore:
+        """Return a store kept in the storage directory, if one was given."""
+        if key not in self._stores:
+            self._stores[key] = HostStore(self, self.storage_path(key), version, key)
+        return self._stores[key]
+
+    async def async_flush_stores(self):
+        """Wait for the delayed saves of all stores."""
+        await asyncio.gather(*(store.async_flush() for store in self._stores.values()))
+
+    def register_service(
+        self, name: str, handler: Callable, schema=None, supports_response=None
+    ):
+        """Keep the service so it can be invoked with async_call_service."""
+        self.services[name] = (handler, schema)
+
+    async def async_call_service(self, name: str, data: dict | None = None):
+        """Validate data against the service schema and invoke the handler."""
+        handler, schema = self.services[name]
+        data = schema(data or {}) if schema is not None else (data or {})
+        return await handler(HostServiceCall(DOMAIN, name, data))
+
+    def update_entry(self, entry, data: dict):
+        """Store the updated configuration data on the entry."""
+        entry.data = data
+
+    async def async_discover_charger(self, entry, cp_id: str):
+        """Record unknown chargers, they must be added to entry data to connect."""
+        _LOGGER.warning("Charger %s is not configured, closing connection", cp_id)
+        self.undiscovered.add(cp_id)
+
+    async def async_update_device_info(
+        self,
+        entry,
+        identifiers: set[tuple[str, str]],
+        manufacturer: str,
+        model: str,
+        sw_version: str,
+    ):
+        """Keep nameplate information of the charger."""
+        self.devices[frozenset(identifiers)] = {
+            "manufacturer": manufacturer,
+            "model": model,
+            "sw_version": sw_version,
+        }
+
+    async def async_publish_update(self, cp_id: str, cpid: str, metrics):
+        """Send metrics that changed since the previous update to listeners."""
+        snapshot = metrics.snapshot()
+        previous = self._snapshots.get(cp_id, {})
+        changes = {
+            key: value for key, value in snapshot.items() if previous.get(key) != value
+        }
+        self._snapshots[cp_id] = snapshot
+        if not changes:
+            return
+        delta = StateDelta(cp_id, cpid, changes)
+        for listener in list(self._listeners):
+            listener(delta)
+
+    def publish_new_metrics(self, cpid: str, keys: list[tuple[int, str]]):
+        """Do nothing, listeners get first values with the other changes."""
+
+    async def async_import_statistics(
+        self, cp_id: str, cpid: str, samples: list[HistoricalSample]
+    ):
+        """Keep queued meter values for the embedding application."""
+        self.statistics[cp_id].extend(samples)
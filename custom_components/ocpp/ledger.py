@@ -0,0 +1,169 @@
+"""Ledger of completed charging sessions stored in a local SQLite file."""
+
+from __future__ import annotations
+
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from datetime import datetime, UTC
+import sqlite3
+import threading
+
+# Groups sessions can be aggregated by, mapped to the columns selected
+GROUP_BY = {
+    "id_tag": "id_tag",
+    "cpid": "cpid",
+    "connector": "cpid, connector_id",
+    "day": "date(stop, 'unixepoch') AS day",
+    "month": "strftime('%Y-%m', stop, 'unixepoch') AS month",
+}
+MAX_PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    cpid TEXT NOT NULL,
+    connector_id INTEGER NOT NULL,
+    transaction_id TEXT,
+    id_tag TEXT,
+    start REAL,
+    stop REAL NOT NULL,
+    energy_kwh REAL,
+    duration_min REAL,
+    stop_reason TEXT,
+    UNIQUE (cpid, transaction_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_stop ON sessions (stop);
+CREATE INDEX IF NOT EXISTS idx_sessions_cpid ON sessions (cpid, connector_id, stop);
+CREATE INDEX IF NOT EXISTS idx_sessions_id_tag ON sessions (id_tag, stop);
+"""
+
+
+@dataclass(frozen=True)
+class SessionRecord:
+    """A completed charging session."""
+
+    cpid: str
+    connector_id: int
+    transaction_id: str | None
+    id_tag: str | None
+    start: datetime | None
+    stop: datetime
+    energy_kwh: float | None
+    duration_min: float | None
+    stop_reason: str | None
+
+
+def _epoch(t: datetime | None) -> float | None:
+    return t.timestamp() if t is not None else None
+
+
+def _iso(t: float | None) -> str | None:
+    return datetime.fromtimestamp(t, UTC).isoformat() if t is not None else None
+
+
+class SessionLedger:
+    """Completed sessions indexed by charger, connector, id tag and time.
+
+    All methods block on file access and must be run in an executor. A
+    connection is opened per call so they can run on any executor thread.
+    """
+
+    def __init__(self, path: str):
+        """Use the SQLite file at path, it is created on first use."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        if not self._ready:
+            with self._lock:
+                db.executescript(_SCHEMA)
+                self._ready = True
+        return db
+
+    def add(self, record: SessionRecord):
+        """Store a completed session, a retransmitted stop is ignored."""
+        row = asdict(record)
+        row["start"] = _epoch(record.start)
+        row["stop"] = _epoch(record.stop)
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR IGNORE INTO sessions (cpid, connector_id, transaction_id, id_tag,"
+                " start, stop, energy_kwh, duration_min, stop_reason) VALUES"
+                " (:cpid, :connector_id, :transaction_id, :id_tag, :start, :stop,"
+                " :energy_kwh, :duration_min, :stop_reason)",
+                row,
+            )
+
+    @staticmethod
+    def _where(
+        cpid: str | None,
+        connector_id: int | None,
+        id_tag: str | None,
+        start: datetime | None,
+        end: datetime | None,
+    ) -> tuple[str, list]:
+        clauses, params = [], []
+        for clause, value in (
+            ("cpid = ?", cpid),
+            ("connector_id = ?", connector_id),
+            ("id_tag = ?", id_tag),
+            ("stop >= ?", _epoch(start)),
+            ("stop < ?", _epoch(end)),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(
+        self,
+        cpid: str | None = None,
+        connector_id: int | None = None,
+        id_tag: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> list[dict]:
+        """Return a page of sessions that stopped in [start, end), newest first."""
+        where, params = self._where(cpid, connector_id, id_tag, start, end)
+        params += [min(limit, MAX_PAGE_SIZE), offset]
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT cpid, connector_id, transaction_id, id_tag, start, stop,"
+                " energy_kwh, duration_min, stop_reason FROM sessions"
+                f"{where} ORDER BY stop DESC LIMIT ? OFFSET ?",
+                params,
+            ).fetchall()
+        sessions = []
+        for row in rows:
+            session = dict(row)
+            session["start"] = _iso(session["start"])
+            session["stop"] = _iso(session["stop"])
+            sessions.append(session)
+        return sessions
+
+    def aggregate(
+        self,
+        group_by: str,
+        cpid: str | None = None,
+        connector_id: int | None = None,
+        id_tag: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[dict]:
+        """Return session count, energy and duration totals per group."""
+        columns = GROUP_BY[group_by]
+        keys = group_by if " AS " in columns else columns
+        where, params = self._where(cpid, connector_id, id_tag, start, end)
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                f"SELECT {columns}, COUNT(*) AS sessions,"
+                " SUM(energy_kwh) AS energy_kwh, SUM(duration_min) AS duration_min"
+                f" FROM sessions{where} GROUP BY {keys} ORDER BY {keys}",
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
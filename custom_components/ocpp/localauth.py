@@ -0,0 +1,73 @@
+"""Local authorization lists sent to the chargers."""
+
+from __future__ import annotations
+
+import logging
+
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+
+from .const import STORAGE_SAVE_DELAY
+from .host import HostStore
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def list_changes(sent: dict[str, str], wanted: dict[str, str]) -> dict[str, str | None]:
+    """Return the entries of a differential update, None removes an id_tag."""
+    changes: dict[str, str | None] = {
+        id_tag: status
+        for id_tag, status in wanted.items()
+        if sent.get(id_tag) != status
+    }
+    changes.update(dict.fromkeys(sent.keys() - wanted.keys()))
+    return changes
+
+
+def parse_limit(value) -> int | None:
+    """Return a positive limit reported by a charger, None if there is none."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return None
+    return limit if limit > 0 else None
+
+
+def chunked(entries: dict, size: int | None) -> list[dict]:
+    """Split entries into updates of at most size entries, at least one update."""
+    items = list(entries.items())
+    size = size or len(items) or 1
+    return [dict(items[i : i + size]) for i in range(0, max(len(items), 1), size)]
+
+
+class LocalListStore:
+    """The local authorization list last sent to each charger, by charger id.
+
+    A list is kept with the version the charger accepted it as, so later
+    changes are sent as a differential update.
+    """
+
+    def __init__(self, store: Store | HostStore):
+        """Initialize, the store is loaded on first use."""
+        self.store = store
+        self._lists: dict[str, dict] | None = None
+
+    async def async_get(self, cp_id: str) -> tuple[int, dict[str, str]] | None:
+        """Return the version and entries last sent to a charger, if any."""
+        if self._lists is None:
+            try:
+                self._lists = await self.store.async_load() or {}
+            except (HomeAssistantError, OSError, ValueError) as e:
+                _LOGGER.warning("Failed to load local authorization lists: %s", e)
+                self._lists = {}
+        stored = self._lists.get(cp_id)
+        if stored is None:
+            return None
+        return stored["version"], stored["entries"]
+
+    async def async_set(self, cp_id: str, version: int, entries: dict[str, str]):
+        """Keep the list a charger accepted."""
+        if self._lists is None:
+            await self.async_get(cp_id)
+        self._lists[cp_id] = {"version": version, "entries": dict(entries)}
+        self.store.async_delay_save(lambda: self._lists, STORAGE_SAVE_DELAY)
@@ -18,15 +18,11 @@ from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 
-from .api import CentralSystem
+from .api import CentralSystem, async_add_in_batches
 from .const import (
-    CONF_CPID,
-    CONF_CPIDS,
     CONF_MAX_CURRENT,
-    CONF_NUM_CONNECTORS,
     DATA_UPDATED,
     DEFAULT_MAX_CURRENT,
-    DEFAULT_NUM_CONNECTORS,
     DOMAIN,
     ICON,
 )
@@ -65,22 +61,7 @@ async def async_setup_entry(hass, entry, async_add_devices):
     entities: list[ChargePointNumber] = []
     ent_reg = er.async_get(hass)
 
-    for charger in entry.data[CONF_CPIDS]:
-        cp_id_settings = list(charger.values())[0]
-        cpid = cp_id_settings[CONF_CPID]
-
-        num_connectors = 1
-        for item in entry.data.get(CONF_CPIDS, []):
-            for _, cfg in item.items():
-                if cfg.get(CONF_CPID) == cpid:
-                    num_connectors = int(
-                        cfg.get(CONF_NUM_CONNECTORS, DEFAULT_NUM_CONNECTORS)
-                    )
-                    break
-            else:
-                continue
-            break
-
+    for cpid, cp_id_settings, num_connectors in central_system.configured_chargers():
         if num_connectors > 1:
             for desc in NUMBERS:
                 uid_flat = ".".join([NUMBER_DOMAIN, DOMAIN, cpid, desc.key])
@@ -141,7 +122,7 @@ async def async_setup_entry(hass, entry, async_add_devices):
                     )
                 )
 
-    async_add_devices(entities, False)
+    await async_add_in_batches(async_add_devices, entities)
 
 
 class ChargePointNumber(RestoreNumber, NumberEntity):
@@ -220,6 +201,8 @@ class ChargePointNumber(RestoreNumber, NumberEntity):
         """Set new value for max current (station-wide when _op_connector_id==0, otherwise per-connector).
 
         - Optimistic UI: move the slider immediately; attempt backend; never raise.
+        - While the slider is dragged only the latest value is sent, values
+          superseded before they were sent return None.
         """
         self._attr_native_value = float(value)
         self.async_write_ha_state()
@@ -228,7 +211,8 @@ class ChargePointNumber(RestoreNumber, NumberEntity):
             ok = await self.central_system.set_max_charge_rate_amps(
                 self.cpid, self._attr_native_value, connector_id=self._op_connector_id
             )
-            if not ok:
+            # None when superseded by a later value
+            if ok is False:
                 _LOGGER.warning(
                     "Set current limit rejected by CP (kept optimistic UI at %.1f A).",
                     value,
@@ -34,6 +34,8 @@ from ocpp.v16.enums import (
     ResetType,
     TriggerMessageStatus,
     UnlockStatus,
+    UpdateStatus,
+    UpdateType,
 )
 
 from .chargepoint import (
@@ -42,6 +44,8 @@ from .chargepoint import (
     SetVariableResult,
 )
 from .chargepoint import ChargePoint as cp
+from .host import OcppHost
+from .localauth import parse_limit
 
 from .enums import (
     ConfigurationKey as ckey,
@@ -86,7 +90,7 @@ class ChargePoint(cp):
         self,
         id: str,
         connection: ServerConnection,
-        hass: HomeAssistant,
+        host: HomeAssistant | OcppHost,
         entry: ConfigEntry,
         central: CentralSystemSettings,
         charger: ChargerSystemSettings,
@@ -97,12 +101,15 @@ class ChargePoint(cp):
             id,
             connection,
             OcppVersion.V16,
-            hass,
+            host,
             entry,
             central,
             charger,
         )
         self._active_tx: dict[int, int] = {}  # connector_id -> transaction_id
+        self._tx_start_time: dict[int, datetime] = {}  # connector_id -> start
+        # limits in amps and the max stack level, read once per connection
+        self._rate_settings: tuple[bool, int] | None = None
 
     async def get_number_of_connectors(self) -> int:
         """Return number of connectors on this charger."""
@@ -362,6 +369,7 @@ class ChargePoint(cp):
         purpose: ChargingProfilePurposeType | None = None,
     ) -> bool:
         """Clear charging profiles (per connector and/or purpose)."""
+        self.forget_profiles()
         try:
             req = call.ClearChargingProfile(
                 connector_id=(int(conn_id) if conn_id is not None else None),
@@ -386,17 +394,15 @@ class ChargePoint(cp):
         """Set charge rate."""
         if profile is not None:
             try:
-                req = call.SetChargingProfile(
-                    connector_id=int(conn_id), cs_charging_profiles=profile
-                )
-                resp = await self.call(req)
-                if resp.status == ChargingProfileStatus.accepted:
+                status = await self._set_charging_profile(int(conn_id), profile)
+                if status == ChargingProfileStatus.accepted:
                     return True
-                _LOGGER.warning("Custom SetChargingProfile rejected: %s", resp.status)
+                _LOGGER.warning("Custom SetChargingProfile rejected: %s", status)
             except Exception as ex:
                 _LOGGER.warning("Custom SetChargingProfile failed: %s", ex)
                 await self.notify_ha(
-                    "Warning: Set charging profile failed with response Exception"
+                    "Warning: Set charging profile failed with response Exception",
+                    immediate=True,
                 )
             return False
 
@@ -404,15 +410,25 @@ class ChargePoint(cp):
             _LOGGER.info("Smart charging is not supported by this charger")
             return False
 
-        # Determine allowed unit (default to Amps if not reported)
-        units_resp = await self.get_configuration(
-            ckey.charging_schedule_allowed_charging_rate_unit.value
-        )
-        if not units_resp:
-            _LOGGER.debug("Charging rate unit not reported; assuming Amps")
-            units_resp = om.current.value
+        if self._rate_settings is None:
+            # Determine allowed unit (default to Amps if not reported)
+            units_resp = await self.get_configuration(
+                ckey.charging_schedule_allowed_charging_rate_unit.value
+            )
+            if not units_resp:
+                _LOGGER.debug("Charging rate unit not reported; assuming Amps")
+                units_resp = om.current.value
+
+            try:
+                stack_level_resp = await self.get_configuration(
+                    ckey.charge_profile_max_stack_level.value
+                )
+                stack_level = int(stack_level_resp)
+            except Exception:
+                stack_level = 1
+            self._rate_settings = (om.current.value in units_resp, stack_level)
 
-        use_amps = om.current.value in units_resp
+        use_amps, stack_level = self._rate_settings
         limit_value = float(limit_amps if use_amps else limit_watts)
         units_value = (
             ChargingRateUnitType.amps.value
@@ -420,14 +436,6 @@ class ChargePoint(cp):
             else ChargingRateUnitType.watts.value
         )
 
-        try:
-            stack_level_resp = await self.get_configuration(
-                ckey.charge_profile_max_stack_level.value
-            )
-            stack_level = int(stack_level_resp)
-        except Exception:
-            stack_level = 1
-
         # Helper to build a simple relative schedule with one period
         def _mk_schedule(_units: str, _limit: float) -> dict:
             return {
@@ -452,9 +460,9 @@ class ChargePoint(cp):
 
         # Try ChargePointMaxProfile (connectorId = 0)
         try:
-            req = call.SetChargingProfile(
-                connector_id=0,
-                cs_charging_profiles={
+            status = await self._set_charging_profile(
+                0,
+                {
                     om.charging_profile_id.value: _profile_id(
                         ChargingProfilePurposeType.charge_point_max_profile.value, 0
                     ),
@@ -464,12 +472,11 @@ class ChargePoint(cp):
                     om.charging_schedule.value: _mk_schedule(units_value, limit_value),
                 },
             )
-            resp = await self.call(req)
-            if resp.status == ChargingProfileStatus.accepted:
+            if status == ChargingProfileStatus.accepted:
                 return True
             _LOGGER.debug(
                 "ChargePointMaxProfile not accepted (%s); will continue.",
-                resp.status,
+                status,
             )
         except Exception as ex:
             _LOGGER.debug("ChargePointMaxProfile call raised: %s", ex)
@@ -490,9 +497,9 @@ class ChargePoint(cp):
         if active_tx_id > 0:
             try:
                 txp_stack = max(1, stack_level)  # keep same or higher than defaults
-                req = call.SetChargingProfile(
-                    connector_id=target_cid,
-                    cs_charging_profiles={
+                status = await self._set_charging_profile(
+                    target_cid,
+                    {
                         om.charging_profile_id.value: _profile_id(
                             ChargingProfilePurposeType.tx_profile.value, target_cid
                         ),
@@ -506,11 +513,10 @@ class ChargePoint(cp):
                         om.transaction_id.value: active_tx_id,
                     },
                 )
-                resp = await self.call(req)
-                if resp.status == ChargingProfileStatus.accepted:
+                if status == ChargingProfileStatus.accepted:
                     txp_ok = True
                 else:
-                    _LOGGER.debug("TxProfile not accepted (%s).", resp.status)
+                    _LOGGER.debug("TxProfile not accepted (%s).", status)
             except Exception as ex:
                 _LOGGER.debug("TxProfile call raised: %s.", ex)
 
@@ -519,9 +525,9 @@ class ChargePoint(cp):
             tx_stack = max(
                 1, stack_level - 1
             )  # slightly lower to avoid overriding TxProfile
-            req = call.SetChargingProfile(
-                connector_id=target_cid,
-                cs_charging_profiles={
+            status = await self._set_charging_profile(
+                target_cid,
+                {
                     om.charging_profile_id.value: _profile_id(
                         ChargingProfilePurposeType.tx_default_profile.value, target_cid
                     ),
@@ -531,14 +537,13 @@ class ChargePoint(cp):
                     om.charging_schedule.value: _mk_schedule(units_value, limit_value),
                 },
             )
-            resp = await self.call(req)
-            if resp.status == ChargingProfileStatus.accepted:
+            if status == ChargingProfileStatus.accepted:
                 txd_ok = True
             else:
-                _LOGGER.debug("Set TxDefaultProfile rejected: %s", resp.status)
+                _LOGGER.debug("Set TxDefaultProfile rejected: %s", status)
                 if txp_ok:
                     _LOGGER.debug(
-                        f"Note: Active TxProfile applied, but TxDefaultProfile was rejected ({resp.status})."
+                        f"Note: Active TxProfile applied, but TxDefaultProfile was rejected ({status})."
                     )
         except Exception as ex:
             _LOGGER.debug("Set TxDefaultProfile failed: %s", ex)
@@ -549,6 +554,32 @@ class ChargePoint(cp):
 
         return bool(txp_ok or txd_ok)
 
+    async def _set_charging_profile(self, connector_id: int, profile: dict) -> str:
+        """Send a charging profile unless the charger accepted the same one.
+
+        Returns the status of the response, accepted for a skipped profile.
+        """
+        key = (
+            connector_id,
+            profile.get(om.charging_profile_purpose.value),
+            profile.get(om.charging_profile_id.value),
+        )
+        if self.profile_accepted(key, profile):
+            _LOGGER.debug("%s: charging profile %s already set", self.id, key)
+            return ChargingProfileStatus.accepted
+        req = call.SetChargingProfile(
+            connector_id=connector_id, cs_charging_profiles=profile
+        )
+        resp = await self.call(req)
+        if resp.status == ChargingProfileStatus.accepted:
+            self.remember_profile(key, profile)
+        return resp.status
+
+    def forget_profiles(self):
+        """Forget the accepted profiles and charging rate settings."""
+        super().forget_profiles()
+        self._rate_settings = None
+
     async def set_availability(self, state: bool = True, connector_id: int | None = 0):
         """Change availability."""
         try:
@@ -586,13 +617,13 @@ class ChargePoint(cp):
                 }
                 if metric is not None:
                     metric.extra_attr[pending_key] = info
-                self.hass.async_create_task(self.update(self.settings.cpid))
+                self.create_task(self.update(self.settings.cpid))
                 return True
 
             if status == AvailabilityStatus.accepted:
                 if metric is not None:
                     metric.extra_attr.pop(pending_key, None)
-                self.hass.async_create_task(self.update(self.settings.cpid))
+                self.create_task(self.update(self.settings.cpid))
                 return True
 
             _LOGGER.warning("Failed with response: %s", resp.status)
@@ -601,7 +632,8 @@ class ChargePoint(cp):
         except Exception:
             _LOGGER.warning("Failed with response: %s", resp.status)
             await self.notify_ha(
-                f"Warning: Set availability failed with response {resp.status}"
+                f"Warning: Set availability failed with response {resp.status}",
+                immediate=True,
             )
             return False
 
@@ -617,7 +649,8 @@ class ChargePoint(cp):
         else:
             _LOGGER.warning("Failed with response: %s", resp.status)
             await self.notify_ha(
-                f"Warning: Start transaction failed with response {resp.status}"
+                f"Warning: Start transaction failed with response {resp.status}",
+                immediate=True,
             )
             return False
 
@@ -660,7 +693,8 @@ class ChargePoint(cp):
 
         _LOGGER.warning("Failed with response: %s", resp.status)
         await self.notify_ha(
-            f"Warning: Stop transaction failed with response {resp.status}"
+            f"Warning: Stop transaction failed with response {resp.status}",
+            immediate=True,
         )
         return False
 
@@ -673,7 +707,9 @@ class ChargePoint(cp):
             return True
         else:
             _LOGGER.warning("Failed with response: %s", resp.status)
-            await self.notify_ha(f"Warning: Reset failed with response {resp.status}")
+            await self.notify_ha(
+                f"Warning: Reset failed with response {resp.status}", immediate=True
+            )
             return False
 
     async def unlock(self, connector_id: int = 1):
@@ -684,7 +720,9 @@ class ChargePoint(cp):
             return True
         else:
             _LOGGER.warning("Failed with response: %s", resp.status)
-            await self.notify_ha(f"Warning: Unlock failed with response {resp.status}")
+            await self.notify_ha(
+                f"Warning: Unlock failed with response {resp.status}", immediate=True
+            )
             return False
 
     async def update_firmware(self, firmware_url: str, wait_time: int = 0):
@@ -762,10 +800,46 @@ class ChargePoint(cp):
         else:
             _LOGGER.warning("Failed with response: %s", resp.status)
             await self.notify_ha(
-                f"Warning: Data transfer failed with response {resp.status}"
+                f"Warning: Data transfer failed with response {resp.status}",
+                immediate=True,
             )
             return False
 
+    async def get_local_list_version(self) -> int | None:
+        """Return the version of the local authorization list, -1 if unsupported."""
+        resp = await self.call(call.GetLocalListVersion())
+        return None if resp is None else resp.list_version
+
+    async def get_local_list_limits(self) -> tuple[int | None, int | None]:
+        """Return SendLocalListMaxLength and LocalAuthListMaxLength."""
+        keys = [
+            ckey.send_local_list_max_length.value,
+            ckey.local_auth_list_max_length.value,
+        ]
+        resp = await self.call(call.GetConfiguration(key=keys))
+        values = {
+            kv[om.key.value]: kv.get(om.value.value)
+            for kv in getattr(resp, "configuration_key", None) or []
+        }
+        return parse_limit(values.get(keys[0])), parse_limit(values.get(keys[1]))
+
+    async def send_local_list(
+        self, version: int, entries: dict[str, str | None], full: bool
+    ) -> str:
+        """Send a full or differential local authorization list, return the status."""
+        req = call.SendLocalList(
+            list_version=version,
+            update_type=UpdateType.full if full else UpdateType.differential,
+            local_authorization_list=[
+                {"id_tag": id_tag}
+                if status is None
+                else {"id_tag": id_tag, "id_tag_info": {om.status.value: status}}
+                for id_tag, status in entries.items()
+            ],
+        )
+        resp = await self.call(req)
+        return UpdateStatus.failed.value if resp is None else resp.status
+
     async def get_configuration(self, key: str = "") -> str:
         """Get Configuration of charger for supported keys else return None."""
         if key == "":
@@ -781,7 +855,9 @@ class ChargePoint(cp):
             return value
         if resp.unknown_key:
             _LOGGER.warning("Get Configuration returned unknown key for: %s", key)
-            await self.notify_ha(f"Warning: charger reports {key} is unknown")
+            await self.notify_ha(
+                f"Warning: charger reports {key} is unknown", immediate=True
+            )
             return "Unknown"
 
     async def configure(self, key: str, value: str):
@@ -811,7 +887,7 @@ class ChargePoint(cp):
 
             if key_value.get(om.readonly.name, False):
                 _LOGGER.warning("%s is a read only setting", key)
-                await self.notify_ha(f"Warning: {key} is read-only")
+                await self.notify_ha(f"Warning: {key} is read-only", immediate=True)
 
         req = call.ChangeConfiguration(key=key, value=value)
 
@@ -823,13 +899,16 @@ class ChargePoint(cp):
         ]:
             _LOGGER.warning("%s while setting %s to %s", resp.status, key, value)
             await self.notify_ha(
-                f"Warning: charger reported {resp.status} while setting {key}={value}"
+                f"Warning: charger reported {resp.status} while setting {key}={value}",
+                immediate=True,
             )
             return resp.status
 
         if resp.status == ConfigurationStatus.reboot_required:
             self._requires_reboot = True
-            await self.notify_ha(f"A reboot is required to apply {key}={value}")
+            await self.notify_ha(
+                f"A reboot is required to apply {key}={value}", immediate=True
+            )
             return SetVariableResult.reboot_required
 
         return SetVariableResult.accepted
@@ -905,8 +984,15 @@ class ChargePoint(cp):
                 transaction_id,
             )
 
+        # Queued buckets may arrive out of order, process the newest last
+        stamped = sorted(
+            ((self.parse_timestamp(b.get("timestamp")), b) for b in meter_value),
+            key=lambda item: item[0] or datetime.max.replace(tzinfo=UTC),
+        )
+        historical = bool(stamped) and all(self.is_historical(t) for t, _ in stamped)
+
         meter_values: list[list[MeasurandValue]] = []
-        for bucket in meter_value:
+        for t, bucket in stamped:
             measurands: list[MeasurandValue] = []
             for sampled_value in bucket.get(om.sampled_value.name, []):
                 measurand = sampled_value.get(om.measurand.value, None)
@@ -924,8 +1010,15 @@ class ChargePoint(cp):
                     MeasurandValue(measurand, value, phase, unit, context, location)
                 )
             meter_values.append(measurands)
-
-        self.process_measurands(meter_values, transaction_matches, connector_id)
+            if self.is_historical(t):
+                self.record_backlog(t, connector_id, measurands)
+
+        self.process_measurands(
+            meter_values,
+            transaction_matches,
+            connector_id,
+            timestamps=[t for t, _ in stamped],
+        )
 
         if transaction_matches:
             try:
@@ -937,7 +1030,7 @@ class ChargePoint(cp):
             )
             self._metrics[(connector_id, csess.session_time.value)].unit = "min"
 
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        self.schedule_update(historical)
         return call_result.MeterValues()
 
     @on(Action.boot_notification)
@@ -951,13 +1044,14 @@ class ChargePoint(cp):
         self.received_boot_notification = True
         _LOGGER.debug("Received boot notification for %s: %s", self.id, kwargs)
 
-        self.hass.async_create_task(self.async_update_device_info_v16(kwargs))
+        self.create_task(self.async_update_device_info_v16(kwargs))
         self._register_boot_notification()
         return resp
 
     @on(Action.status_notification)
     def on_status_notification(self, connector_id, error_code, status, **kwargs):
         """Handle a status notification."""
+        self.observe_clock(self.parse_timestamp(kwargs.get("timestamp")))
 
         if connector_id == 0 or connector_id is None:
             self._metrics[(0, cstat.status.value)].value = status
@@ -987,23 +1081,27 @@ class ChargePoint(cp):
             self._metrics[(connector_id or 1, cstat.id_tag.value)].value = ""
             self._metrics[(connector_id or 1, csess.transaction_id.value)].value = 0
 
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        self.create_task(self.update(self.settings.cpid))
         return call_result.StatusNotification()
 
     @on(Action.firmware_status_notification)
     def on_firmware_status(self, status, **kwargs):
         """Handle firmware status notification."""
         self._metrics[0][cstat.firmware_status.value].value = status
-        self.hass.async_create_task(self.update(self.settings.cpid))
-        self.hass.async_create_task(self.notify_ha(f"Firmware upload status: {status}"))
+        if self.rollout is not None:
+            self.rollout.firmware_status(self.settings.cpid, status)
+        self.create_task(self.update(self.settings.cpid))
+        self.create_task(
+            self.notify_ha(f"Firmware upload status: {status}", kind="firmware")
+        )
         return call_result.FirmwareStatusNotification()
 
     @on(Action.diagnostics_status_notification)
     def on_diagnostics_status(self, status, **kwargs):
         """Handle diagnostics status notification."""
         _LOGGER.info("Diagnostics upload status: %s", status)
-        self.hass.async_create_task(
-            self.notify_ha(f"Diagnostics upload status: {status}")
+        self.create_task(
+            self.notify_ha(f"Diagnostics upload status: {status}", kind="diagnostics")
         )
         return call_result.DiagnosticsStatusNotification()
 
@@ -1016,23 +1114,23 @@ class ChargePoint(cp):
             timestamp,
             kwargs.get(om.tech_info.name, "none"),
         )
-        self.hass.async_create_task(
+        self.create_task(
             self.notify_ha(f"Security event notification received: {type}")
         )
         return call_result.SecurityEventNotification()
 
     @on(Action.authorize)
-    def on_authorize(self, id_tag, **kwargs):
+    async def on_authorize(self, id_tag, **kwargs):
         """Handle an Authorization request."""
         self._metrics[0][cstat.id_tag.value].value = id_tag
-        auth_status = self.get_authorization_status(id_tag)
+        auth_status = await self.get_authorization_status(id_tag)
         return call_result.Authorize(id_tag_info={om.status.value: auth_status})
 
     @on(Action.start_transaction)
-    def on_start_transaction(self, connector_id, id_tag, meter_start, **kwargs):
+    async def on_start_transaction(self, connector_id, id_tag, meter_start, **kwargs):
         """Handle a Start Transaction request."""
 
-        auth_status = self.get_authorization_status(id_tag)
+        auth_status = await self.get_authorization_status(id_tag)
         if auth_status == AuthorizationStatus.accepted.value:
             tx_id = int(time.time())
             self._active_tx[connector_id] = tx_id
@@ -1040,6 +1138,11 @@ class ChargePoint(cp):
             self._metrics[(connector_id, cstat.id_tag.value)].value = id_tag
             self._metrics[(connector_id, cstat.stop_reason.value)].value = ""
             self._metrics[(connector_id, csess.transaction_id.value)].value = tx_id
+            self._tx_start_time[connector_id] = self.parse_timestamp(
+                kwargs.get("timestamp")
+            ) or datetime.now(tz=UTC)
+            if self.balancer is not None:
+                self.balancer.session_started(self, connector_id)
             try:
                 meter_start_kwh = float(meter_start) / 1000.0
             except Exception:
@@ -1068,7 +1171,7 @@ class ChargePoint(cp):
                 transaction_id=0,
             )
 
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        self.create_task(self.update(self.settings.cpid))
         return result
 
     @on(Action.stop_transaction)
@@ -1107,6 +1210,16 @@ class ChargePoint(cp):
                 session_kwh = 0.0
             self._metrics[(conn, csess.session_energy.value)].value = session_kwh
 
+        self.record_session(
+            conn,
+            transaction_id,
+            self._tx_start_time.pop(conn, None),
+            self.parse_timestamp(timestamp) or datetime.now(tz=UTC),
+            kwargs.get(om.reason.name),
+        )
+        if self.balancer is not None:
+            self.balancer.session_stopped(self, conn)
+
         for meas in [
             Measurand.current_import.value,
             Measurand.power_active_import.value,
@@ -1119,7 +1232,7 @@ class ChargePoint(cp):
             if key in self._metrics:
                 self._metrics[key].value = 0
 
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        self.create_task(self.update(self.settings.cpid))
         return call_result.StopTransaction(
             id_tag_info={om.status.value: AuthorizationStatus.accepted.value}
         )
@@ -1137,5 +1250,5 @@ class ChargePoint(cp):
         """Handle a Heartbeat."""
         now = datetime.now(tz=UTC)
         self._metrics[0][cstat.heartbeat.value].value = now
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        self.create_task(self.update(self.settings.cpid))
         return call_result.Heartbeat(current_time=now.strftime("%Y-%m-%dT%H:%M:%SZ"))
@@ -2,14 +2,16 @@
 
 import asyncio
 import contextlib
-from datetime import datetime, UTC
-from dataclasses import dataclass, field
+from datetime import datetime, timedelta, UTC
+from dataclasses import asdict, dataclass, field
 import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ServiceValidationError, HomeAssistantError
+from homeassistant.util import slugify
+import voluptuous as vol
 from websockets.asyncio.server import ServerConnection
 
 import ocpp.exceptions
@@ -23,9 +25,11 @@ from ocpp.v201.enums import (
     GetVariableStatusEnumType,
     IdTokenEnumType,
     MeasurandEnumType,
+    MonitorEnumType,
     OperationalStatusEnumType,
     ResetEnumType,
     ResetStatusEnumType,
+    SetMonitoringStatusEnumType,
     SetVariableStatusEnumType,
     AuthorizationStatusEnumType,
     TransactionEventEnumType,
@@ -36,6 +40,9 @@ from ocpp.v201.enums import (
     ChargingRateUnitEnumType,
     ChargingProfileKindEnumType,
     ChargingProfileStatusEnumType,
+    SendLocalListStatusEnumType,
+    UpdateEnumType,
+    UpdateFirmwareStatusEnumType,
 )
 
 from .chargepoint import (
@@ -44,7 +51,10 @@ from .chargepoint import (
 )
 from .chargepoint import ChargePoint as cp
 
+from .devicemodel import MAX_LIMIT, DeviceModel
 from .enums import Profiles
+from .host import OcppHost
+from .localauth import parse_limit
 
 from .enums import (
     HAChargerStatuses as cstat,
@@ -56,11 +66,22 @@ from .const import (
     ChargerSystemSettings,
     DOMAIN,
     HA_ENERGY_UNIT,
+    MONITOR_POWER_DELTA,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
 )
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 logging.getLogger(DOMAIN).setLevel(logging.INFO)
 
+# Variables the charger is asked to monitor and push the changes of in
+# NotifyEvent: component, variable, once per EVSE, monitor type and value,
+# severity (0 danger to 9 debug)
+MONITORS: tuple[tuple[str, str, bool, MonitorEnumType, float, int], ...] = (
+    ("ChargingStation", "Problem", False, MonitorEnumType.delta, 0, 7),
+    ("EVSE", "Power", True, MonitorEnumType.delta, MONITOR_POWER_DELTA, 8),
+)
+
 
 @dataclass
 class InventoryReport:
@@ -73,12 +94,36 @@ class InventoryReport:
     local_auth_available: bool = False
     tx_updated_measurands: list[MeasurandEnumType] = field(default_factory=list)
 
+    def as_dict(self) -> dict:
+        """Return the report as JSON serializable data."""
+        data = asdict(self)
+        data["tx_updated_measurands"] = [m.value for m in self.tx_updated_measurands]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "InventoryReport":
+        """Return the report stored by as_dict."""
+        report = cls(**data)
+        report.tx_updated_measurands = [
+            MeasurandEnumType(m) for m in report.tx_updated_measurands
+        ]
+        return report
+
+
+def station_fingerprint(charging_station: dict) -> str:
+    """Return the identity of a station and its firmware from a BootNotification."""
+    return "|".join(
+        str(charging_station.get(k) or "")
+        for k in ("vendor_name", "model", "serial_number", "firmware_version")
+    )
+
 
 class ChargePoint(cp):
     """Server side representation of a charger."""
 
     _inventory: InventoryReport | None = None
     _wait_inventory: asyncio.Event | None = None
+    _fingerprint: str | None = None
     _connector_status: list[list[ConnectorStatusEnumType | None]]
     _tx_start_time: dict[int, datetime]
     _global_to_evse: dict[int, tuple[int, int]]  # global_idx -> (evse_id, connector_id)
@@ -91,7 +136,7 @@ class ChargePoint(cp):
         self,
         id: str,
         connection: ServerConnection,
-        hass: HomeAssistant,
+        host: HomeAssistant | OcppHost,
         entry: ConfigEntry,
         central: CentralSystemSettings,
         charger: ChargerSystemSettings,
@@ -102,7 +147,7 @@ class ChargePoint(cp):
             id,
             connection,
             connection.subprotocol.replace("ocpp", ""),
-            hass,
+            host,
             entry,
             central,
             charger,
@@ -112,6 +157,11 @@ class ChargePoint(cp):
         self._evse_to_global: dict[tuple[int, int], int] = {}
         self._pending_status_notifications: list[tuple[str, str, int, int]] = []
         self._connector_status = []
+        self._inventory_store = self.host.store(
+            f"{DOMAIN}.inventory.{slugify(id)}", STORAGE_VERSION
+        )
+        self.device_model = DeviceModel()
+        self._monitor_ids: dict[str, int] = {}
 
     # --- Connector mapping helpers (EVSE <-> global index) ---
     def _build_connector_map(self) -> bool:
@@ -209,7 +259,7 @@ class ChargePoint(cp):
         self._pending_status_notifications = []
         for t, st, evse_id, conn_id in pending:
             self._apply_status_notification(t, st, evse_id, conn_id)
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        self.create_task(self.update(self.settings.cpid))
 
     def _total_connectors(self) -> int:
         """Total physical connectors across all EVSE."""
@@ -228,9 +278,42 @@ class ChargePoint(cp):
             boot_info.get("firmware_version", None),
         )
 
+    async def _load_inventory(self) -> InventoryReport | None:
+        """Return the stored inventory if the station is unchanged since.
+
+        Before a BootNotification the fingerprint stored last is trusted, a
+        station reports a new firmware or identity with a BootNotification,
+        which drops the inventory so it is fetched again.
+        """
+        try:
+            stored = await self._inventory_store.async_load()
+            if stored:
+                self._monitor_ids = dict(stored.get("monitors", {}))
+            if not stored or self._fingerprint not in (None, stored["fingerprint"]):
+                return None
+            return InventoryReport.from_dict(stored["inventory"])
+        except (HomeAssistantError, OSError, ValueError, TypeError, KeyError) as e:
+            _LOGGER.warning("%s: failed to load stored inventory: %s", self.id, e)
+            return None
+
+    def _save_inventory(self):
+        if self._fingerprint is None:
+            return
+        stored = {
+            "fingerprint": self._fingerprint,
+            "inventory": self._inventory.as_dict(),
+            "monitors": dict(self._monitor_ids),
+        }
+        self._inventory_store.async_delay_save(lambda: stored, STORAGE_SAVE_DELAY)
+
     async def _get_inventory(self):
         if self._inventory is not None:
             return
+        self._inventory = await self._load_inventory()
+        if self._inventory is not None:
+            _LOGGER.debug("%s: using the stored inventory", self.id)
+            self._build_connector_map()
+            return
         self._wait_inventory = asyncio.Event()
         req = call.GetBaseReport(1, "FullInventory")
         resp: call_result.GetBaseReport | None = None
@@ -242,10 +325,63 @@ class ChargePoint(cp):
             self._inventory = None
         if (resp is not None) and (resp.status == "Accepted"):
             await asyncio.wait_for(self._wait_inventory.wait(), self._response_timeout)
+            self._save_inventory()
         self._wait_inventory = None
         if self._inventory:
             self._build_connector_map()
 
+    @staticmethod
+    def _monitor_name(data: dict) -> str:
+        evse = data["component"].get("evse")
+        name = data["component"]["name"] + (f"({evse['id']})" if evse else "")
+        return f"{name}/{data['variable']['name']}"
+
+    async def _set_monitors(self, data: list[dict]) -> list[dict]:
+        """Set monitors, return those to set again without their stale id."""
+        resp = await self.call(call.SetVariableMonitoring(data))
+        retry = []
+        for d, result in zip(data, resp.set_monitoring_result, strict=False):
+            name = self._monitor_name(d)
+            status = result["status"]
+            if status == SetMonitoringStatusEnumType.accepted:
+                self._monitor_ids[name] = result.get("id")
+            elif status == SetMonitoringStatusEnumType.duplicate:
+                continue
+            elif self._monitor_ids.pop(name, None) is not None:
+                retry.append({k: v for k, v in d.items() if k != "id"})
+            else:
+                _LOGGER.debug("%s: monitor %s not set: %s", self.id, name, status)
+        return retry
+
+    async def set_monitoring(self):
+        """Ask the charger to push changes of the MONITORS variables."""
+        evse_count = self._inventory.evse_count if self._inventory else 0
+        data = []
+        for comp, var, per_evse, mtype, value, severity in MONITORS:
+            for evse_id in range(1, evse_count + 1) if per_evse else [0]:
+                component: dict = {"name": comp}
+                if evse_id:
+                    component["evse"] = {"id": evse_id}
+                d = {
+                    "value": value,
+                    "type": mtype.value,
+                    "severity": severity,
+                    "component": component,
+                    "variable": {"name": var},
+                }
+                # replace the monitor set on an earlier connection
+                if (
+                    monitor_id := self._monitor_ids.get(self._monitor_name(d))
+                ) is not None:
+                    d["id"] = monitor_id
+                data.append(d)
+        retry = await self._set_monitors(data)
+        if retry:
+            # monitors removed on the charger, eg by a factory reset
+            await self._set_monitors(retry)
+        if self._inventory:
+            self._save_inventory()
+
     async def get_number_of_connectors(self) -> int:
         """Return number of connectors on this charger."""
         await self._get_inventory()
@@ -262,7 +398,8 @@ class ChargePoint(cp):
                 }
             ]
         )
-        await self.call(req)
+        resp = await self.call(req)
+        self._record_set_variables(req.set_variable_data, resp)
 
     async def get_supported_measurands(self) -> str:
         """Get comma-separated list of measurands supported by the charger."""
@@ -280,7 +417,8 @@ class ChargePoint(cp):
                     }
                 ]
             )
-            await self.call(req)
+            resp = await self.call(req)
+            self._record_set_variables(req.set_variable_data, resp)
             return measurands
         return ""
 
@@ -334,6 +472,7 @@ class ChargePoint(cp):
 
     async def clear_profile(self):
         """Clear all charging profiles."""
+        self.forget_profiles()
         req: call.ClearChargingProfile = call.ClearChargingProfile(
             None,
             {
@@ -360,9 +499,11 @@ class ChargePoint(cp):
             with contextlib.suppress(Exception):
                 evse_target, _ = self._global_to_pair(int(conn_id))
         if profile is not None:
-            req = call.SetChargingProfile(evse_target, profile)
-            resp: call_result.SetChargingProfile = await self.call(req)
-            if resp.status != ChargingProfileStatusEnumType.accepted:
+            resp = await self._set_charging_profile(evse_target, profile)
+            if (
+                resp is not None
+                and resp.status != ChargingProfileStatusEnumType.accepted
+            ):
                 raise HomeAssistantError(
                     translation_domain=DOMAIN,
                     translation_key="set_variables_error",
@@ -406,11 +547,8 @@ class ChargePoint(cp):
             "charging_schedule": [schedule],
         }
 
-        req: call.SetChargingProfile = call.SetChargingProfile(
-            evse_target, charging_profile
-        )
-        resp: call_result.SetChargingProfile = await self.call(req)
-        if resp.status != ChargingProfileStatusEnumType.accepted:
+        resp = await self._set_charging_profile(evse_target, charging_profile)
+        if resp is not None and resp.status != ChargingProfileStatusEnumType.accepted:
             raise HomeAssistantError(
                 translation_domain=DOMAIN,
                 translation_key="set_variables_error",
@@ -419,6 +557,23 @@ class ChargePoint(cp):
                 },
             )
 
+    async def _set_charging_profile(
+        self, evse_id: int, profile: dict
+    ) -> call_result.SetChargingProfile | None:
+        """Send a charging profile unless the charger accepted the same one.
+
+        Returns the response, None for a skipped profile.
+        """
+        key = (evse_id, profile.get("charging_profile_purpose"), profile.get("id"))
+        if self.profile_accepted(key, profile):
+            _LOGGER.debug("%s: charging profile %s already set", self.id, key)
+            return None
+        req: call.SetChargingProfile = call.SetChargingProfile(evse_id, profile)
+        resp: call_result.SetChargingProfile = await self.call(req)
+        if resp.status == ChargingProfileStatusEnumType.accepted:
+            self.remember_profile(key, profile)
+        return resp
+
     async def set_availability(self, state: bool = True, connector_id: int | None = 0):
         """Change availability."""
         status = (
@@ -507,6 +662,44 @@ class ChargePoint(cp):
                 translation_placeholders={"message": resp.status + status_suffix},
             )
 
+    async def update_firmware(self, firmware_url: str, wait_time: int = 0):
+        """Update charger with new firmware if available.
+
+        - firmware_url: http/https URL of the new firmware
+        - wait_time: hours from now to wait before retrieving it
+        """
+        features = int(self._attr_supported_features or 0)
+        if not (features & Profiles.FW):
+            _LOGGER.warning("Charger does not support OCPP firmware updating")
+            return False
+
+        try:
+            url = vol.Schema(vol.Url())(firmware_url)
+        except vol.MultipleInvalid as e:
+            _LOGGER.warning("Failed to parse url: %s", e)
+            return False
+
+        retrieve_time = datetime.now(tz=UTC) + timedelta(
+            hours=max(0, int(wait_time or 0))
+        )
+        req = call.UpdateFirmware(
+            # FirmwareStatusNotifications of this update carry the request id
+            int(datetime.now(tz=UTC).timestamp()),
+            {
+                "location": str(url),
+                "retrieveDateTime": retrieve_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+        )
+        try:
+            resp: call_result.UpdateFirmware = await self.call(req)
+        except Exception as e:
+            _LOGGER.error("UpdateFirmware failed: %s", e)
+            return False
+        if resp.status != UpdateFirmwareStatusEnumType.accepted.value:
+            _LOGGER.warning("UpdateFirmware rejected: %s", resp.status)
+            return False
+        return True
+
     @staticmethod
     def _parse_ocpp_key(key: str) -> tuple:
         try:
@@ -528,9 +721,74 @@ class ChargePoint(cp):
             variable["instance"] = vinstance
         return component, variable
 
+    def _record_set_variables(self, set_variable_data: list[dict], resp):
+        """Update the device model with the values set on the charger."""
+        results = getattr(resp, "set_variable_result", None) or []
+        for data, result in zip(set_variable_data, results, strict=False):
+            status = result.get("attribute_status")
+            if status == SetVariableStatusEnumType.accepted:
+                self.device_model.set(
+                    data["component"], data["variable"], data["attribute_value"]
+                )
+            elif status == SetVariableStatusEnumType.reboot_required:
+                # the actual value changes with the reboot
+                self.device_model.discard(data["component"], data["variable"])
+
+    async def get_local_list_version(self) -> int | None:
+        """Return the version of the local authorization list."""
+        resp = await self.call(call.GetLocalListVersion())
+        return None if resp is None else resp.version_number
+
+    async def get_local_list_limits(self) -> tuple[int | None, int | None]:
+        """Return LocalAuthListCtrlr ItemsPerMessage and the maxLimit of Entries.
+
+        The maxLimit is only known from an inventory report.
+        """
+        try:
+            per_message = parse_limit(
+                await self.get_configuration("LocalAuthListCtrlr/ItemsPerMessage")
+            )
+        except HomeAssistantError:
+            per_message = None
+        max_length = self.device_model.get(
+            {"name": "LocalAuthListCtrlr"}, {"name": "Entries"}, MAX_LIMIT
+        )
+        return per_message, parse_limit(max_length)
+
+    async def send_local_list(
+        self, version: int, entries: dict[str, str | None], full: bool
+    ) -> str:
+        """Send a full or differential local authorization list, return the status.
+
+        The id_tags are sent as RFID (ISO14443) tokens.
+        """
+        authorization = []
+        for id_tag, status in entries.items():
+            data = {
+                "id_token": {
+                    "id_token": id_tag,
+                    "type": IdTokenEnumType.iso14443.value,
+                }
+            }
+            if status is not None:
+                data["id_token_info"] = {"status": status}
+            authorization.append(data)
+        req = call.SendLocalList(
+            version_number=version,
+            update_type=UpdateEnumType.full if full else UpdateEnumType.differential,
+            local_authorization_list=authorization or None,
+        )
+        resp = await self.call(req)
+        if resp is None:
+            return SendLocalListStatusEnumType.failed.value
+        return resp.status
+
     async def get_configuration(self, key: str = "") -> str | None:
         """Get Configuration of charger for supported keys else return None."""
         component, variable = self._parse_ocpp_key(key)
+        value = self.device_model.get(component, variable)
+        if value is not None:
+            return value
         req: call.GetVariables = call.GetVariables(
             [{"component": component, "variable": variable}]
         )
@@ -549,6 +807,7 @@ class ChargePoint(cp):
                 translation_key="get_variables_error",
                 translation_placeholders={"message": str(result)},
             )
+        self.device_model.set(component, variable, result["attribute_value"])
         return result["attribute_value"]
 
     async def configure(self, key: str, value: str) -> SetVariableResult:
@@ -565,6 +824,7 @@ class ChargePoint(cp):
                 translation_key="ocpp_call_error",
                 translation_placeholders={"message": str(e)},
             )
+        self._record_set_variables(req.set_variable_data, resp)
         result: dict = resp.set_variable_result[0]
         if result["attribute_status"] == SetVariableStatusEnumType.accepted:
             return SetVariableResult.accepted
@@ -586,9 +846,12 @@ class ChargePoint(cp):
             status="Accepted",
         )
 
-        self.hass.async_create_task(
-            self.async_update_device_info_v201(charging_station)
-        )
+        self.create_task(self.async_update_device_info_v201(charging_station))
+        fingerprint = station_fingerprint(charging_station)
+        if fingerprint != self._fingerprint:
+            # new firmware may report another device model
+            self.device_model.clear()
+        self._fingerprint = fingerprint
         self._inventory = None
         self._register_boot_notification()
         return resp
@@ -598,16 +861,23 @@ class ChargePoint(cp):
         """Perform OCPP callback."""
         return call_result.Heartbeat(current_time=datetime.now(tz=UTC).isoformat())
 
-    def _report_evse_status(self, evse_id: int, evse_status_v16: ChargePointStatusv16):
+    def _report_evse_status(
+        self,
+        evse_id: int,
+        evse_status_v16: ChargePointStatusv16,
+        publish: bool = True,
+    ):
         """Report EVSE-level status on the global connector."""
         self._metrics[(0, cstat.status_connector.value)].value = evse_status_v16.value
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        if publish:
+            self.create_task(self.update(self.settings.cpid))
 
     @on(Action.status_notification)
     def on_status_notification(
         self, timestamp: str, connector_status: str, evse_id: int, connector_id: int
     ):
         """Perform OCPP callback."""
+        self.observe_clock(self.parse_timestamp(timestamp))
         if not self._ensure_connector_map():
             self._pending_status_notifications.append(
                 (timestamp, connector_status, evse_id, connector_id)
@@ -617,12 +887,14 @@ class ChargePoint(cp):
         self._apply_status_notification(
             timestamp, connector_status, evse_id, connector_id
         )
-        self.hass.async_create_task(self.update(self.settings.cpid))
+        self.create_task(self.update(self.settings.cpid))
         return call_result.StatusNotification()
 
     @on(Action.firmware_status_notification)
-    def on_firmware_status_notification(self, **kwargs):
+    def on_firmware_status_notification(self, status: str = "", **kwargs):
         """Perform OCPP callback."""
+        if self.rollout is not None:
+            self.rollout.firmware_status(self.settings.cpid, status)
         return call_result.FirmwareStatusNotification()
 
     @on(Action.meter_values)
@@ -638,18 +910,54 @@ class ChargePoint(cp):
     @on(Action.notify_event)
     def on_notify_event(self, **kwargs):
         """Perform OCPP callback."""
+        updated = False
+        for event in kwargs.get("event_data", []) or []:
+            component: dict = event.get("component", {}) or {}
+            variable: dict = event.get("variable", {}) or {}
+            self.device_model.set(component, variable, event.get("actual_value"))
+            updated |= self._apply_event(component, variable, event)
+        if updated:
+            self.create_task(self.update(self.settings.cpid))
         return call_result.NotifyEvent()
 
+    def _apply_event(self, component: dict, variable: dict, event: dict) -> bool:
+        """Update the metric of a monitored variable, return True if one is."""
+        name = (component.get("name"), variable.get("name"))
+        value = event.get("actual_value")
+        if name == ("ChargingStation", "Problem"):
+            problem = str(value).casefold() == "true" and not event.get("cleared")
+            self._metrics[(0, cstat.error_code.value)].value = (
+                (event.get("tech_code") or "Problem") if problem else "NoError"
+            )
+            return True
+        if name == ("EVSE", "Power") and component.get("evse"):
+            try:
+                power = float(value)
+            except (TypeError, ValueError):
+                return False
+            global_idx = self._pair_to_global(int(component["evse"]["id"]), 1)
+            measurand = MeasurandEnumType.power_active_import.value
+            self.process_measurands(
+                [[MeasurandValue(measurand, power, None, "W", None, None)]],
+                False,
+                global_idx,
+            )
+            return True
+        return False
+
     @on(Action.notify_report)
     def on_report(self, request_id: int, generated_at: str, seq_no: int, **kwargs):
         """Handle OCPP 2.x inventory/report updates."""
+        reports: list[dict] = kwargs.get("report_data", []) or []
+        for report_data in reports:
+            self.device_model.add_report(report_data)
+
         if self._wait_inventory is None:
             return call_result.NotifyReport()
 
         if self._inventory is None:
             self._inventory = InventoryReport()
 
-        reports: list[dict] = kwargs.get("report_data", []) or []
         for report_data in reports:
             component: dict = report_data.get("component", {}) or {}
             variable: dict = report_data.get("variable", {}) or {}
@@ -751,7 +1059,7 @@ class ChargePoint(cp):
         return call_result.NotifyReport()
 
     @on(Action.authorize)
-    def on_authorize(self, id_token: dict, **kwargs):
+    async def on_authorize(self, id_token: dict, **kwargs):
         """Perform OCPP callback."""
         status: str = AuthorizationStatusEnumType.unknown.value
         token_type: str = id_token["type"]
@@ -761,7 +1069,7 @@ class ChargePoint(cp):
             or (token_type == IdTokenEnumType.iso15693)
             or (token_type == IdTokenEnumType.central)
         ):
-            status = self.get_authorization_status(token)
+            status = await self.get_authorization_status(token)
         return call_result.Authorize(id_token_info={"status": status})
 
     def _set_meter_values(
@@ -772,8 +1080,13 @@ class ChargePoint(cp):
         connector_id: int,
     ):
         global_idx: int = self._pair_to_global(evse_id, connector_id)
+        # Queued meter values may arrive out of order, process the newest last
+        stamped = sorted(
+            ((self.parse_timestamp(mv.get("timestamp")), mv) for mv in meter_values),
+            key=lambda item: item[0] or datetime.max.replace(tzinfo=UTC),
+        )
         converted_values: list[list[MeasurandValue]] = []
-        for meter_value in meter_values:
+        for t, meter_value in stamped:
             measurands: list[MeasurandValue] = []
             for sampled_value in meter_value["sampled_value"]:
                 measurand: str = sampled_value.get(
@@ -792,6 +1105,8 @@ class ChargePoint(cp):
                     MeasurandValue(measurand, value, phase, unit, context, location)
                 )
             converted_values.append(measurands)
+            if self.is_historical(t):
+                self.record_backlog(t, global_idx, measurands)
 
         if (tx_event_type == TransactionEventEnumType.started.value) or (
             (tx_event_type == TransactionEventEnumType.updated.value)
@@ -810,7 +1125,12 @@ class ChargePoint(cp):
                             (global_idx, csess.meter_start.value)
                         ].unit = energy_unit
 
-        self.process_measurands(converted_values, True, global_idx)
+        self.process_measurands(
+            converted_values,
+            True,
+            global_idx,
+            timestamps=[t for t, _ in stamped],
+        )
 
         if tx_event_type == TransactionEventEnumType.ended.value:
             measurands_in_tx: set[str] = set()
@@ -848,6 +1168,9 @@ class ChargePoint(cp):
         meter_values: list[dict] = kwargs.get("meter_value", [])
         self._set_meter_values(event_type, meter_values, evse_id, evse_conn_id)
         t = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        historical: bool = offline or self.is_historical(
+            self.parse_timestamp(timestamp)
+        )
 
         if "charging_state" in transaction_info:
             state = transaction_info["charging_state"]
@@ -863,7 +1186,7 @@ class ChargePoint(cp):
             elif state == ChargingStateEnumType.charging:
                 evse_status_v16 = ChargePointStatusv16.charging
             if evse_status_v16:
-                self._report_evse_status(evse_id, evse_status_v16)
+                self._report_evse_status(evse_id, evse_status_v16, publish=False)
 
         response = call_result.TransactionEvent()
         id_token = kwargs.get("id_token")
@@ -874,6 +1197,8 @@ class ChargePoint(cp):
 
         if event_type == TransactionEventEnumType.started.value:
             self._tx_start_time[global_idx] = t
+            if self.balancer is not None:
+                self.balancer.session_started(self, global_idx)
             tx_id: str = transaction_info["transaction_id"]
             self._metrics[(global_idx, csess.transaction_id.value)].value = tx_id
             self._metrics[(global_idx, csess.session_time.value)].value = 0
@@ -891,11 +1216,19 @@ class ChargePoint(cp):
                     (global_idx, csess.session_time.value)
                 ].unit = UnitOfTime.MINUTES
             if event_type == TransactionEventEnumType.ended.value:
+                self.record_session(
+                    global_idx,
+                    transaction_info.get("transaction_id"),
+                    self._tx_start_time.get(global_idx),
+                    t,
+                    transaction_info.get("stopped_reason"),
+                )
                 self._metrics[(global_idx, csess.transaction_id.value)].value = ""
                 self._metrics[(global_idx, cstat.id_tag.value)].value = ""
                 self._tx_start_time.pop(global_idx, None)
+                if self.balancer is not None:
+                    self.balancer.session_stopped(self, global_idx)
 
-        if not offline:
-            self.hass.async_create_task(self.update(self.settings.cpid))
+        self.schedule_update(historical)
 
         return response
@@ -0,0 +1,257 @@
+"""Staggered firmware rollout to the chargers of a central system."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.const import STATE_OK
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+
+from .const import ROLLOUT_MAX_FAILURES, ROLLOUT_UPDATE_TIMEOUT, ROLLOUT_WINDOW
+from .host import HostStore, OcppHost
+
+if TYPE_CHECKING:
+    from .chargepoint import ChargePoint
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# States of the rollout
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+CANCELLED = "cancelled"
+
+# States of each charger in the rollout
+PENDING = "pending"
+UPDATING = "updating"
+INSTALLED = "installed"
+FAILED = "failed"
+
+# Firmware statuses of both OCPP versions that end an update
+INSTALLED_STATUSES = {"Installed"}
+FAILED_STATUSES = {
+    "DownloadFailed",
+    "InstallationFailed",
+    "InstallVerificationFailed",
+    "InvalidSignature",
+}
+
+
+class FirmwareRollout:
+    """Update the firmware of chargers, a window of them at a time.
+
+    A charger is updating from its UpdateFirmware request until a
+    FirmwareStatusNotification reports Installed or a failure, then the next
+    pending charger is started. A charger without a final status
+    update_timeout minutes after its delay failed. Chargers that are offline
+    when it is their turn are started once they connect. The rollout pauses
+    once max_failures chargers failed since it was started or resumed, unless
+    no charger is left to start. Progress is saved in a store, so a rollout
+    continues after a restart.
+    """
+
+    def __init__(
+        self,
+        host: OcppHost,
+        store: Store | HostStore,
+        resolve: Callable[[str], ChargePoint | None],
+    ):
+        """Keep progress in store, resolve returns a charger by cpid."""
+        self.host = host
+        self.store = store
+        self._resolve = resolve
+        self.state: dict | None = None
+        self._timer: asyncio.TimerHandle | None = None
+
+    @property
+    def status(self) -> dict:
+        """Return the rollout, the state of each charger and their counts."""
+        if self.state is None:
+            return {"state": None, "chargers": {}}
+        counts = Counter(self.state["chargers"].values())
+        return {
+            **self.state,
+            "counts": {s: counts[s] for s in (PENDING, UPDATING, INSTALLED, FAILED)},
+        }
+
+    def _failures(self) -> int:
+        failed = sum(1 for s in self.state["chargers"].values() if s == FAILED)
+        return failed - self.state["failure_base"]
+
+    async def async_load(self):
+        """Load the progress of a rollout saved before a restart."""
+        try:
+            self.state = await self.store.async_load()
+        except (HomeAssistantError, OSError, ValueError) as e:
+            _LOGGER.warning("Failed to load firmware rollout: %s", e)
+        self._schedule_expiry()
+
+    async def _save(self):
+        await self.store.async_save(self.state)
+
+    async def start(
+        self,
+        cpids: list[str],
+        firmware_url: str,
+        window: int = ROLLOUT_WINDOW,
+        max_failures: int = ROLLOUT_MAX_FAILURES,
+        wait_time: int = 0,
+        update_timeout: int = ROLLOUT_UPDATE_TIMEOUT,
+    ):
+        """Start updating the chargers, raises ValueError if one is running."""
+        if self.state is not None and self.state["state"] in (RUNNING, PAUSED):
+            raise ValueError("a rollout is already in progress")
+        if not cpids:
+            raise ValueError("no chargers selected")
+        self.state = {
+            "state": RUNNING,
+            "firmware_url": firmware_url,
+            "wait_time": wait_time,
+            "window": window,
+            "max_failures": max_failures,
+            "update_timeout": update_timeout,
+            "failure_base": 0,
+            "chargers": dict.fromkeys(cpids, PENDING),
+            "deadlines": {},
+        }
+        await self.advance()
+
+    async def pause(self):
+        """Start no more chargers, those updating carry on."""
+        if self.state is not None and self.state["state"] == RUNNING:
+            self.state["state"] = PAUSED
+            await self._save()
+
+    async def resume(self):
+        """Continue a paused rollout, allowing max_failures more failures."""
+        if self.state is not None and self.state["state"] == PAUSED:
+            self.state["state"] = RUNNING
+            self.state["failure_base"] += self._failures()
+            await self.advance()
+
+    async def cancel(self):
+        """Stop the rollout, chargers already updating are not interrupted."""
+        if self.state is not None and self.state["state"] in (RUNNING, PAUSED):
+            self.state["state"] = CANCELLED
+            self._schedule_expiry()
+            await self._save()
+
+    def stop(self):
+        """Stop watching deadlines, they are watched again once loaded."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def firmware_status(self, cpid: str, status: str):
+        """Take a firmware status of a charger, advance once it is final."""
+        if self.state is None or self.state["chargers"].get(cpid) != UPDATING:
+            return
+        if status in INSTALLED_STATUSES:
+            self.state["chargers"][cpid] = INSTALLED
+        elif status in FAILED_STATUSES:
+            _LOGGER.warning("%s: firmware update failed: %s", cpid, status)
+            self.state["chargers"][cpid] = FAILED
+        else:
+            return
+        self.state.get("deadlines", {}).pop(cpid, None)
+        self.host.create_task(self.advance())
+
+    def _schedule_expiry(self):
+        """Fail the updating chargers once the earliest deadline passed."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.state is None or self.state["state"] == CANCELLED:
+            return
+        deadlines = self.state.get("deadlines", {})
+        pending = [
+            deadlines[cpid]
+            for cpid, s in self.state["chargers"].items()
+            if s == UPDATING and cpid in deadlines
+        ]
+        if pending:
+            self._timer = asyncio.get_running_loop().call_later(
+                max(0, min(pending) - time.time()),
+                lambda: self.host.create_task(self._expire()),
+            )
+
+    async def _expire(self):
+        self._timer = None
+        chargers = self.state["chargers"]
+        deadlines = self.state["deadlines"]
+        now = time.time()
+        for cpid, s in chargers.items():
+            if s == UPDATING and deadlines.get(cpid, now + 1) <= now:
+                _LOGGER.warning("%s: firmware update timed out", cpid)
+                chargers[cpid] = FAILED
+                del deadlines[cpid]
+        if self.state["state"] == RUNNING:
+            await self.advance()
+        else:
+            self._schedule_expiry()
+            await self._save()
+
+    async def advance(self):
+        """Start pending chargers while the window has room and save progress."""
+        state = self.state
+        if state is None or state["state"] != RUNNING:
+            return
+        chargers = state["chargers"]
+        deadlines = state.setdefault("deadlines", {})
+        timeout = 60 * (
+            state.get("update_timeout", ROLLOUT_UPDATE_TIMEOUT)
+            + 60 * state["wait_time"]
+        )
+        while True:
+            # with no charger left to start the rollout ends instead
+            if self._failures() >= state["max_failures"] and any(
+                s == PENDING for s in chargers.values()
+            ):
+                state["state"] = PAUSED
+                _LOGGER.warning("Firmware rollout paused after failures")
+                await self.host.async_notify(
+                    f"Firmware rollout paused after {self._failures()} failed updates",
+                    "Ocpp integration",
+                )
+                break
+            room = state["window"] - sum(1 for s in chargers.values() if s == UPDATING)
+            started = []
+            for cpid, s in chargers.items():
+                if len(started) >= room:
+                    break
+                cp = self._resolve(cpid) if s == PENDING else None
+                if cp is not None and cp.status == STATE_OK:
+                    # marked before awaiting, so concurrent calls keep the window
+                    chargers[cpid] = UPDATING
+                    deadlines[cpid] = time.time() + timeout
+                    started.append((cpid, cp))
+            results = await asyncio.gather(*(self._update(cp) for _, cp in started))
+            rejected = [cpid for (cpid, _), ok in zip(started, results) if not ok]
+            for cpid in rejected:
+                chargers[cpid] = FAILED
+                del deadlines[cpid]
+            if not rejected:
+                break
+        if state["state"] == RUNNING and all(
+            s in (INSTALLED, FAILED) for s in chargers.values()
+        ):
+            state["state"] = DONE
+            _LOGGER.info("Firmware rollout done: %s", self.status["counts"])
+        self._schedule_expiry()
+        await self._save()
+
+    async def _update(self, cp: ChargePoint) -> bool:
+        try:
+            ok = await cp.update_firmware(
+                self.state["firmware_url"], self.state["wait_time"]
+            )
+        except Exception as e:
+            _LOGGER.warning("%s: UpdateFirmware failed: %s", cp.id, e)
+            return False
+        return ok is True
@@ -2,7 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections import defaultdict
 from dataclasses import dataclass
+from functools import partial
+from itertools import chain
+from types import MappingProxyType
+
 import homeassistant
 from homeassistant.components.sensor import (
     DOMAIN as SENSOR_DOMAIN,
@@ -18,16 +24,13 @@ from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 
-from .api import CentralSystem
+from .api import CentralSystem, async_add_in_batches
 from .const import (
-    CONF_CPID,
-    CONF_CPIDS,
-    CONF_NUM_CONNECTORS,
     DATA_UPDATED,
     DEFAULT_CLASS_UNITS_HA,
-    DEFAULT_NUM_CONNECTORS,
     DOMAIN,
     ICON,
+    SIGNAL_NEW_METRICS,
     Measurand,
 )
 from .enums import HAChargerDetails, HAChargerSession, HAChargerStatuses
@@ -40,29 +43,154 @@ class OcppSensorDescription(SensorEntityDescription):
     metric: str | None = None
 
 
+def _device_class(metric: str) -> SensorDeviceClass | None:
+    """Return the device class of the sensor of a metric."""
+    name = metric.lower()
+    if name.startswith("current."):
+        return SensorDeviceClass.CURRENT
+    if name.startswith("voltage"):
+        return SensorDeviceClass.VOLTAGE
+    if name.startswith("energy.r"):
+        return None
+    if name.startswith("energy"):
+        return SensorDeviceClass.ENERGY
+    if metric in [Measurand.frequency, Measurand.rpm] or name.startswith("frequency"):
+        return SensorDeviceClass.FREQUENCY
+    if name.startswith(("power.a", "power.o")):
+        return SensorDeviceClass.POWER
+    if name.startswith("power.r"):
+        return SensorDeviceClass.REACTIVE_POWER
+    if name.startswith("temperature"):
+        return SensorDeviceClass.TEMPERATURE
+    if name.startswith("timestamp") or metric in [
+        HAChargerDetails.config_response.value,
+        HAChargerDetails.data_response.value,
+        HAChargerStatuses.heartbeat.value,
+    ]:
+        return SensorDeviceClass.TIMESTAMP
+    if name.startswith("soc"):
+        return SensorDeviceClass.BATTERY
+    if name.startswith("traffic"):
+        return SensorDeviceClass.DATA_SIZE
+    return None
+
+
+def _state_class(
+    metric: str, device_class: SensorDeviceClass | None
+) -> SensorStateClass | None:
+    """Return the state class of the sensor of a metric."""
+    if device_class in [
+        SensorDeviceClass.ENERGY,
+        SensorDeviceClass.DATA_SIZE,
+    ] or metric in [HAChargerStatuses.schema_validation.value]:
+        return SensorStateClass.TOTAL_INCREASING
+    if device_class in [
+        SensorDeviceClass.CURRENT,
+        SensorDeviceClass.VOLTAGE,
+        SensorDeviceClass.POWER,
+        SensorDeviceClass.REACTIVE_POWER,
+        SensorDeviceClass.TEMPERATURE,
+        SensorDeviceClass.BATTERY,
+        SensorDeviceClass.FREQUENCY,
+    ] or metric in [
+        HAChargerStatuses.latency_ping.value,
+        HAChargerStatuses.latency_pong.value,
+        HAChargerSession.session_time.value,
+    ]:
+        return SensorStateClass.MEASUREMENT
+    return None
+
+
+def _classify(
+    metric: str,
+) -> tuple[SensorDeviceClass | None, SensorStateClass | None, str | None]:
+    """Return the device class, state class and default unit of a metric."""
+    device_class = _device_class(metric)
+    return (
+        device_class,
+        _state_class(metric, device_class),
+        DEFAULT_CLASS_UNITS_HA.get(device_class),
+    )
+
+
+# classification of the metrics known at import, configured measurands that are
+# not listed here are classified when their sensor is described
+SENSOR_CLASSES = MappingProxyType(
+    {
+        metric: _classify(metric)
+        for metric in chain(
+            (m.value for m in Measurand),
+            (m.value for m in HAChargerStatuses),
+            (m.value for m in HAChargerDetails),
+            (m.value for m in HAChargerSession),
+        )
+    }
+)
+
+
+def sensor_description(metric: str, *, cat_diag: bool = False) -> OcppSensorDescription:
+    """Describe the sensor of a metric."""
+    ms = str(metric).strip()
+    device_class, state_class, unit = SENSOR_CLASSES.get(ms) or _classify(ms)
+    return OcppSensorDescription(
+        key=ms.lower(),
+        name=ms.replace(".", " "),
+        metric=ms,
+        entity_category=EntityCategory.DIAGNOSTIC if cat_diag else None,
+        device_class=device_class,
+        state_class=state_class,
+        native_unit_of_measurement=unit,
+        icon=ICON,
+    )
+
+
 async def async_setup_entry(hass, entry, async_add_devices):
     """Configure the sensor platform."""
     central_system = hass.data[DOMAIN][entry.entry_id]
     entities: list[ChargePointMetric] = []
+    # sensors of metrics without a value by cpid and metric, added once the
+    # charger signals the metric received one
+    pending: dict[str, dict[str, list[ChargePointMetric]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    # connectors with sensors and the metrics of a connector by cpid
+    connectors: dict[str, set[int]] = {}
+    connector_metrics: dict[str, list[str]] = {}
     ent_reg = er.async_get(hass)
 
-    # setup all chargers added to config
-    for charger in entry.data[CONF_CPIDS]:
-        cp_id_settings = list(charger.values())[0]
-        cpid = cp_id_settings[CONF_CPID]
-
-        num_connectors = 1
-        for item in entry.data.get(CONF_CPIDS, []):
-            for _, cfg in item.items():
-                if cfg.get(CONF_CPID) == cpid:
-                    num_connectors = int(
-                        cfg.get(CONF_NUM_CONNECTORS, DEFAULT_NUM_CONNECTORS)
-                    )
-                    break
-            else:
-                continue
-            break
+    def _add(entity: ChargePointMetric, added: list[ChargePointMetric]):
+        """Add the sensor now if it has a value or was added before."""
+        if (
+            ent_reg.async_get_entity_id(SENSOR_DOMAIN, DOMAIN, entity.unique_id)
+            or central_system.get_metric(
+                entity.cpid, entity.metric, entity.connector_id
+            )
+            is not None
+        ):
+            added.append(entity)
+        else:
+            pending[entity.cpid][entity.metric].append(entity)
+
+    def _connector_sensor(
+        cpid: str, metric: str, connector_id: int | None
+    ) -> ChargePointMetric:
+        return ChargePointMetric(
+            hass,
+            central_system,
+            cpid,
+            sensor_description(
+                metric,
+                cat_diag=metric
+                in [
+                    HAChargerStatuses.status_connector.value,
+                    HAChargerStatuses.error_code_connector.value,
+                ],
+            ),
+            connector_id=connector_id,
+        )
 
+    # setup all chargers added to config
+    for cpid, cp_id_settings, num_connectors in central_system.configured_chargers():
         configured = [
             m.strip()
             for m in str(cp_id_settings.get(CONF_MONITORED_VARIABLES, "")).split(",")
@@ -80,6 +208,13 @@ async def async_setup_entry(hass, entry, async_add_devices):
             HAChargerStatuses.latency_ping.value,
             HAChargerStatuses.latency_pong.value,
             HAChargerStatuses.reconnects.value,
+            HAChargerStatuses.schema_validation.value,
+            HAChargerStatuses.traffic_received.value,
+            HAChargerStatuses.traffic_sent.value,
+            HAChargerStatuses.outbound_queue.value,
+            HAChargerStatuses.tasks.value,
+            HAChargerStatuses.degradation.value,
+            HAChargerStatuses.local_list_version.value,
             HAChargerDetails.identifier.value,
             HAChargerDetails.vendor.value,
             HAChargerDetails.model.value,
@@ -102,15 +237,6 @@ async def async_setup_entry(hass, entry, async_add_devices):
             HAChargerSession.meter_start.value,
         ]
 
-        def _mk_desc(metric: str, *, cat_diag: bool = False) -> OcppSensorDescription:
-            ms = str(metric).strip()
-            return OcppSensorDescription(
-                key=ms.lower(),
-                name=ms.replace(".", " "),
-                metric=ms,
-                entity_category=EntityCategory.DIAGNOSTIC if cat_diag else None,
-            )
-
         def _uid(cpid: str, key: str, connector_id: int | None) -> str:
             """Mirror ChargePointMetric unique_id construction."""
             key = key.lower()
@@ -129,55 +255,69 @@ async def async_setup_entry(hass, entry, async_add_devices):
 
         # Root/charger-entities
         for metric in CHARGER_ONLY:
-            entities.append(
+            _add(
                 ChargePointMetric(
                     hass,
                     central_system,
                     cpid,
-                    _mk_desc(metric, cat_diag=True),
+                    sensor_description(metric, cat_diag=True),
                     connector_id=None,
-                )
+                ),
+                entities,
             )
 
         if num_connectors > 1:
             for conn_id in range(1, num_connectors + 1):
                 for metric in CONNECTOR_ONLY:
-                    entities.append(
-                        ChargePointMetric(
-                            hass,
-                            central_system,
-                            cpid,
-                            _mk_desc(
-                                metric,
-                                cat_diag=metric
-                                in [
-                                    HAChargerStatuses.status_connector.value,
-                                    HAChargerStatuses.error_code_connector.value,
-                                ],
-                            ),
-                            connector_id=conn_id,
-                        )
-                    )
+                    _add(_connector_sensor(cpid, metric, conn_id), entities)
         else:
             for metric in CONNECTOR_ONLY:
-                entities.append(
-                    ChargePointMetric(
-                        hass,
-                        central_system,
-                        cpid,
-                        _mk_desc(
-                            metric,
-                            cat_diag=metric
-                            in [
-                                HAChargerStatuses.status_connector.value,
-                                HAChargerStatuses.error_code_connector.value,
-                            ],
-                        ),
-                        connector_id=None,
-                    )
-                )
-
-    async_add_devices(entities, False)
+                _add(_connector_sensor(cpid, metric, None), entities)
+        connectors[cpid] = set(range(1, num_connectors + 1))
+        connector_metrics[cpid] = CONNECTOR_ONLY
+        # let other tasks run while the sensors of many chargers are built
+        await asyncio.sleep(0)
+
+    await async_add_in_batches(async_add_devices, entities)
+
+    @callback
+    def _add_pending(cpid: str, keys: list[tuple[int | None, str]]):
+        """Add the sensors of a charger's metrics that received a first value."""
+        waiting = pending[cpid]
+        ready: list[ChargePointMetric] = []
+        for conn, metric in keys:
+            if conn >= 1 and conn not in connectors[cpid]:
+                # a connector beyond the configured number reported
+                connectors[cpid].add(conn)
+                for connector_metric in connector_metrics[cpid]:
+                    _add(_connector_sensor(cpid, connector_metric, conn), ready)
+            entities = waiting.get(metric)
+            if not entities:
+                continue
+            # sensors without a connector show the first connector with a value
+            added = [e for e in entities if e.connector_id in (None, conn)]
+            ready.extend(added)
+            waiting[metric] = [e for e in entities if e not in added]
+        if ready:
+            async_add_devices(ready, False)
+
+    for cpid in connectors:
+        waiting = pending[cpid]
+        entry.async_on_unload(
+            async_dispatcher_connect(
+                hass, SIGNAL_NEW_METRICS.format(cpid), partial(_add_pending, cpid)
+            )
+        )
+        # catch up on first values signalled while the sensors were set up
+        _add_pending(
+            cpid,
+            [
+                (e.connector_id, e.metric)
+                for entities in waiting.values()
+                for e in entities
+                if central_system.get_metric(cpid, e.metric, e.connector_id) is not None
+            ],
+        )
 
 
 class ChargePointMetric(RestoreSensor, SensorEntity):
@@ -225,7 +365,6 @@ class ChargePointMetric(RestoreSensor, SensorEntity):
         else:
             object_id = f"{self.cpid}_{self.entity_description.key}"
         self.entity_id = f"{SENSOR_DOMAIN}.{object_id}"
-        self._attr_icon = ICON
         self._attr_native_unit_of_measurement = None
 
     @property
@@ -248,62 +387,6 @@ class ChargePointMetric(RestoreSensor, SensorEntity):
             self.cpid, self.metric, self.connector_id
         )
 
-    @property
-    def state_class(self):
-        """Return the state class of the sensor."""
-        state_class = None
-        if self.device_class is SensorDeviceClass.ENERGY:
-            state_class = SensorStateClass.TOTAL_INCREASING
-        elif self.device_class in [
-            SensorDeviceClass.CURRENT,
-            SensorDeviceClass.VOLTAGE,
-            SensorDeviceClass.POWER,
-            SensorDeviceClass.REACTIVE_POWER,
-            SensorDeviceClass.TEMPERATURE,
-            SensorDeviceClass.BATTERY,
-            SensorDeviceClass.FREQUENCY,
-        ] or self.metric in [
-            HAChargerStatuses.latency_ping.value,
-            HAChargerStatuses.latency_pong.value,
-            HAChargerSession.session_time.value,
-        ]:
-            state_class = SensorStateClass.MEASUREMENT
-
-        return state_class
-
-    @property
-    def device_class(self):
-        """Return the device class of the sensor."""
-        device_class = None
-        if self.metric.lower().startswith("current."):
-            device_class = SensorDeviceClass.CURRENT
-        elif self.metric.lower().startswith("voltage"):
-            device_class = SensorDeviceClass.VOLTAGE
-        elif self.metric.lower().startswith("energy.r"):
-            device_class = None
-        elif self.metric.lower().startswith("energy"):
-            device_class = SensorDeviceClass.ENERGY
-        elif self.metric in [
-            Measurand.frequency,
-            Measurand.rpm,
-        ] or self.metric.lower().startswith("frequency"):
-            device_class = SensorDeviceClass.FREQUENCY
-        elif self.metric.lower().startswith(("power.a", "power.o")):
-            device_class = SensorDeviceClass.POWER
-        elif self.metric.lower().startswith("power.r"):
-            device_class = SensorDeviceClass.REACTIVE_POWER
-        elif self.metric.lower().startswith("temperature"):
-            device_class = SensorDeviceClass.TEMPERATURE
-        elif self.metric.lower().startswith("timestamp") or self.metric in [
-            HAChargerDetails.config_response.value,
-            HAChargerDetails.data_response.value,
-            HAChargerStatuses.heartbeat.value,
-        ]:
-            device_class = SensorDeviceClass.TIMESTAMP
-        elif self.metric.lower().startswith("soc"):
-            device_class = SensorDeviceClass.BATTERY
-        return device_class
-
     @property
     def native_value(self):
         """Return the state of the sensor, rounding if a number."""
@@ -333,8 +416,8 @@ class ChargePointMetric(RestoreSensor, SensorEntity):
         if value is not None:
             self._attr_native_unit_of_measurement = value
         else:
-            self._attr_native_unit_of_measurement = DEFAULT_CLASS_UNITS_HA.get(
-                self.device_class
+            self._attr_native_unit_of_measurement = (
+                self.entity_description.native_unit_of_measurement
             )
         return self._attr_native_unit_of_measurement
 
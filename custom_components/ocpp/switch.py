@@ -14,12 +14,8 @@ from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity import DeviceInfo
 from ocpp.v16.enums import ChargePointStatus
 
-from .api import CentralSystem
+from .api import CentralSystem, async_add_in_batches
 from .const import (
-    CONF_CPID,
-    CONF_CPIDS,
-    CONF_NUM_CONNECTORS,
-    DEFAULT_NUM_CONNECTORS,
     DOMAIN,
     ICON,
 )
@@ -95,21 +91,7 @@ async def async_setup_entry(hass, entry, async_add_devices):
     entities: list[ChargePointSwitch] = []
     ent_reg = er.async_get(hass)
 
-    for charger in entry.data[CONF_CPIDS]:
-        cp_settings = list(charger.values())[0]
-        cpid = cp_settings[CONF_CPID]
-
-        num_connectors = 1
-        for item in entry.data.get(CONF_CPIDS, []):
-            for _, cfg in item.items():
-                if cfg.get(CONF_CPID) == cpid:
-                    num_connectors = int(
-                        cfg.get(CONF_NUM_CONNECTORS, DEFAULT_NUM_CONNECTORS)
-                    )
-                    break
-            else:
-                continue
-            break
+    for cpid, _settings, num_connectors in central_system.configured_chargers():
         flatten_single = num_connectors == 1
 
         if num_connectors > 1:
@@ -148,7 +130,7 @@ async def async_setup_entry(hass, entry, async_add_devices):
                     )
                 )
 
-    async_add_devices(entities, False)
+    await async_add_in_batches(async_add_devices, entities)
 
 
 class ChargePointSwitch(SwitchEntity):
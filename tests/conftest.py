@@ -18,6 +18,28 @@ from .charge_point_test import (
 pytest_plugins = "pytest_homeassistant_custom_component"
 
 
+def pytest_addoption(parser):
+    """Add the option running the benchmarks."""
+    parser.addoption(
+        "--benchmark", action="store_true", help="run tests marked benchmark"
+    )
+
+
+def pytest_configure(config):
+    """Register the benchmark marker."""
+    config.addinivalue_line("markers", "benchmark: slow benchmark, see --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the benchmarks unless asked for."""
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
     """Enable custom integrations defined in the test dir."""
@@ -38,6 +60,18 @@ def skip_notifications_fixture():
         yield
 
 
+# Keep files written by the integration, like the session ledger, out of the
+# shared testing config directory.
+@pytest.fixture(name="isolate_storage", autouse=True)
+def isolate_storage_fixture(tmp_path):
+    """Store integration files in a temporary directory."""
+    with patch(
+        "custom_components.ocpp.host.HomeAssistantHost.storage_path",
+        lambda self, name: str(tmp_path / name),
+    ):
+        yield
+
+
 # This fixture, when used, will result in calls to websockets to be bypassed. To have the call
 # return a value, we would add the `return_value=<VALUE_TO_RETURN>` parameter to the patch call.
 # include patch for hass.states.get for use with migration to return cp_id
@@ -5,23 +5,34 @@ from custom_components.ocpp.const import (
     CONF_CPIDS,
     CONF_CSID,
     CONF_FORCE_SMART_CHARGING,
+    CONF_HISTORY_MEMORY,
     CONF_HOST,
     CONF_IDLE_INTERVAL,
     CONF_MAX_CURRENT,
+    CONF_MAX_TASKS,
     CONF_METER_INTERVAL,
     CONF_MONITORED_VARIABLES,
     CONF_MONITORED_VARIABLES_AUTOCONFIG,
+    CONF_NOTIFICATION_WINDOW,
     CONF_NUM_CONNECTORS,
     CONF_PORT,
+    CONF_SCHEMA_VALIDATION_POLICY,
+    CONF_SITE_MAX_CURRENT,
     CONF_SKIP_SCHEMA_VALIDATION,
     CONF_SSL,
     CONF_SSL_CERTFILE_PATH,
     CONF_SSL_KEYFILE_PATH,
     CONF_WEBSOCKET_CLOSE_TIMEOUT,
+    CONF_WEBSOCKET_COMPRESSION,
+    CONF_WEBSOCKET_COMPRESSION_OVERRIDE,
+    CONF_WEBSOCKET_MAX_QUEUE,
+    CONF_WEBSOCKET_MAX_SIZE,
     CONF_WEBSOCKET_PING_INTERVAL,
     CONF_WEBSOCKET_PING_TIMEOUT,
     CONF_WEBSOCKET_PING_TRIES,
     DEFAULT_MONITORED_VARIABLES,
+    DEFAULT_WEBSOCKET_MAX_QUEUE,
+    DEFAULT_WEBSOCKET_MAX_SIZE,
 )
 
 MOCK_CONFIG_CS = {
@@ -35,6 +46,11 @@ MOCK_CONFIG_CS = {
     CONF_WEBSOCKET_PING_TRIES: 0,
     CONF_WEBSOCKET_PING_INTERVAL: 1,
     CONF_WEBSOCKET_PING_TIMEOUT: 1,
+    CONF_WEBSOCKET_COMPRESSION: True,
+    CONF_WEBSOCKET_MAX_SIZE: DEFAULT_WEBSOCKET_MAX_SIZE,
+    CONF_WEBSOCKET_MAX_QUEUE: DEFAULT_WEBSOCKET_MAX_QUEUE,
+    CONF_SITE_MAX_CURRENT: 0,
+    CONF_NOTIFICATION_WINDOW: 30,
     CONF_CPIDS: [],
 }
 
@@ -45,6 +61,10 @@ MOCK_CONFIG_CP = {
     CONF_METER_INTERVAL: 60,
     CONF_MONITORED_VARIABLES_AUTOCONFIG: True,
     CONF_SKIP_SCHEMA_VALIDATION: False,
+    CONF_SCHEMA_VALIDATION_POLICY: "",
+    CONF_WEBSOCKET_COMPRESSION_OVERRIDE: "default",
+    CONF_HISTORY_MEMORY: 0,
+    CONF_MAX_TASKS: 50,
     CONF_FORCE_SMART_CHARGING: True,
 }
 
@@ -59,6 +79,11 @@ MOCK_CONFIG_FLOW = {
     CONF_WEBSOCKET_PING_TRIES: 0,
     CONF_WEBSOCKET_PING_INTERVAL: 1,
     CONF_WEBSOCKET_PING_TIMEOUT: 1,
+    CONF_WEBSOCKET_COMPRESSION: True,
+    CONF_WEBSOCKET_MAX_SIZE: DEFAULT_WEBSOCKET_MAX_SIZE,
+    CONF_WEBSOCKET_MAX_QUEUE: DEFAULT_WEBSOCKET_MAX_QUEUE,
+    CONF_SITE_MAX_CURRENT: 0,
+    CONF_NOTIFICATION_WINDOW: 30,
     CONF_CPIDS: [
         {
             "test_cp_id": {
@@ -69,6 +94,10 @@ MOCK_CONFIG_FLOW = {
                 CONF_MONITORED_VARIABLES: DEFAULT_MONITORED_VARIABLES,
                 CONF_MONITORED_VARIABLES_AUTOCONFIG: True,
                 CONF_SKIP_SCHEMA_VALIDATION: False,
+                CONF_SCHEMA_VALIDATION_POLICY: "",
+                CONF_WEBSOCKET_COMPRESSION_OVERRIDE: "default",
+                CONF_HISTORY_MEMORY: 0,
+                CONF_MAX_TASKS: 50,
                 CONF_FORCE_SMART_CHARGING: True,
             }
         },
@@ -565,7 +565,7 @@ async def test_configure_readonly_warns_and_notifies(
                     return SimpleNamespace(status=ConfigurationStatus.accepted)
                 return SimpleNamespace()
 
-            async def fake_notify(msg):
+            async def fake_notify(msg, immediate=False):
                 notified.append(msg)
 
             monkeypatch.setattr(srv, "call", fake_call, raising=True)
@@ -1059,12 +1059,13 @@ async def test_start_transaction_meter_start_cast_exception(
             srv = cs.charge_points[cp_id]
 
             # Ensure authorization passes so the handler proceeds normally
-            monkeypatch.setattr(
-                srv, "get_authorization_status", lambda id_tag: "Accepted", raising=True
-            )
+            async def accepted(id_tag):
+                return "Accepted"
+
+            monkeypatch.setattr(srv, "get_authorization_status", accepted, raising=True)
 
             # Call the handler directly with a non-numeric meter_start
-            result = srv.on_start_transaction(
+            result = await srv.on_start_transaction(
                 connector_id=1, id_tag="test_cp", meter_start="not-a-number"
             )
             assert result is not None
@@ -1101,14 +1102,12 @@ async def test_start_transaction_auth_denied_returns_tx0(
             srv = cs.charge_points[cp_id]
 
             # Force non-accepted authorization
-            monkeypatch.setattr(
-                srv,
-                "get_authorization_status",
-                lambda id_tag: "Invalid",
-                raising=True,
-            )
+            async def invalid(id_tag):
+                return "Invalid"
+
+            monkeypatch.setattr(srv, "get_authorization_status", invalid, raising=True)
             # Call handler directly to inspect response
-            result = srv.on_start_transaction(
+            result = await srv.on_start_transaction(
                 connector_id=1, id_tag="bad", meter_start=0
             )
             assert result.transaction_id == 0
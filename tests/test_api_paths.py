@@ -40,6 +40,10 @@ class DummyCP:
         self.calls.append(("set_charge_rate", kw))
         return True
 
+    async def request_charge_rate(self, **kw):
+        """Request charge rate, sent at once."""
+        return await self.set_charge_rate(**kw)
+
     async def set_availability(self, state, connector_id=None):
         """Set availability."""
         self.calls.append(
@@ -0,0 +1,166 @@
+"""Test id_tags are authorized by the configured list and external stores."""
+
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.authorization import (
+    Authorization,
+    AuthorizationCache,
+    AuthorizationProvider,
+    ConfigListProvider,
+    FileProvider,
+    _MISS,
+)
+from custom_components.ocpp.const import (
+    CONF_AUTH_CACHE_TTL,
+    CONF_AUTH_FILE,
+    CONF_AUTH_LIST,
+    CONF_AUTH_STATUS,
+    CONF_DEFAULT_AUTH_STATUS,
+    CONF_ID_TAG,
+)
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+
+from .const import MOCK_CONFIG_DATA
+
+
+class FakeStore(AuthorizationProvider):
+    """A store counting its lookups."""
+
+    def __init__(self, statuses, delay=0.0, error=None):
+        """Initialize with the status of each known id_tag."""
+        self.statuses = statuses
+        self.delay = delay
+        self.error = error
+        self.lookups = []
+
+    async def async_get_status(self, id_tag, default_status):
+        """Return the status of a known id_tag."""
+        self.lookups.append(id_tag)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if id_tag not in self.statuses:
+            return None
+        return self.statuses[id_tag] or default_status
+
+
+def test_provider_is_abstract():
+    """Test a provider must implement async_get_status."""
+    with pytest.raises(TypeError):
+        AuthorizationProvider()
+
+
+def test_cache_lru_and_ttl():
+    """Test the least recently used id_tag is evicted and expired ones missed."""
+    cache = AuthorizationCache(maxsize=2, ttl=60, negative_ttl=0.01)
+    cache.set("A", "Accepted")
+    cache.set("B", "Blocked")
+    assert cache.get("A") == "Accepted"
+    cache.set("C", "Accepted")
+    assert cache.get("B") is _MISS
+    assert len(cache) == 2
+
+    # unknown id_tags are kept for a short time only
+    cache.set("D", None)
+    assert cache.get("D") is None
+    assert cache.get("A") is _MISS
+    cache._entries["D"] = (0, None)
+    assert cache.get("D") is _MISS
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    disabled = AuthorizationCache(maxsize=0)
+    disabled.set("A", "Accepted")
+    assert len(disabled) == 0
+
+
+async def test_chain_cached():
+    """Test the list is asked first and repeated swipes do not reach the store."""
+    host = StandaloneHost(
+        config={CONF_AUTH_LIST: [{CONF_ID_TAG: "LIST", CONF_AUTH_STATUS: "Blocked"}]}
+    )
+    store = FakeStore({"STORE": "Accepted", "NO_STATUS": ""})
+    auth = Authorization([ConfigListProvider(host), store])
+
+    assert await auth.async_get_status("LIST", "Invalid") == "Blocked"
+    assert store.lookups == []
+    for _ in range(3):
+        assert await auth.async_get_status("STORE", "Invalid") == "Accepted"
+        assert await auth.async_get_status("UNKNOWN", "Invalid") is None
+    assert await auth.async_get_status("NO_STATUS", "Invalid") == "Invalid"
+    assert store.lookups == ["STORE", "UNKNOWN", "NO_STATUS"]
+    assert auth.cache.hits == 4
+
+    auth.cache.clear()
+    assert await auth.async_get_status("STORE", "Invalid") == "Accepted"
+    assert len(store.lookups) == 4
+
+
+async def test_chain_store_fails():
+    """Test a failing or slow store is skipped and its answer not cached."""
+    host = StandaloneHost()
+    broken = FakeStore({}, error=OSError("unreachable"))
+    slow = FakeStore({"TAG": "Accepted"}, delay=1)
+    fallback = FakeStore({"TAG": "Blocked"})
+    auth = Authorization([broken, slow, fallback], timeout=0.01)
+    assert await auth.async_get_status("TAG", "Invalid") == "Blocked"
+    assert await auth.async_get_status("TAG", "Invalid") == "Blocked"
+    assert fallback.lookups == ["TAG", "TAG"]
+    assert len(auth.cache) == 0
+
+    # without stores nothing is cached
+    auth = Authorization([ConfigListProvider(host)])
+    assert await auth.async_get_status("TAG", "Invalid") is None
+    assert len(auth.cache) == 0
+
+
+async def test_csv_file(tmp_path):
+    """Test a CSV file is indexed and read again when it changes."""
+    path = tmp_path / "tags.csv"
+    path.write_text("id_tag,authorization_status\nTAG_1,Accepted\nTAG_2,\n")
+    provider = FileProvider(StandaloneHost(), str(path))
+    assert await provider.async_get_status("TAG_1", "Invalid") == "Accepted"
+    assert await provider.async_get_status("TAG_2", "Invalid") == "Invalid"
+    assert await provider.async_get_status("TAG_3", "Invalid") is None
+
+    path.write_text("id_tag,authorization_status\nTAG_3,Blocked\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert await provider.async_get_status("TAG_3", "Invalid") == "Blocked"
+    assert await provider.async_get_status("TAG_1", "Invalid") is None
+
+
+async def test_sqlite_file_configured(tmp_path):
+    """Test the configured SQLite file authorizes the chargers of the system."""
+    with sqlite3.connect(tmp_path / "tags.db") as db:
+        db.execute(
+            "CREATE TABLE id_tags (id_tag TEXT PRIMARY KEY, authorization_status TEXT)"
+        )
+        db.executemany(
+            "INSERT INTO id_tags VALUES (?, ?)",
+            [("TAG_1", "Accepted"), ("TAG_2", "Expired"), ("TAG_3", None)],
+        )
+    db.close()
+    config = {
+        CONF_DEFAULT_AUTH_STATUS: "Invalid",
+        CONF_AUTH_FILE: "tags.db",
+        CONF_AUTH_CACHE_TTL: 120,
+    }
+    host = StandaloneHost(config=config, storage_dir=str(tmp_path))
+    cs = CentralSystem(None, HostEntry("auth", MOCK_CONFIG_DATA), host)
+    auth = cs.authorization
+    assert auth.cache.ttl == 120
+    assert auth.providers[1].path == str(tmp_path / "tags.db")
+    assert await auth.async_get_status("TAG_2", "Invalid") == "Expired"
+    assert await auth.async_get_status("TAG_3", "Invalid") == "Invalid"
+    assert await auth.async_get_status("TAG_4", "Invalid") is None
+    assert len(auth.cache) == 3
+
+    # a missing file fails, the default status is used
+    missing = Authorization([FileProvider(host, str(tmp_path / "missing.db"))])
+    assert await missing.async_get_status("TAG_1", "Invalid") is None
+    assert len(missing.cache) == 0
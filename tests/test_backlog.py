@@ -0,0 +1,327 @@
+"""Test ingestion of meter values queued by chargers while offline."""
+
+import asyncio
+import contextlib
+from datetime import datetime, timedelta, UTC
+from types import SimpleNamespace
+
+import pytest
+import websockets
+from websockets.protocol import State
+
+from ocpp.v16 import call
+from ocpp.v201.enums import TransactionEventEnumType, TriggerReasonEnumType
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CONF_PORT,
+    DOMAIN,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.host import (
+    HistoricalSample,
+    HomeAssistantHost,
+    HostEntry,
+    StandaloneHost,
+    hourly_statistics,
+)
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+
+from .charge_point_test import wait_ready
+from .const import MOCK_CONFIG_CP_APPEND, MOCK_CONFIG_DATA
+from .test_charge_point_v16 import ChargePoint
+
+
+@pytest.fixture
+def short_debounce(monkeypatch):
+    """Shorten the quiet period that ends a backlog burst."""
+    monkeypatch.setattr("custom_components.ocpp.chargepoint.BACKLOG_DEBOUNCE", 0.3)
+
+
+def test_hourly_statistics():
+    """Test registers are summed and other measurands averaged per hour."""
+    t0 = datetime(2024, 1, 1, 10, 5, tzinfo=UTC)
+    samples = [
+        HistoricalSample(t0 + timedelta(minutes=70), 1, "Voltage", 232.0, "V"),
+        HistoricalSample(t0, 1, "Voltage", 228.0, "V"),
+        HistoricalSample(t0 + timedelta(minutes=10), 1, "Voltage", 230.0, "V"),
+        HistoricalSample(t0, 0, "Energy.Active.Import.Register", 1.0, "kWh"),
+        HistoricalSample(
+            t0 + timedelta(minutes=50), 0, "Energy.Active.Import.Register", 2.0, "kWh"
+        ),
+    ]
+    stats = {
+        meta["statistic_id"]: (meta, s) for meta, s in hourly_statistics("cp", samples)
+    }
+
+    meta, voltage = stats["ocpp:cp_1_voltage"]
+    assert meta["has_mean"] and not meta["has_sum"]
+    assert meta["unit_of_measurement"] == "V"
+    assert voltage == [
+        {"start": t0.replace(minute=0), "mean": 229.0, "min": 228.0, "max": 230.0},
+        {
+            "start": t0.replace(hour=11, minute=0),
+            "mean": 232.0,
+            "min": 232.0,
+            "max": 232.0,
+        },
+    ]
+
+    meta, energy = stats["ocpp:cp_energy_active_import_register"]
+    assert meta["has_sum"] and not meta["has_mean"]
+    assert meta["source"] == DOMAIN
+    assert energy == [{"start": t0.replace(minute=0), "state": 2.0, "sum": 2.0}]
+
+
+async def test_home_assistant_host_imports_statistics(hass, monkeypatch):
+    """Test statistics are only added when the recorder is loaded."""
+    added = []
+    monkeypatch.setattr(
+        "homeassistant.components.recorder.statistics.async_add_external_statistics",
+        lambda hass, metadata, stats: added.append((metadata, stats)),
+    )
+    host = HomeAssistantHost(hass)
+    samples = [HistoricalSample(datetime.now(tz=UTC), 1, "Voltage", 230.0, "V")]
+
+    await host.async_import_statistics("CP_1", "cp", samples)
+    assert added == []
+
+    hass.config.components.add("recorder")
+    await host.async_import_statistics("CP_1", "cp", samples)
+    metadata, stats = added[0]
+    assert metadata["statistic_id"] == "ocpp:cp_1_voltage"
+    assert metadata["mean_type"].name == "ARITHMETIC"
+    assert "has_mean" not in metadata
+    assert stats[0]["mean"] == 230.0
+
+
+async def test_statistics_of_an_hour_imported_again(hass, monkeypatch):
+    """Test a second backlog in the same hour keeps the samples of the first."""
+    added = []
+    monkeypatch.setattr(
+        "homeassistant.components.recorder.statistics.async_add_external_statistics",
+        lambda hass, metadata, stats: added.append(stats),
+    )
+    hass.config.components.add("recorder")
+    host = HomeAssistantHost(hass)
+    t0 = datetime(2024, 1, 1, 9, 50, tzinfo=UTC)
+
+    def voltage(minutes, value):
+        return HistoricalSample(
+            t0 + timedelta(minutes=minutes), 1, "Voltage", value, "V"
+        )
+
+    await host.async_import_statistics(
+        "CP_1", "cp", [voltage(0, 220.0), voltage(15, 228.0)]
+    )
+    await host.async_import_statistics("CP_1", "cp", [voltage(30, 232.0)])
+    await host.async_import_statistics("CP_2", "cp2", [voltage(40, 240.0)])
+    assert added[1] == [
+        {
+            "start": t0.replace(hour=10, minute=0),
+            "mean": 230.0,
+            "min": 228.0,
+            "max": 232.0,
+        }
+    ]
+    assert added[2][0]["mean"] == 240.0
+
+    # only the latest hour is imported again
+    await host.async_import_statistics("CP_1", "cp", [voltage(80, 234.0)])
+    assert [s["start"].hour for s in added[3]] == [10, 11]
+
+
+async def test_clock_offset():
+    """Test meter values of a charger with a clock behind are not a backlog."""
+    cp = _mk_v201(StandaloneHost())
+    now = datetime.now(tz=UTC)
+    assert cp.is_historical(now - timedelta(minutes=10))
+    assert not cp.is_historical(None)
+
+    cp.on_status_notification(
+        (now - timedelta(minutes=10)).isoformat(), "Available", 1, 1
+    )
+    assert not cp.is_historical(now - timedelta(minutes=10))
+    assert cp.is_historical(now - timedelta(minutes=20))
+
+
+@pytest.mark.timeout(20)
+async def test_v16_backlog_published_once(socket_enabled, short_debounce):
+    """Test a burst of queued meter values is published once, in order."""
+    port = 9424
+    cp_id = "CP_backlog"
+    entry = HostEntry(
+        "backlog",
+        {
+            **MOCK_CONFIG_DATA,
+            CONF_CSID: "backlog",
+            CONF_PORT: port,
+            CONF_CPIDS: [{cp_id: {**MOCK_CONFIG_CP_APPEND, "cpid": "bl_cpid"}}],
+        },
+    )
+    host = StandaloneHost()
+    cs = await CentralSystem.create(None, entry, host)
+    start = datetime.now(tz=UTC) - timedelta(hours=3)
+    try:
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}/{cp_id}", subprotocols=["ocpp1.6"]
+        ) as ws:
+            client = ChargePoint(f"{cp_id}_client", ws)
+            task = asyncio.create_task(client.start())
+            try:
+                await client.send_boot_notification()
+                srv = cs.charge_points[cp_id]
+                await wait_ready(srv)
+                await asyncio.sleep(0.1)
+
+                updates = []
+                publish = host.async_publish_update
+
+                async def counting_publish(*args):
+                    updates.append(srv._metrics[(1, "Voltage")].value)
+                    await publish(*args)
+
+                host.async_publish_update = counting_publish
+
+                for i in range(5):
+                    buckets = [
+                        {
+                            "timestamp": (
+                                start + timedelta(minutes=20 * i + m)
+                            ).isoformat(),
+                            "sampledValue": [
+                                {
+                                    "value": str(220 + 2 * i + m),
+                                    "measurand": "Voltage",
+                                    "unit": "V",
+                                }
+                            ],
+                        }
+                        for m in (1, 0)  # newest bucket first
+                    ]
+                    await client.call(
+                        call.MeterValues(connector_id=1, meter_value=buckets)
+                    )
+                assert updates == []
+                assert srv._metrics[(1, "Voltage")].value == 229.0
+
+                await asyncio.sleep(0.5)
+                assert updates == [229.0]
+                samples = host.statistics[cp_id]
+                assert len(samples) == 10
+                assert [s.value for s in samples[:4]] == [220.0, 221.0, 222.0, 223.0]
+                assert samples[0].timestamp == start
+
+                # live values are published straight away
+                await client.call(
+                    call.MeterValues(
+                        connector_id=1,
+                        meter_value=[
+                            {
+                                "timestamp": datetime.now(tz=UTC).isoformat(),
+                                "sampledValue": [
+                                    {"value": "231", "measurand": "Voltage"}
+                                ],
+                            }
+                        ],
+                    )
+                )
+                await asyncio.sleep(0.05)
+                assert updates == [229.0, 231.0]
+                assert len(host.statistics[cp_id]) == 10
+            finally:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+    finally:
+        await cs.async_stop()
+
+
+def _mk_v201(host):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="v201_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol="ocpp2.0.1", close=lambda: asyncio.sleep(0)
+    )
+    return ChargePointv201("CP_v201", conn, host, HostEntry("e1"), central, charger)
+
+
+async def test_v201_offline_transaction_events(short_debounce):
+    """Test offline transaction events are coalesced into one update."""
+    host = StandaloneHost()
+    cp = _mk_v201(host)
+    updates = []
+
+    async def counting_update(cpid):
+        updates.append(cpid)
+
+    cp.update = counting_update
+
+    start = datetime.now(tz=UTC) - timedelta(minutes=30)
+    for seq in range(3):
+        t = (start + timedelta(minutes=seq)).isoformat()
+        cp.on_transaction_event(
+            TransactionEventEnumType.updated.value,
+            t,
+            TriggerReasonEnumType.meter_value_periodic.value,
+            seq,
+            {"transaction_id": "tx1", "charging_state": "Charging"},
+            offline=True,
+            meter_value=[
+                {
+                    "timestamp": t,
+                    "sampled_value": [
+                        {
+                            "value": 1000 * (seq + 1),
+                            "unit_of_measure": {"unit": "Wh"},
+                        }
+                    ],
+                }
+            ],
+        )
+    await asyncio.sleep(0)
+    assert updates == []
+
+    await asyncio.sleep(0.5)
+    assert updates == ["v201_cpid"]
+    assert [s.value for s in host.statistics["CP_v201"]] == [1.0, 2.0, 3.0]
+    assert host.statistics["CP_v201"][0].unit == "kWh"
+
+    # the import is a task of the charger, samples stay queued if it stops
+    cp._backlog = list(host.statistics.pop("CP_v201"))
+    cp.tasks = []
+    cp.schedule_update()
+    assert cp.pending_tasks == 2
+    await cp.stop()
+    await asyncio.sleep(0)
+    assert len(cp._backlog) == 3 and "CP_v201" not in host.statistics
+
+    # a burst is not flushed after the charger disconnected
+    cp.schedule_update(historical=True)
+    await cp.stop()
+    assert cp._backlog_timer is None
+    await asyncio.sleep(0.5)
+    assert updates == ["v201_cpid"]
@@ -167,7 +167,7 @@ async def test_async_update_device_info_updates_metrics_and_registry(hass):
         id="CP_ID",
         connection=DummyConn(),
         version=OcppVersion.V201,
-        hass=hass,
+        host=hass,
         entry=entry,
         central=central,
         charger=charger,
@@ -1500,9 +1500,9 @@ async def test_get_diagnostics_and_data_transfer_v16(
             service_data={"devid": cpid, "upload_url": "not-a-valid-url"},
             blocking=True,
         )
-        assert any(
-            "Failed to parse url" in rec.message for rec in caplog.records
-        ), "Expected warning for invalid diagnostics upload_url not found"
+        assert any("Failed to parse url" in rec.message for rec in caplog.records), (
+            "Expected warning for invalid diagnostics upload_url not found"
+        )
 
         # --- get_diagnostics: FW profile NOT supported branch ---
         # Simulate that FirmwareManagement profile is not supported by the CP
@@ -1673,25 +1673,26 @@ async def test_get_authorization_status_with_auth_list(
     # 1) Early return path: remote id tag
     srv_cp._remote_id_tag = "REMOTE123"
     assert (
-        srv_cp.get_authorization_status("REMOTE123")
+        await srv_cp.get_authorization_status("REMOTE123")
         == AuthorizationStatus.accepted.value
     )
 
     # 2) Match in auth_list with explicit status
     assert (
-        srv_cp.get_authorization_status("TAG_PRESENT")
+        await srv_cp.get_authorization_status("TAG_PRESENT")
         == AuthorizationStatus.expired.value
     )
 
     # 3) Match in auth_list without explicit status -> default
     assert (
-        srv_cp.get_authorization_status("TAG_NO_STATUS")
+        await srv_cp.get_authorization_status("TAG_NO_STATUS")
         == AuthorizationStatus.blocked.value
     )
 
     # 4) Not found in auth_list -> default
     assert (
-        srv_cp.get_authorization_status("UNKNOWN") == AuthorizationStatus.blocked.value
+        await srv_cp.get_authorization_status("UNKNOWN")
+        == AuthorizationStatus.blocked.value
     )
 
 
@@ -1833,7 +1834,7 @@ async def test_start_transaction_accept_and_reject(
             # 2) Rejected -> False and notify_ha called
             notes = []
 
-            async def fake_notify(msg, title="Ocpp integration"):
+            async def fake_notify(msg, title="Ocpp integration", immediate=False):
                 notes.append((msg, title))
                 return True
 
@@ -1905,7 +1906,7 @@ async def test_stop_transaction_paths(
             # Case C: active tx but reject -> False and notify_ha
             notes = []
 
-            async def fake_notify(msg, title="Ocpp integration"):
+            async def fake_notify(msg, title="Ocpp integration", immediate=False):
                 notes.append(msg)
                 return True
 
@@ -1961,7 +1962,7 @@ async def test_unlock_accept_and_fail(
             # Failure → notify
             notes = []
 
-            async def fake_notify(msg, title="Ocpp integration"):
+            async def fake_notify(msg, title="Ocpp integration", immediate=False):
                 notes.append(msg)
                 return True
 
@@ -2068,14 +2069,18 @@ async def test_on_diagnostics_status_notification(
 
             captured = {"called": 0, "msg": None}
 
-            async def fake_notify(msg: str, title: str = "Ocpp integration"):
+            async def fake_notify(
+                msg: str, title: str = "Ocpp integration", kind: str | None = None
+            ):
                 # record the message; return True like the real notifier
                 captured["msg"] = msg
                 return True
 
             def fake_async_create_task(coro):
-                # actually schedule the coroutine so fake_notify runs
-                captured["called"] += 1
+                # actually schedule the coroutine so fake_notify runs, other
+                # tasks of the charger may still be scheduled meanwhile
+                if coro.__name__ == "fake_notify":
+                    captured["called"] += 1
                 return asyncio.create_task(coro)
 
             monkeypatch.setattr(srv_cp, "notify_ha", fake_notify, raising=True)
@@ -2103,13 +2108,14 @@ async def test_on_diagnostics_status_notification(
 
 @pytest.mark.timeout(30)
 @pytest.mark.parametrize(
-    "setup_config_entry",
-    [{"port": 9077, "cp_id": "CP_phases", "cms": "cms_phases"}],
-    indirect=True,
+    ("num_connectors", "port", "setup_config_entry"),
+    [
+        (1, 9077, {"port": 9077, "cp_id": "CP_phases", "cms": "cms_phases"}),
+        (2, 9081, {"port": 9081, "cp_id": "CP_phases", "cms": "cms_phases"}),
+    ],
+    indirect=["setup_config_entry"],
 )
 @pytest.mark.parametrize("cp_id", ["CP_phases"])
-@pytest.mark.parametrize("port", [9077])
-@pytest.mark.parametrize("num_connectors", [1, 2])
 async def test_current_import_phase_extra_attrs_single_and_multi_connector(
     hass, socket_enabled, cp_id, port, setup_config_entry, num_connectors
 ):
@@ -2186,9 +2192,9 @@ async def test_current_import_phase_extra_attrs_single_and_multi_connector(
             if num_connectors == 1:
                 # Without connector_id -> should resolve (fallback) to connector 1
                 attrs = cs.get_extra_attr(cp_id, "Current.Import", connector_id=None)
-                assert (
-                    attrs is not None
-                ), "Expected extra_attr dict for single-connector"
+                assert attrs is not None, (
+                    "Expected extra_attr dict for single-connector"
+                )
                 assert attrs.get("L1") == 5.0
                 assert attrs.get("L2") == 7.0
                 assert attrs.get("L3") == 8.0
@@ -2205,9 +2211,9 @@ async def test_current_import_phase_extra_attrs_single_and_multi_connector(
                 attrs1 = cs.get_extra_attr(cp_id, "Current.Import", connector_id=1)
                 attrs2 = cs.get_extra_attr(cp_id, "Current.Import", connector_id=2)
 
-                assert (
-                    attrs1 is not None and attrs2 is not None
-                ), "Expected extra_attr dicts for both connectors"
+                assert attrs1 is not None and attrs2 is not None, (
+                    "Expected extra_attr dicts for both connectors"
+                )
 
                 # Connector 1 values
                 assert attrs1.get("L1") == 5.0
@@ -2359,7 +2365,9 @@ async def test_set_availability_final_try_exception_path_with_notify(
 
             captured = {"msg": None}
 
-            async def fake_notify(msg: str, title: str = "Ocpp integration"):
+            async def fake_notify(
+                msg: str, title: str = "Ocpp integration", immediate: bool = False
+            ):
                 captured["msg"] = msg
                 return True
 
@@ -4033,7 +4041,10 @@ async def test_set_charge_rate_exception_paths(
                 raise RuntimeError(f"boom-{call_count_b}")
 
             monkeypatch.setattr(srv, "call", fake_call_case_b)
-            ok_b = await srv.set_charge_rate(limit_amps=12, conn_id=1)
+            # a different limit, the profile accepted in case A is not sent again
+            ok_b = await srv.set_charge_rate(
+                limit_amps=12, limit_watts=12000, conn_id=1
+            )
             assert ok_b is False
             assert call_count_b >= 2  # at least CP-max + TxProfile tried
 
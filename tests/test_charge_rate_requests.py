@@ -0,0 +1,120 @@
+"""Test only the latest charge rate request of a connector is sent."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from websockets.protocol import State
+
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+
+
+def _mk_cp():
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="rate_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(state=State.CLOSED, close=lambda: asyncio.sleep(0))
+    cp = ChargePointv16(
+        "CP_rate", conn, StandaloneHost(), HostEntry("e1"), central, charger
+    )
+    sent = []
+    release = asyncio.Event()
+
+    async def set_charge_rate(limit_amps=32, conn_id=0, **kwargs):
+        sent.append((conn_id, limit_amps))
+        await release.wait()
+        if limit_amps < 0:
+            raise ValueError("negative limit")
+        return True
+
+    cp.set_charge_rate = set_charge_rate
+    return cp, sent, release
+
+
+async def test_latest_request_wins():
+    """Test requests made while one is sent replace each other."""
+    cp, sent, release = _mk_cp()
+    first = asyncio.create_task(cp.request_charge_rate(limit_amps=6))
+    await asyncio.sleep(0.01)
+    assert sent == [(0, 6)]
+
+    ramp = [
+        asyncio.create_task(cp.request_charge_rate(limit_amps=amps))
+        for amps in (8, 10, 12)
+    ]
+    other = asyncio.create_task(cp.request_charge_rate(conn_id=1, limit_amps=16))
+    await asyncio.sleep(0.01)
+    # superseded requests resolve without being sent
+    assert ramp[0].done() and ramp[1].done()
+    assert await ramp[0] is None and await ramp[1] is None
+    # connectors do not wait for each other
+    assert sent == [(0, 6), (1, 16)]
+
+    release.set()
+    assert await first is True
+    assert await ramp[2] is True
+    assert await other is True
+    assert sent == [(0, 6), (1, 16), (0, 12)]
+    assert not cp._rate_senders and not cp._pending_rates
+
+
+async def test_failed_request_raises():
+    """Test the caller of a request that was sent gets its exception."""
+    cp, sent, release = _mk_cp()
+    release.set()
+    with pytest.raises(ValueError):
+        await cp.request_charge_rate(limit_amps=-1)
+    assert await cp.request_charge_rate(limit_amps=10) is True
+    assert sent == [(0, -1), (0, 10)]
+
+
+async def test_stop_resolves_requests():
+    """Test requests of a charger that stops do not wait forever."""
+    cp, sent, release = _mk_cp()
+    cp.tasks = []
+    sending = asyncio.create_task(cp.request_charge_rate(limit_amps=6))
+    await asyncio.sleep(0.01)
+    waiting = asyncio.create_task(cp.request_charge_rate(limit_amps=8))
+    await asyncio.sleep(0.01)
+
+    await cp.stop()
+    assert await asyncio.wait_for(sending, 1) is None
+    assert await asyncio.wait_for(waiting, 1) is None
+    assert sent == [(0, 6)]
+    assert not cp._rate_senders and not cp._pending_rates
+
+
+async def test_sender_is_a_charger_task():
+    """Test the sender counts as a task of the charger and stops with it."""
+    cp, sent, release = _mk_cp()
+    cp.tasks = []
+    request = asyncio.create_task(cp.request_charge_rate(limit_amps=6))
+    await asyncio.sleep(0)
+    assert cp.pending_tasks == 1
+
+    # stopped before the sender started
+    await cp.stop()
+    assert await asyncio.wait_for(request, 1) is None
+    assert sent == []
+    assert not cp._rate_senders and not cp._pending_rates
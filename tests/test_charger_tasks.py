@@ -0,0 +1,96 @@
+"""Test the background tasks of a charger are bounded and cancelled."""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from custom_components.ocpp.chargepoint import TaskGroup
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.enums import HAChargerStatuses as cstat
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+
+
+def _mk_cp(host, max_tasks):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="tasks_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+        max_tasks=max_tasks,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol="ocpp1.6", close=lambda: asyncio.sleep(0)
+    )
+    cp = ChargePointv16("CP_tasks", conn, host, HostEntry("e1"), central, charger)
+    cp.tasks = []
+    return cp
+
+
+async def test_tasks_bounded_and_cancelled_on_disconnect():
+    """Test tasks over the limit are dropped and the rest cancelled on stop."""
+    host = StandaloneHost()
+    cp = _mk_cp(host, max_tasks=2)
+    release = asyncio.Event()
+    started = []
+
+    async def work(n):
+        started.append(n)
+        await release.wait()
+
+    tasks = [cp.create_task(work(n)) for n in range(3)]
+    assert tasks[2] is None
+    await asyncio.sleep(0)
+    assert started == [0, 1]
+    # the host keeps track of them too
+    assert all(task in host._tasks for task in tasks[:2])
+
+    cp._update_task_metrics()
+    metric = cp._metrics[(0, cstat.tasks.value)]
+    assert metric.value == 2
+    assert metric.extra_attr == {"dropped": 1, "limit": 2}
+
+    await cp.stop()
+    await asyncio.gather(*tasks[:2], return_exceptions=True)
+    assert all(task.cancelled() for task in tasks[:2])
+    assert len(cp._task_group) == 0
+
+
+async def test_failed_task_logged(caplog):
+    """Test a failing task is logged and a task may stop its own group."""
+    group = TaskGroup(StandaloneHost(), "CP_fail")
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def stop():
+        group.cancel()
+        await asyncio.sleep(0)
+        return "done"
+
+    with caplog.at_level(logging.ERROR):
+        failed = group.create_task(fail())
+        stopping = group.create_task(stop())
+        assert await stopping == "done"
+        await asyncio.gather(failed, return_exceptions=True)
+        await asyncio.sleep(0)
+    assert "CP_fail: background task failed" in caplog.text
+    assert len(group) == 0
@@ -0,0 +1,177 @@
+"""Test shedding non-essential work when the event loop is overloaded."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from custom_components.ocpp.chargepoint import MeasurandValue
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.degradation import (
+    DegradationController,
+    DegradationLevel,
+)
+from custom_components.ocpp.enums import HAChargerStatuses as cstat
+from custom_components.ocpp.digest import NotificationDigest
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+
+# the tests patch notify_ha of chargers, this is the one sending
+NOTIFY_HA = ChargePointv16.notify_ha
+
+
+def _mk_cp(host, degradation):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="load_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol="ocpp1.6", close=lambda: asyncio.sleep(0)
+    )
+    cp = ChargePointv16("CP_load", conn, host, HostEntry("e1"), central, charger)
+    cp.tasks = []
+    cp.degradation = degradation
+    return cp
+
+
+async def test_level_and_deferred_notifications():
+    """Test the level follows the load with hysteresis and notifications wait."""
+    host = StandaloneHost()
+    pending = [0]
+    changes = []
+    ctrl = DegradationController(
+        host,
+        lambda: pending[0],
+        changes.append,
+        recovery_checks=2,
+        max_pending=10,
+        max_deferred=1,
+    )
+
+    ctrl.check(0.01)
+    assert ctrl.level is DegradationLevel.normal
+    assert not ctrl.defer_notification("now", "t")
+
+    pending[0] = 10
+    ctrl.check(0.01)
+    assert ctrl.level is DegradationLevel.reduced
+    ctrl.check(0.6)
+    assert ctrl.level is DegradationLevel.minimal
+    assert ctrl.defer_notification("first", "t")
+    assert ctrl.defer_notification("second", "t")
+
+    # lowered one step after calm checks in a row
+    pending[0] = 0
+    ctrl.check(0.2)
+    assert ctrl.level is DegradationLevel.minimal
+    ctrl.check(0.0)
+    assert ctrl.level is DegradationLevel.reduced
+    ctrl.check(0.0)
+    ctrl.check(0.0)
+    assert ctrl.level is DegradationLevel.normal
+    assert changes == [
+        DegradationLevel.reduced,
+        DegradationLevel.minimal,
+        DegradationLevel.reduced,
+        DegradationLevel.normal,
+    ]
+    await asyncio.gather(*host._tasks)
+    assert host.notifications == [
+        ("t", "first"),
+        ("Ocpp integration", "1 more notifications were dropped while overloaded"),
+    ]
+
+
+async def test_lag_measured():
+    """Test blocking the event loop raises the level."""
+    host = StandaloneHost()
+    ctrl = DegradationController(host, lambda: 0, check_interval=0.01)
+    ctrl.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.6)
+    await asyncio.sleep(0.05)
+    ctrl.stop()
+    assert ctrl.level is DegradationLevel.minimal
+
+
+async def test_charger_sheds_work():
+    """Test a degraded charger skips diagnostics, phases and frequent updates."""
+    host = StandaloneHost()
+    ctrl = DegradationController(host, lambda: 0)
+    cp = _mk_cp(host, ctrl)
+    deltas = []
+    host.subscribe(deltas.append)
+
+    cp.process_phases(
+        [MeasurandValue("Voltage", 228.0, "L1-N", "V", "Sample.Periodic", None)],
+        connector_id=1,
+    )
+    assert cp._metrics[(1, "Voltage")].extra_attr["L1-N"] == 228.0
+
+    ctrl.level = DegradationLevel.reduced
+    await cp.update(cp.settings.cpid)
+    assert cp._metrics[(0, cstat.degradation.value)].value == "reduced"
+    assert cp._metrics[(0, cstat.tasks.value)].value is None
+    cp.process_phases(
+        [
+            MeasurandValue("Voltage", 230.0, "L1-N", "V", "Sample.Periodic", None),
+            MeasurandValue("Voltage", 232.0, "L2-N", "V", None, None),
+        ],
+        connector_id=1,
+    )
+    assert cp._metrics[(1, "Voltage")].value == 231.0
+    # stale per phase values are not shown
+    assert "L1-N" not in cp._metrics[(1, "Voltage")].extra_attr
+    assert "context" not in cp._metrics[(1, "Voltage")].extra_attr
+    assert await cp.notify_ha("later")
+    assert host.notifications == []
+    # answers to an action of the user are not held back, nor collected
+    cp.digest = NotificationDigest(host, window=30)
+    assert await NOTIFY_HA(cp, "Charger rebooted")
+    assert await NOTIFY_HA(cp, "Warning: Reset failed", immediate=True)
+    assert host.notifications == [("Ocpp integration", "Warning: Reset failed")]
+    assert len(cp.digest) == 1
+    await cp.digest.async_send()
+    assert host.notifications[-1] == ("Ocpp integration", "Charger rebooted")
+    cp.digest = None
+
+    # at the minimal level updates are combined
+    ctrl.level = DegradationLevel.minimal
+    published = len(deltas)
+    await cp.update(cp.settings.cpid)
+    await cp.update(cp.settings.cpid)
+    assert len(deltas) == published
+    assert cp._publish_timer is not None
+    await cp.stop()
+    assert cp._publish_timer is None
+
+    ctrl.level = DegradationLevel.normal
+    await cp.update(cp.settings.cpid)
+    assert cp._metrics[(0, cstat.tasks.value)].value == 0
+    assert cp._metrics[(0, cstat.degradation.value)].value == "normal"
+    # the latest per phase values are shown again on recovery
+    assert cp._metrics[(1, "Voltage")].extra_attr == {
+        "unit": "V",
+        "L1-N": 230.0,
+        "L2-N": 232.0,
+        "context": "Sample.Periodic",
+    }
@@ -0,0 +1,154 @@
+"""Test the OCPP 2.0.1 device model index."""
+
+import asyncio
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from ocpp.v201 import call, call_result
+
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.devicemodel import DeviceModel
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+
+
+def _report(component, variable, *attributes):
+    return {
+        "component": component,
+        "variable": variable,
+        "variable_attribute": list(attributes),
+    }
+
+
+def test_bounded_index():
+    """Test values are indexed by attribute and the size is bounded."""
+    model = DeviceModel(max_entries=3, max_value=6)
+    ctrlr = {"name": "OCPPCommCtrlr"}
+    connector = {"name": "Connector", "evse": {"id": 1, "connector_id": 2}}
+    model.add_report(
+        _report(
+            ctrlr,
+            {"name": "HeartbeatInterval"},
+            {"value": "60"},
+            {"type": "MaxSet", "value": "3600"},
+            {"type": "Target"},
+        )
+    )
+    assert model.get(ctrlr, {"name": "HeartbeatInterval"}) == "60"
+    assert model.get(ctrlr, {"name": "HeartbeatInterval"}, "MaxSet") == "3600"
+    assert model.get(ctrlr, {"name": "HeartbeatInterval"}, "Target") is None
+    assert model.get(ctrlr, {"name": "HeartbeatInterval", "instance": "x"}) is None
+
+    # the least recently updated value is dropped
+    model.set(connector, {"name": "Available"}, "true")
+    model.set(ctrlr, {"name": "HeartbeatInterval"}, "30")
+    model.set(connector, {"name": "ConnectorType"}, "cType2")
+    assert len(model) == 3
+    assert model.get(ctrlr, {"name": "HeartbeatInterval"}, "MaxSet") is None
+    assert model.get(connector, {"name": "Available"}) == "true"
+    assert model.get({"name": "Connector"}, {"name": "Available"}) is None
+
+    # long values are not kept
+    model.set(connector, {"name": "Available"}, "too long")
+    assert model.get(connector, {"name": "Available"}) is None
+    assert len(model) == 2
+    model.clear()
+    assert len(model) == 0
+
+
+def _mk_cp():
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="model_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol="ocpp2.0.1", close=lambda: asyncio.sleep(0)
+    )
+    cp = ChargePointv201(
+        "CP_model", conn, StandaloneHost(), HostEntry("e1"), central, charger
+    )
+    cp.sent = []
+
+    async def fake_call(req, *args, **kwargs):
+        cp.sent.append(req)
+        if isinstance(req, call.GetVariables):
+            return call_result.GetVariables(
+                [{"attribute_status": "Accepted", "attribute_value": "900"}]
+            )
+        status = {"1": "Accepted", "2": "RebootRequired"}[
+            req.set_variable_data[0]["attribute_value"]
+        ]
+        return call_result.SetVariables([{"attribute_status": status}])
+
+    cp.call = fake_call
+    return cp
+
+
+async def test_configuration_from_device_model():
+    """Test reported and set values are read without a request."""
+    cp = _mk_cp()
+    cp.on_report(
+        1,
+        "2025-01-01T00:00:00Z",
+        0,
+        report_data=[
+            _report(
+                {"name": "OCPPCommCtrlr"},
+                {"name": "HeartbeatInterval"},
+                {"value": "60", "mutability": "ReadWrite"},
+            )
+        ],
+    )
+    assert await cp.get_configuration("OCPPCommCtrlr/HeartbeatInterval") == "60"
+    assert cp.sent == []
+
+    # read once from the charger, then from the index
+    for _ in range(2):
+        assert await cp.get_configuration("TxCtrlr/EVConnectionTimeOut") == "900"
+    assert len(cp.sent) == 1
+
+    await cp.configure("OCPPCommCtrlr/HeartbeatInterval", "1")
+    assert await cp.get_configuration("OCPPCommCtrlr/HeartbeatInterval") == "1"
+    await cp.configure("OCPPCommCtrlr/HeartbeatInterval", "2")
+    assert await cp.get_configuration("OCPPCommCtrlr/HeartbeatInterval") == "900"
+
+    cp.on_notify_event(
+        generated_at="2025-01-01T00:00:00Z",
+        seq_no=0,
+        event_data=[
+            {
+                "component": {"name": "TxCtrlr"},
+                "variable": {"name": "EVConnectionTimeOut"},
+                "actual_value": "120",
+            }
+        ],
+    )
+    assert await cp.get_configuration("TxCtrlr/EVConnectionTimeOut") == "120"
+
+    # a reboot with other firmware forgets the device model
+    boot = {"vendor_name": "ACME", "model": "Wall", "firmware_version": "1"}
+    cp.on_boot_notification(boot, "PowerUp")
+    assert len(cp.device_model) == 0
+    cp.device_model.set({"name": "A"}, {"name": "B"}, "C")
+    cp.on_boot_notification(boot, "PowerUp")
+    assert len(cp.device_model) == 1
+    await asyncio.gather(*cp.host._tasks, return_exceptions=True)
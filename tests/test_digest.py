@@ -0,0 +1,76 @@
+"""Test the notifications of chargers are sent as a digest."""
+
+import asyncio
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.const import CONF_NOTIFICATION_WINDOW
+from custom_components.ocpp.degradation import (
+    DegradationController,
+    DegradationLevel,
+)
+from custom_components.ocpp.digest import NotificationDigest
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+
+from .const import MOCK_CONFIG_DATA
+
+TITLE = "Ocpp integration"
+
+
+async def test_digest_deduplicated():
+    """Test events are kept by charger and kind and sent once per window."""
+    host = StandaloneHost()
+    digest = NotificationDigest(host, window=0.01, max_events=3)
+    digest.add("CP_1", "Firmware upload status: Downloading", TITLE, "firmware")
+    digest.add("CP_1", "Firmware upload status: Installed", TITLE, "firmware")
+    digest.add("CP_2", "Firmware upload status: Downloading", TITLE, "firmware")
+    for _ in range(3):
+        digest.add("CP_2", "Charger CP_2 rebooted", TITLE)
+    digest.add("CP_3", "Charger CP_3 rebooted", TITLE)
+    assert len(digest) == 3
+    await asyncio.sleep(0.05)
+    await asyncio.gather(*host._tasks)
+    assert host.notifications == [
+        (
+            TITLE,
+            "4 charger events:\n"
+            "- CP_1: Firmware upload status: Installed (2 times)\n"
+            "- CP_2: Firmware upload status: Downloading\n"
+            "- CP_2: Charger CP_2 rebooted (3 times)\n"
+            "- and 1 more",
+        )
+    ]
+    assert len(digest) == 0
+
+    # a single event is sent as it is
+    digest.add("CP_1", "Charger CP_1 rebooted", TITLE)
+    await digest.async_send()
+    assert host.notifications[-1] == (TITLE, "Charger CP_1 rebooted")
+    await digest.async_send()
+    assert len(host.notifications) == 2
+
+
+async def test_digest_waits_while_degraded():
+    """Test the digest is held back until the load is normal."""
+    host = StandaloneHost()
+    degradation = DegradationController(host, lambda: 0)
+    degradation.level = DegradationLevel.reduced
+    digest = NotificationDigest(host, window=0.01, degradation=degradation)
+    digest.add("CP_1", "Charger CP_1 rebooted", TITLE)
+    await asyncio.sleep(0.05)
+    assert host.notifications == []
+    assert digest._timer is not None
+
+    degradation.level = DegradationLevel.normal
+    await asyncio.sleep(0.05)
+    await asyncio.gather(*host._tasks)
+    assert host.notifications == [(TITLE, "Charger CP_1 rebooted")]
+
+
+def test_digest_option():
+    """Test a window of 0 sends each notification."""
+    host = StandaloneHost()
+    cs = CentralSystem(None, HostEntry("digest", MOCK_CONFIG_DATA), host)
+    assert cs.digest.window == 30
+    data = {**MOCK_CONFIG_DATA, CONF_NOTIFICATION_WINDOW: 0}
+    cs = CentralSystem(None, HostEntry("each", data), host)
+    assert cs.digest is None
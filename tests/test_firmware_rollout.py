@@ -0,0 +1,305 @@
+"""Test staggered firmware rollouts."""
+
+import asyncio
+from datetime import datetime, UTC
+from types import SimpleNamespace
+
+from homeassistant.const import STATE_OK, STATE_UNAVAILABLE
+from homeassistant.exceptions import HomeAssistantError
+import pytest
+from ocpp.v16 import call_result as call_result_v16
+from ocpp.v201 import call, call_result
+from ocpp.v201.enums import UpdateFirmwareStatusEnumType
+from websockets.protocol import State
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.enums import HAChargerServices as csvcs
+from custom_components.ocpp.enums import Profiles
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+from custom_components.ocpp import rollout as rollout_module
+from custom_components.ocpp.rollout import FirmwareRollout
+
+from .const import MOCK_CONFIG_DATA
+
+URL = "http://example.com/fw.bin"
+
+
+class FakeCharger:
+    """Charger recording firmware updates."""
+
+    def __init__(self, id, ok=True):
+        """Initialize."""
+        self.id = id
+        self.status = STATE_OK
+        self.ok = ok
+        self.updates = []
+
+    async def update_firmware(self, firmware_url, wait_time=0):
+        """Record the update."""
+        self.updates.append((firmware_url, wait_time))
+        if isinstance(self.ok, Exception):
+            raise self.ok
+        return self.ok
+
+
+async def _settle(host):
+    while host._tasks:
+        await asyncio.gather(*host._tasks)
+
+
+def _states(rollout):
+    return rollout.status["chargers"]
+
+
+async def test_window_and_progress(tmp_path):
+    """Test chargers are updated a window at a time as updates complete."""
+    host = StandaloneHost(storage_dir=str(tmp_path))
+    chargers = {f"cp{n}": FakeCharger(f"cp{n}") for n in range(5)}
+    chargers["cp1"].status = STATE_UNAVAILABLE
+    rollout = FirmwareRollout(host, host.store("rollout"), chargers.get)
+
+    await rollout.start(list(chargers), URL, window=2, max_failures=2, wait_time=1)
+    assert _states(rollout) == {
+        "cp0": "updating",
+        "cp1": "pending",
+        "cp2": "updating",
+        "cp3": "pending",
+        "cp4": "pending",
+    }
+    assert chargers["cp0"].updates == [(URL, 1)]
+
+    # intermediate statuses and unknown chargers are ignored
+    rollout.firmware_status("cp0", "Downloading")
+    rollout.firmware_status("other", "Installed")
+    assert not host._tasks
+
+    rollout.firmware_status("cp0", "Installed")
+    await _settle(host)
+    assert _states(rollout)["cp3"] == "updating"
+
+    # an offline charger is started once it connects and there is room
+    chargers["cp1"].status = STATE_OK
+    rollout.firmware_status("cp2", "Installed")
+    await _settle(host)
+    assert _states(rollout)["cp1"] == "updating"
+    assert rollout.status["counts"] == {
+        "pending": 1,
+        "updating": 2,
+        "installed": 2,
+        "failed": 0,
+    }
+
+    # progress survives a restart
+    restarted = FirmwareRollout(
+        host, StandaloneHost(storage_dir=str(tmp_path)).store("rollout"), chargers.get
+    )
+    await restarted.async_load()
+    assert restarted.status == rollout.status
+
+    for cpid in ("cp1", "cp3", "cp4"):
+        restarted.firmware_status(cpid, "Installed")
+        await _settle(host)
+    assert restarted.status["state"] == "done"
+    assert len(chargers["cp4"].updates) == 1
+
+
+async def test_pause_on_failures():
+    """Test the rollout pauses after max_failures and can be resumed."""
+    host = StandaloneHost()
+    chargers = {f"cp{n}": FakeCharger(f"cp{n}") for n in range(5)}
+    chargers["cp1"].ok = RuntimeError("offline")
+    rollout = FirmwareRollout(host, host.store("rollout"), chargers.get)
+
+    # cp1 fails at once, cp2 takes its place
+    await rollout.start(list(chargers), URL, window=2, max_failures=2)
+    assert list(_states(rollout).values()) == [
+        "updating",
+        "failed",
+        "updating",
+        "pending",
+        "pending",
+    ]
+    with pytest.raises(ValueError):
+        await rollout.start(["cp9"], URL)
+
+    rollout.firmware_status("cp0", "InstallationFailed")
+    await _settle(host)
+    assert rollout.status["state"] == "paused"
+    assert host.notifications
+    rollout.firmware_status("cp2", "Installed")
+    await _settle(host)
+    assert _states(rollout)["cp3"] == "pending"
+
+    await rollout.resume()
+    assert _states(rollout)["cp3"] == "updating"
+    assert _states(rollout)["cp4"] == "updating"
+
+    await rollout.cancel()
+    assert rollout.status["state"] == "cancelled"
+    await rollout.start(["cp0"], URL)
+    assert _states(rollout) == {"cp0": "updating"}
+
+
+async def test_last_failure_ends_rollout():
+    """Test a failure with no charger left to start ends the rollout."""
+    host = StandaloneHost()
+    chargers = {f"cp{n}": FakeCharger(f"cp{n}") for n in range(2)}
+    rollout = FirmwareRollout(host, host.store("rollout"), chargers.get)
+    await rollout.start(list(chargers), URL, window=1, max_failures=1)
+    rollout.firmware_status("cp0", "Installed")
+    await _settle(host)
+    rollout.firmware_status("cp1", "DownloadFailed")
+    await _settle(host)
+    assert rollout.status["state"] == "done"
+    assert not host.notifications
+
+
+async def test_update_timeout(tmp_path, monkeypatch):
+    """Test a charger without a final status fails once its deadline passed."""
+    now = 1000.0
+    monkeypatch.setattr(rollout_module.time, "time", lambda: now)
+    host = StandaloneHost(storage_dir=str(tmp_path))
+    chargers = {f"cp{n}": FakeCharger(f"cp{n}") for n in range(3)}
+    rollout = FirmwareRollout(host, host.store("rollout"), chargers.get)
+    await rollout.start(
+        list(chargers), URL, window=2, max_failures=2, wait_time=1, update_timeout=5
+    )
+    assert rollout.status["deadlines"] == {"cp0": 4900.0, "cp1": 4900.0}
+    assert rollout._timer is not None
+    rollout.firmware_status("cp0", "Installed")
+    await _settle(host)
+    assert rollout.status["deadlines"] == {"cp1": 4900.0, "cp2": 4900.0}
+
+    # deadlines are watched again after a restart
+    rollout.stop()
+    assert rollout._timer is None
+    restarted = FirmwareRollout(
+        host, StandaloneHost(storage_dir=str(tmp_path)).store("rollout"), chargers.get
+    )
+    await restarted.async_load()
+    assert restarted._timer is not None
+    now = 4900.0
+    restarted._schedule_expiry()
+    await asyncio.sleep(0.01)
+    await _settle(host)
+    assert _states(restarted) == {"cp0": "installed", "cp1": "failed", "cp2": "failed"}
+    assert restarted.status["state"] == "done"
+    assert restarted._timer is None
+
+
+def _mk_cp(cls, host, subprotocol=None):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid=f"fw_{cls.__module__[-5:]}",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol=subprotocol, close=lambda: asyncio.sleep(0)
+    )
+    cp = cls(f"CP_{charger.cpid}", conn, host, HostEntry("e1"), central, charger)
+    cp.status = STATE_OK
+    cp._attr_supported_features = Profiles.FW
+    cp.requests = []
+    cp.update_status = UpdateFirmwareStatusEnumType.accepted.value
+
+    async def send(req, *args, **kwargs):
+        cp.requests.append(req)
+        if isinstance(req, call.UpdateFirmware):
+            return call_result.UpdateFirmware(cp.update_status)
+        return call_result_v16.UpdateFirmware()
+
+    cp.call = send
+    return cp
+
+
+async def test_v201_update_firmware():
+    """Test a 2.0.1 charger is sent UpdateFirmware and its answer is returned."""
+    cp = _mk_cp(ChargePointv201, StandaloneHost(), "ocpp2.0.1")
+    assert await cp.update_firmware(URL, 2) is True
+    [req] = cp.requests
+    assert req.request_id > 0
+    assert req.firmware["location"] == URL
+    assert req.firmware["retrieveDateTime"] > datetime.now(tz=UTC).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+    cp.update_status = UpdateFirmwareStatusEnumType.rejected.value
+    assert await cp.update_firmware(URL) is False
+    assert await cp.update_firmware("not a url") is False
+    cp._attr_supported_features = 0
+    assert await cp.update_firmware(URL) is False
+    assert len(cp.requests) == 2
+
+
+async def test_firmware_rollout_service(tmp_path):
+    """Test the service and firmware status notifications of both versions."""
+    host = StandaloneHost(storage_dir=str(tmp_path))
+    entry = HostEntry("fw", {**MOCK_CONFIG_DATA, CONF_CSID: "fw", CONF_CPIDS: []})
+    cs = CentralSystem(None, entry, host)
+    await cs.rollout.async_load()
+    service = csvcs.service_firmware_rollout.value
+    v16 = _mk_cp(ChargePointv16, host)
+    v201 = _mk_cp(ChargePointv201, host, "ocpp2.0.1")
+    for cp in (v16, v201):
+        cp.rollout = cs.rollout
+        cs.charge_points[cp.id] = cp
+        cs.cpids[cp.settings.cpid] = cp.id
+
+    assert (await host.async_call_service(service, {"action": "status"}))[
+        "state"
+    ] is None
+    with pytest.raises(HomeAssistantError):
+        await host.async_call_service(service, {})
+
+    result = await host.async_call_service(
+        service, {"firmware_url": URL, "devid": "all", "window": 1}
+    )
+    assert result["chargers"] == {"fw_ppv16": "updating", "fw_pv201": "pending"}
+
+    v16.on_firmware_status("Installed")
+    await _settle(host)
+    assert _states(cs.rollout)["fw_pv201"] == "updating"
+    [req] = v201.requests
+    assert req.firmware["location"] == URL
+    v201.on_firmware_status_notification(status="Installed", request_id=1)
+    await _settle(host)
+    assert cs.rollout.status["state"] == "done"
+
+    # the progress is kept in the storage directory
+    restarted = CentralSystem(None, entry, host)
+    await restarted.rollout.async_load()
+    assert restarted.rollout.status["state"] == "done"
+    restarted.charge_points = cs.charge_points
+    restarted.cpids = cs.cpids
+
+    result = await host.async_call_service(
+        service, {"firmware_url": URL, "devid": "fw_ppv16"}
+    )
+    assert result["chargers"] == {"fw_ppv16": "updating"}
+    result = await host.async_call_service(service, {"action": "pause"})
+    assert result["state"] == "paused"
@@ -0,0 +1,211 @@
+"""Test services run for several chargers at once."""
+
+import asyncio
+from types import SimpleNamespace
+
+from homeassistant.const import STATE_OK, STATE_UNAVAILABLE
+from websockets.protocol import State
+
+from custom_components.ocpp import api
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.chargepoint import SetVariableResult
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.enums import HAChargerDetails as cdet
+from custom_components.ocpp.enums import HAChargerServices as csvcs
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+
+from .const import MOCK_CONFIG_DATA
+
+
+def _mk_cp(host, n, vendor="ABB", model="Terra AC", firmware="1.6.3"):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid=f"fleet_{n}",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(state=State.CLOSED, close=lambda: asyncio.sleep(0))
+    cp = ChargePointv16(f"CP_{n}", conn, host, HostEntry("e1"), central, charger)
+    cp.status = STATE_OK
+    cp._metrics[(0, cdet.vendor.value)].value = vendor
+    cp._metrics[(0, cdet.model.value)].value = model
+    cp._metrics[(0, cdet.firmware_version.value)].value = firmware
+    cp.configured = []
+
+    async def configure(key, value):
+        if value == "fail":
+            raise RuntimeError("rejected")
+        cp.configured.append((key, value))
+        await asyncio.sleep(0.02)
+        return SetVariableResult.accepted
+
+    cp.configure = configure
+    return cp
+
+
+def _mk_cs(chargers):
+    host = StandaloneHost()
+    entry = HostEntry("fleet", {**MOCK_CONFIG_DATA, CONF_CSID: "fleet", CONF_CPIDS: []})
+    cs = CentralSystem(None, entry, host)
+    for n, kwargs in enumerate(chargers):
+        cp = _mk_cp(host, n, **kwargs)
+        cs.charge_points[cp.id] = cp
+        cs.cpids[cp.settings.cpid] = cp.id
+    return cs, host
+
+
+async def test_list_of_devids():
+    """Test a list of devids returns a result per charger."""
+    cs, host = _mk_cs([{}, {}, {}])
+    service = csvcs.service_configure.value
+    cs.charge_points["CP_2"].status = STATE_UNAVAILABLE
+
+    result = await host.async_call_service(
+        service,
+        {
+            "devid": ["fleet_0", "CP_1", "fleet_2", "missing"],
+            "ocpp_key": "HeartbeatInterval",
+            "value": "300",
+        },
+    )
+    assert result == {
+        "results": {
+            "missing": {"success": False, "error": "unknown charger"},
+            "fleet_0": {"success": True, "response": {"reboot_required": False}},
+            "fleet_1": {"success": True, "response": {"reboot_required": False}},
+            "fleet_2": {"success": False, "error": "unavailable"},
+        }
+    }
+    assert cs.charge_points["CP_2"].configured == []
+
+    result = await host.async_call_service(
+        service, {"devid": ["fleet_0"], "ocpp_key": "K", "value": "fail"}
+    )
+    assert result == {"results": {"fleet_0": {"success": False, "error": "rejected"}}}
+
+    # a single devid is unchanged
+    result = await host.async_call_service(
+        service, {"devid": "fleet_1", "ocpp_key": "K", "value": "1"}
+    )
+    assert result == {"reboot_required": False}
+
+
+async def test_selectors():
+    """Test all chargers and vendor, model and firmware filters."""
+    cs, host = _mk_cs(
+        [
+            {},
+            {"vendor": "abb", "firmware": "1.7.0"},
+            {"vendor": "Alfen", "model": "Eve Single"},
+        ]
+    )
+    service = csvcs.service_configure.value
+    data = {"ocpp_key": "K", "value": "1"}
+
+    result = await host.async_call_service(service, {**data, "devid": "all"})
+    assert list(result["results"]) == ["fleet_0", "fleet_1", "fleet_2"]
+
+    result = await host.async_call_service(service, {**data, "vendor": "ABB"})
+    assert list(result["results"]) == ["fleet_0", "fleet_1"]
+
+    result = await host.async_call_service(
+        service, {**data, "vendor": "ABB", "firmware": "1.6.3"}
+    )
+    assert list(result["results"]) == ["fleet_0"]
+
+    result = await host.async_call_service(
+        service, {**data, "devid": ["fleet_1", "fleet_2"], "model": "terra-ac"}
+    )
+    assert list(result["results"]) == ["fleet_1"]
+
+    result = await host.async_call_service(service, {**data, "model": "unknown"})
+    assert result == {"results": {}}
+
+    result = await host.async_call_service(
+        csvcs.service_clear_profile.value, {"devid": "all", "vendor": "Alfen"}
+    )
+    assert result == {"results": {"fleet_2": {"success": True}}}
+
+
+async def test_bounded_concurrency(monkeypatch):
+    """Test chargers are handled concurrently, FLEET_MAX_PARALLEL at a time."""
+    monkeypatch.setattr(api, "FLEET_MAX_PARALLEL", 4)
+    cs, host = _mk_cs([{}] * 12)
+    in_flight = peak = 0
+
+    for cp in cs.charge_points.values():
+
+        async def configure(key, value):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return SetVariableResult.accepted
+
+        cp.configure = configure
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    result = await host.async_call_service(
+        csvcs.service_configure.value, {"devid": "all", "ocpp_key": "K", "value": "1"}
+    )
+    assert len(result["results"]) == 12
+    assert peak == 4
+    # three rounds of four chargers, not twelve calls in a row
+    assert loop.time() - start < 0.5
+
+
+async def test_responses_and_reset():
+    """Test a single charger returns a response and reset runs for several."""
+    cs, host = _mk_cs([{}, {}])
+    result = await host.async_call_service(
+        csvcs.service_clear_profile.value, {"devid": "fleet_0"}
+    )
+    assert result == {"success": True}
+
+    resets = []
+    for cp in cs.charge_points.values():
+
+        async def reset(typ, cp=cp):
+            resets.append((cp.settings.cpid, typ))
+            return cp.settings.cpid == "fleet_0"
+
+        cp.reset = reset
+
+    result = await host.async_call_service(
+        csvcs.service_reset.value, {"devid": "fleet_1"}
+    )
+    assert result == {"accepted": False}
+    result = await host.async_call_service(
+        csvcs.service_reset.value, {"devid": "all", "type": "Soft"}
+    )
+    assert result == {
+        "results": {
+            "fleet_0": {"success": True, "response": {"accepted": True}},
+            "fleet_1": {"success": True, "response": {"accepted": False}},
+        }
+    }
+    assert resets == [("fleet_1", "Hard"), ("fleet_0", "Soft"), ("fleet_1", "Soft")]
@@ -0,0 +1,289 @@
+"""Test running the central system without Home Assistant."""
+
+import asyncio
+import contextlib
+from datetime import datetime, UTC
+import json
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.storage import Store
+import pytest
+import voluptuous as vol
+import websockets
+
+from ocpp.v16 import call
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.chargepoint import _ConnectorAwareMetrics, Metric
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CONF_PORT,
+    DOMAIN,
+    SIGNAL_NEW_METRICS,
+)
+from custom_components.ocpp.enums import HAChargerServices as csvcs
+from custom_components.ocpp.host import (
+    HomeAssistantHost,
+    HostEntry,
+    OcppHost,
+    StandaloneHost,
+    StateDelta,
+)
+
+from .charge_point_test import wait_ready
+from .const import MOCK_CONFIG_CP_APPEND, MOCK_CONFIG_DATA
+from .test_charge_point_v16 import ChargePoint
+
+
+async def test_standalone_host_publishes_deltas():
+    """Test only changed metrics are published to listeners."""
+    host = StandaloneHost()
+    deltas: list[StateDelta] = []
+    unsubscribe = host.subscribe(deltas.append)
+
+    metrics = _ConnectorAwareMetrics()
+    metrics[(0, "Status")] = Metric("Available", None)
+    metrics[(1, "Voltage")] = Metric(230.0, "V")
+    await host.async_publish_update("CP_1", "cpid", metrics)
+    assert deltas[-1].changes == {
+        (0, "Status"): ("Available", None),
+        (1, "Voltage"): (230.0, "V"),
+    }
+
+    metrics[(1, "Voltage")].value = 231.0
+    await host.async_publish_update("CP_1", "cpid", metrics)
+    assert deltas[-1] == StateDelta("CP_1", "cpid", {(1, "Voltage"): (231.0, "V")})
+
+    # nothing changed, nothing published
+    await host.async_publish_update("CP_1", "cpid", metrics)
+    assert len(deltas) == 2
+
+    unsubscribe()
+    metrics[(1, "Voltage")].value = 232.0
+    await host.async_publish_update("CP_1", "cpid", metrics)
+    assert len(deltas) == 2
+
+
+async def test_standalone_host_basics():
+    """Test tasks, executor jobs, states, config and entry updates."""
+    host = StandaloneHost(config={"x": 1}, states={"sensor.a": "1.5"})
+    assert host.hass is None
+    assert host.get_config() == {"x": 1}
+    assert host.get_state("sensor.a") == "1.5"
+    assert host.get_state("sensor.b") is None
+    assert await host.async_add_executor_job(sum, [1, 2]) == 3
+    assert await host.create_task(asyncio.sleep(0, result="done")) == "done"
+    assert await host.async_notify("msg", "title")
+    assert host.notifications == [("title", "msg")]
+
+    entry = HostEntry("e1", {"a": 1})
+    host.update_entry(entry, {"a": 2})
+    assert entry.data == {"a": 2}
+
+
+async def test_standalone_host_services():
+    """Test services are validated and invoked with a service call."""
+    host = StandaloneHost()
+
+    async def handler(call):
+        return {"service": call.service, **call.data}
+
+    host.register_service("echo", handler, vol.Schema({vol.Required("devid"): str}))
+    assert await host.async_call_service("echo", {"devid": "cp"}) == {
+        "service": "echo",
+        "devid": "cp",
+    }
+    with pytest.raises(vol.Invalid):
+        await host.async_call_service("echo", {})
+
+    host.register_service("plain", handler)
+    assert await host.async_call_service("plain") == {"service": "plain"}
+
+    await host.async_discover_charger(None, "CP_new")
+    assert host.undiscovered == {"CP_new"}
+
+
+async def test_standalone_host_stores(tmp_path):
+    """Test stores are shared by key, saved as JSON and kept in memory without files."""
+    host = StandaloneHost(storage_dir=str(tmp_path))
+    store = host.store("ocpp.test", 2)
+    assert host.store("ocpp.test") is store
+    assert await store.async_load() is None
+
+    store.async_delay_save(lambda: {"a": 1}, 10)
+    assert await store.async_load() == {"a": 1}
+    await asyncio.gather(*host._tasks)
+    assert json.loads((tmp_path / "ocpp.test").read_text()) == {
+        "version": 2,
+        "key": "ocpp.test",
+        "data": {"a": 1},
+    }
+    assert await StandaloneHost(storage_dir=str(tmp_path)).store(
+        "ocpp.test"
+    ).async_load() == {"a": 1}
+
+    # a broken file is no data, failed writes are logged
+    (tmp_path / "ocpp.broken").write_text("not json")
+    broken = StandaloneHost(storage_dir=str(tmp_path)).store("ocpp.broken")
+    assert await broken.async_load() is None
+    broken.path = str(tmp_path / "missing" / "file")
+    await broken.async_save({"b": 2})
+
+    memory = StandaloneHost().store("ocpp.test")
+    assert memory.path is None
+    await memory.async_save({"c": 3})
+    assert await memory.async_load() == {"c": 3}
+
+
+async def test_stop_writes_delayed_saves(tmp_path, socket_enabled):
+    """Test a central system stopped right after a delayed save writes it."""
+    entry = HostEntry(
+        "flush",
+        {**MOCK_CONFIG_DATA, CONF_CSID: "flush", CONF_PORT: 9431, CONF_CPIDS: []},
+    )
+    host = StandaloneHost(storage_dir=str(tmp_path))
+    cs = await CentralSystem.create(None, entry, host)
+    run = host.async_add_executor_job
+
+    async def slow_job(target, *args):
+        await asyncio.sleep(0.2)
+        return await run(target, *args)
+
+    host.async_add_executor_job = slow_job
+    await cs.local_lists.async_set("CP_1", 3, {"TAG": "Accepted"})
+    await cs.async_stop()
+    assert json.loads((tmp_path / "ocpp.local_lists.flush").read_text())["data"] == {
+        "CP_1": {"version": 3, "entries": {"TAG": "Accepted"}}
+    }
+
+
+def test_base_host_is_abstract():
+    """Test the base host leaves everything but lookups to subclasses."""
+    with pytest.raises(TypeError):
+        OcppHost()
+
+    assert "create_background_task" in OcppHost.__abstractmethods__
+    assert "store" in OcppHost.__abstractmethods__
+    assert OcppHost.hass is None
+    # lookups have defaults for hosts without states or files
+    assert OcppHost.get_state(None, "sensor.a") is None
+    assert OcppHost.get_config(None) == {}
+    assert OcppHost.storage_path(None, "file.json") is None
+
+
+async def test_home_assistant_host_wraps_hass(hass):
+    """Test the Home Assistant host exposes hass and the YAML config."""
+    hass.data.setdefault(DOMAIN, {})
+    host = HomeAssistantHost(hass)
+    assert host.hass is hass
+    assert host.get_config() == {}
+    hass.states.async_set("sensor.test", "on")
+    assert host.get_state("sensor.test") == "on"
+    assert host.get_state("sensor.missing") is None
+    task = host.create_background_task(asyncio.sleep(0, "done"), "ocpp test")
+    assert await task == "done"
+
+
+async def test_home_assistant_host_stores(hass, hass_storage):
+    """Test Home Assistant stores are shared by all hosts of the instance."""
+    store = HomeAssistantHost(hass).store("ocpp.test")
+    assert isinstance(store, Store)
+    assert HomeAssistantHost(hass).store("ocpp.test") is store
+    await store.async_save({"a": 1})
+    assert hass_storage["ocpp.test"]["data"] == {"a": 1}
+
+
+async def test_home_assistant_host_signals_new_metrics(hass):
+    """Test first values of a charger's metrics are signalled once, per charger."""
+    host = HomeAssistantHost(hass)
+    received = []
+
+    @callback
+    def _received(keys):
+        received.append(keys)
+
+    async_dispatcher_connect(hass, SIGNAL_NEW_METRICS.format("cpid"), _received)
+
+    metrics = _ConnectorAwareMetrics()
+    metrics[(0, "Status")] = Metric("Available", None)
+    metrics[(1, "Voltage")] = Metric(None, "V")
+    host.publish_new_metrics("cpid", metrics.new_values())
+    metrics[(1, "Voltage")].value = 230.0
+    host.publish_new_metrics("cpid", metrics.new_values())
+    host.publish_new_metrics("other", [(1, "Voltage")])
+    await hass.async_block_till_done()
+    assert received == [[(0, "Status")], [(1, "Voltage")]]
+    assert metrics.new_values() == []
+
+
+@pytest.mark.timeout(20)
+async def test_standalone_central_system(socket_enabled):
+    """Test a charger connects and reports metrics with a standalone host."""
+    port = 9420
+    cp_id = "CP_standalone"
+    entry = HostEntry(
+        "standalone",
+        {
+            **MOCK_CONFIG_DATA,
+            CONF_CSID: "standalone",
+            CONF_PORT: port,
+            CONF_CPIDS: [{cp_id: {**MOCK_CONFIG_CP_APPEND, "cpid": "sa_cpid"}}],
+        },
+    )
+    host = StandaloneHost()
+    deltas: list[StateDelta] = []
+    host.subscribe(deltas.append)
+
+    cs = await CentralSystem.create(None, entry, host)
+    assert cs.hass is None
+    assert csvcs.service_configure.value in host.services
+    try:
+        # unknown chargers are recorded and disconnected
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}/CP_unknown", subprotocols=["ocpp1.6"]
+        ) as ws:
+            with contextlib.suppress(websockets.exceptions.ConnectionClosed):
+                await ws.recv()
+        assert "CP_unknown" in host.undiscovered
+
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}/{cp_id}", subprotocols=["ocpp1.6"]
+        ) as ws:
+            client = ChargePoint(f"{cp_id}_client", ws)
+            task = asyncio.create_task(client.start())
+            try:
+                await client.send_boot_notification()
+                await wait_ready(cs.charge_points[cp_id])
+                await client.call(
+                    call.MeterValues(
+                        connector_id=1,
+                        meter_value=[
+                            {
+                                "timestamp": datetime.now(tz=UTC).isoformat(),
+                                "sampledValue": [
+                                    {
+                                        "value": "230.0",
+                                        "measurand": "Voltage",
+                                        "unit": "V",
+                                    }
+                                ],
+                            }
+                        ],
+                    )
+                )
+                await asyncio.sleep(0.1)
+            finally:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+
+        assert frozenset({(DOMAIN, cp_id), (DOMAIN, "sa_cpid")}) in host.devices
+        changes = {}
+        for delta in deltas:
+            assert delta.cp_id == cp_id
+            changes.update(delta.changes)
+        assert changes[(1, "Voltage")] == (230.0, "V")
+    finally:
+        await cs.async_stop()
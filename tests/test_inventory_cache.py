@@ -0,0 +1,143 @@
+"""Test the stored OCPP 2.0.1 inventory."""
+
+import asyncio
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from ocpp.v201 import call, call_result
+
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+
+BOOT = {
+    "vendor_name": "ACME",
+    "model": "Wall",
+    "serial_number": "SN1",
+    "firmware_version": "1.0",
+}
+
+REPORT = [
+    {
+        "component": {"name": "SmartChargingCtrlr"},
+        "variable": {"name": "Available"},
+        "variable_attribute": [{"value": "true"}],
+    },
+    {
+        "component": {"name": "Connector", "evse": {"id": 1, "connector_id": 1}},
+        "variable": {"name": "Available"},
+        "variable_attribute": [{"value": "true"}],
+    },
+    {
+        "component": {"name": "Connector", "evse": {"id": 2, "connector_id": 1}},
+        "variable": {"name": "Available"},
+        "variable_attribute": [{"value": "true"}],
+    },
+    {
+        "component": {"name": "SampledDataCtrlr"},
+        "variable": {"name": "TxUpdatedMeasurands"},
+        "variable_attribute": [{"value": ""}],
+        "variable_characteristics": {
+            "values_list": "Energy.Active.Import.Register,Voltage"
+        },
+    },
+]
+
+
+def _mk_cp(host):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="inventory_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol="ocpp2.0.1", close=lambda: asyncio.sleep(0)
+    )
+    cp = ChargePointv201("CP_inventory", conn, host, HostEntry("e1"), central, charger)
+    cp.reports = 0
+
+    async def fake_call(req, *args, **kwargs):
+        assert isinstance(req, call.GetBaseReport)
+        cp.reports += 1
+        asyncio.get_running_loop().call_soon(
+            lambda: cp.on_report(1, "2025-01-01T00:00:00Z", 0, report_data=REPORT)
+        )
+        return call_result.GetBaseReport(status="Accepted")
+
+    cp.call = fake_call
+    return cp
+
+
+async def _boot(cp, **changes):
+    cp.on_boot_notification({**BOOT, **changes}, "PowerUp")
+    await asyncio.gather(*cp.host._tasks, return_exceptions=True)
+
+
+async def test_inventory_reused_while_fingerprint_unchanged(tmp_path):
+    """Test a new instance skips the full report until the station changes."""
+    host = StandaloneHost(storage_dir=str(tmp_path))
+    cp = _mk_cp(host)
+    cp.post_connect_success = True
+    await _boot(cp)
+    assert await cp.get_number_of_connectors() == 2
+    assert cp.reports == 1
+
+    # a restart with the same station and firmware
+    restarted = _mk_cp(host)
+    assert await restarted.get_number_of_connectors() == 2
+    assert restarted.reports == 0
+    assert restarted._inventory == cp._inventory
+    assert restarted._global_to_pair(2) == (2, 1)
+    assert [m.value for m in restarted._inventory.tx_updated_measurands] == [
+        "Energy.Active.Import.Register",
+        "Voltage",
+    ]
+
+    # a reboot without changes keeps the inventory
+    restarted.post_connect_success = True
+    await _boot(restarted)
+    await restarted.get_number_of_connectors()
+    assert restarted.reports == 0
+
+    # new firmware fetches a fresh report
+    await _boot(restarted, firmware_version="1.1")
+    await restarted.get_number_of_connectors()
+    assert restarted.reports == 1
+    again = _mk_cp(host)
+    again._fingerprint = "ACME|Wall|SN1|1.0"
+    await again.get_number_of_connectors()
+    assert again.reports == 1
+
+
+async def test_inventory_without_storage(tmp_path):
+    """Test the report is fetched without storage or a readable file."""
+    cp = _mk_cp(StandaloneHost())
+    await _boot(cp)
+    await cp.get_number_of_connectors()
+    assert cp.reports == 1
+
+    (tmp_path / "ocpp.inventory.cp_inventory").write_text("not json")
+    cp = _mk_cp(StandaloneHost(storage_dir=str(tmp_path)))
+    await _boot(cp)
+    assert await cp.get_number_of_connectors() == 2
+    assert cp.reports == 1
+    # the broken file is replaced
+    assert await _mk_cp(cp.host).get_number_of_connectors() == 2
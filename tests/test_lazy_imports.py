@@ -0,0 +1,63 @@
+"""Test the OCPP version modules are imported only when needed."""
+
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+SCRIPT = """
+import asyncio, json, sys
+
+import custom_components.ocpp
+from custom_components.ocpp import button, config_flow, number, sensor, switch
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from tests.const import MOCK_CONFIG_DATA
+
+PROTOCOL_MODULES = (
+    "custom_components.ocpp.ocppv16",
+    "custom_components.ocpp.ocppv201",
+    "ocpp.v201",
+)
+
+
+def loaded():
+    return [m for m in PROTOCOL_MODULES if m in sys.modules]
+
+
+result = {"import": loaded()}
+
+
+async def main(subprotocols):
+    host = StandaloneHost()
+    data = {**MOCK_CONFIG_DATA, "port": 9426, "cpids": [], "subprotocols": subprotocols}
+    cs = await CentralSystem.create(None, HostEntry("lazy", data), host)
+    await asyncio.gather(*host._tasks)
+    await cs.async_stop()
+    return loaded()
+
+
+result["ocpp1.6"] = asyncio.run(main(["ocpp1.6"]))
+result["ocpp2.0.1"] = asyncio.run(main(["ocpp1.6", "ocpp2.0.1"]))
+print(json.dumps(result))
+"""
+
+
+def test_protocol_modules_imported_after_setup():
+    """Test loading the integration does not import the version modules."""
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=Path(__file__).parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result["import"] == []
+    # the offered subprotocols are imported in the background after setup
+    assert result["ocpp1.6"] == ["custom_components.ocpp.ocppv16"]
+    assert result["ocpp2.0.1"] == [
+        "custom_components.ocpp.ocppv16",
+        "custom_components.ocpp.ocppv201",
+        "ocpp.v201",
+    ]
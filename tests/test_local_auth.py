@@ -0,0 +1,298 @@
+"""Test local authorization lists are sent to chargers."""
+
+import asyncio
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from ocpp.v16 import call, call_result
+from ocpp.v201 import call as callv201
+from ocpp.v201 import call_result as call_resultv201
+
+from custom_components.ocpp.const import (
+    CONF_AUTH_LIST,
+    CONF_AUTH_STATUS,
+    CONF_DEFAULT_AUTH_STATUS,
+    CONF_ID_TAG,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.enums import HAChargerStatuses as cstat, Profiles as prof
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.localauth import LocalListStore, list_changes
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+
+
+def _mk_cp(cls, host, subprotocol, responses):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="auth_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol=subprotocol, close=lambda: asyncio.sleep(0)
+    )
+    cp = cls("CP_auth", conn, host, HostEntry("e1"), central, charger)
+    cp._attr_supported_features = prof.CORE | prof.AUTH
+    cp.local_lists = LocalListStore(host.store("ocpp.local_lists.cs"))
+    cp.sent = []
+
+    async def fake_call(req, *args, **kwargs):
+        cp.sent.append(req)
+        return responses.pop(0)
+
+    cp.call = fake_call
+    return cp
+
+
+NO_LIMITS = call_result.GetConfiguration(configuration_key=[])
+
+
+def _auth_list(*entries):
+    return [{CONF_ID_TAG: tag, **status} for tag, status in entries]
+
+
+def test_list_changes():
+    """Test changed and added id_tags are sent, removed ones without status."""
+    sent = {"A": "Accepted", "B": "Accepted", "C": "Blocked"}
+    wanted = {"A": "Accepted", "B": "Blocked", "D": "Accepted"}
+    assert list_changes(sent, wanted) == {"B": "Blocked", "D": "Accepted", "C": None}
+    assert list_changes(wanted, wanted) == {}
+
+
+async def test_sync_v16(tmp_path):
+    """Test a full list first, then differential updates of the version sent."""
+    config = {
+        CONF_DEFAULT_AUTH_STATUS: "Invalid",
+        CONF_AUTH_LIST: _auth_list(
+            ("TAG_1", {CONF_AUTH_STATUS: "Accepted"}), ("TAG_2", {})
+        ),
+    }
+    host = StandaloneHost(config=config, storage_dir=str(tmp_path))
+    responses = [
+        call_result.GetLocalListVersion(list_version=0),
+        NO_LIMITS,
+        call_result.SendLocalList(status="Accepted"),
+    ]
+    cp = _mk_cp(ChargePointv16, host, "ocpp1.6", responses)
+    assert await cp.sync_local_list()
+    assert cp.sent[1] == call.GetConfiguration(
+        key=["SendLocalListMaxLength", "LocalAuthListMaxLength"]
+    )
+    assert cp.sent[2] == call.SendLocalList(
+        list_version=1,
+        update_type="Full",
+        local_authorization_list=[
+            {"id_tag": "TAG_1", "id_tag_info": {"status": "Accepted"}},
+            {"id_tag": "TAG_2", "id_tag_info": {"status": "Invalid"}},
+        ],
+    )
+    assert cp._metrics[(0, cstat.local_list_version.value)].value == 1
+
+    # unchanged, nothing is sent, also after a restart
+    restarted = _mk_cp(
+        ChargePointv16,
+        host,
+        "ocpp1.6",
+        [call_result.GetLocalListVersion(list_version=1), NO_LIMITS],
+    )
+    assert await restarted.sync_local_list()
+    assert len(restarted.sent) == 2
+
+    config[CONF_AUTH_LIST] = _auth_list(
+        ("TAG_1", {CONF_AUTH_STATUS: "Blocked"}), ("TAG_3", {})
+    )
+    responses += [
+        call_result.GetLocalListVersion(list_version=1),
+        NO_LIMITS,
+        call_result.SendLocalList(status="VersionMismatch"),
+        call_result.SendLocalList(status="Accepted"),
+    ]
+    assert await cp.sync_local_list()
+    assert cp.sent[5] == call.SendLocalList(
+        list_version=2,
+        update_type="Differential",
+        local_authorization_list=[
+            {"id_tag": "TAG_1", "id_tag_info": {"status": "Blocked"}},
+            {"id_tag": "TAG_3", "id_tag_info": {"status": "Invalid"}},
+            {"id_tag": "TAG_2"},
+        ],
+    )
+    assert cp.sent[6].update_type == "Full"
+    assert cp.sent[6].list_version == 3
+
+    # a list changed by another central system is replaced
+    responses += [
+        call_result.GetLocalListVersion(list_version=7),
+        NO_LIMITS,
+        call_result.SendLocalList(status="Failed"),
+    ]
+    assert not await cp.sync_local_list()
+    assert cp.sent[9].update_type == "Full"
+    assert cp.sent[9].list_version == 8
+    assert await cp.local_lists.async_get("CP_auth") == (
+        3,
+        {"TAG_1": "Blocked", "TAG_3": "Invalid"},
+    )
+
+
+async def test_sync_unsupported():
+    """Test nothing is sent without local list support."""
+    host = StandaloneHost(config={CONF_AUTH_LIST: _auth_list(("TAG_1", {}))})
+    cp = _mk_cp(
+        ChargePointv16,
+        host,
+        "ocpp1.6",
+        [call_result.GetLocalListVersion(list_version=-1)],
+    )
+    assert not await cp.sync_local_list()
+    assert len(cp.sent) == 1
+    cp._attr_supported_features = prof.CORE
+    assert not await cp.sync_local_list()
+    assert len(cp.sent) == 1
+
+
+async def test_sync_v201():
+    """Test id_tags are sent as RFID tokens and an empty list is cleared."""
+    host = StandaloneHost(config={CONF_AUTH_LIST: _auth_list(("TAG_1", {}))})
+    responses = [
+        call_resultv201.GetLocalListVersion(version_number=0),
+        call_resultv201.GetVariables(
+            get_variable_result=[
+                {
+                    "attribute_status": "UnknownVariable",
+                    "component": {"name": "LocalAuthListCtrlr"},
+                    "variable": {"name": "ItemsPerMessage"},
+                }
+            ]
+        ),
+        call_resultv201.SendLocalList(status="Accepted"),
+    ]
+    cp = _mk_cp(ChargePointv201, host, "ocpp2.0.1", responses)
+    assert await cp.sync_local_list()
+    assert cp.sent[2] == callv201.SendLocalList(
+        version_number=1,
+        update_type="Full",
+        local_authorization_list=[
+            {
+                "id_token": {"id_token": "TAG_1", "type": "ISO14443"},
+                "id_token_info": {"status": "Accepted"},
+            }
+        ],
+    )
+
+    host.config[CONF_AUTH_LIST] = []
+    cp.device_model.set(
+        {"name": "LocalAuthListCtrlr"}, {"name": "ItemsPerMessage"}, "10"
+    )
+    responses += [
+        call_resultv201.GetLocalListVersion(version_number=4),
+        call_resultv201.SendLocalList(status="Accepted"),
+    ]
+    assert await cp.sync_local_list()
+    assert cp.sent[4] == callv201.SendLocalList(
+        version_number=5, update_type="Full", local_authorization_list=None
+    )
+
+
+async def test_sync_limits_v16():
+    """Test lists are split into updates the charger accepts and cut to its size."""
+    tags = [(f"TAG_{n}", {}) for n in range(4)]
+    host = StandaloneHost(config={CONF_AUTH_LIST: _auth_list(*tags)})
+    limits = call_result.GetConfiguration(
+        configuration_key=[
+            {"key": "SendLocalListMaxLength", "readonly": True, "value": "2"},
+            {"key": "LocalAuthListMaxLength", "readonly": True, "value": "3"},
+        ]
+    )
+    accepted = call_result.SendLocalList(status="Accepted")
+    responses = [
+        call_result.GetLocalListVersion(list_version=0),
+        limits,
+        accepted,
+        accepted,
+    ]
+    cp = _mk_cp(ChargePointv16, host, "ocpp1.6", responses)
+    assert await cp.sync_local_list()
+    assert [
+        (req.list_version, req.update_type, len(req.local_authorization_list))
+        for req in cp.sent[2:]
+    ] == [(1, "Full", 2), (2, "Differential", 1)]
+    assert await cp.local_lists.async_get("CP_auth") == (
+        2,
+        {"TAG_0": "Accepted", "TAG_1": "Accepted", "TAG_2": "Accepted"},
+    )
+
+    # a differential update failing half way is replaced by the full list
+    host.config[CONF_AUTH_LIST] = _auth_list(*tags[2:], ("TAG_5", {}))
+    responses += [
+        call_result.GetLocalListVersion(list_version=2),
+        limits,
+        accepted,
+        call_result.SendLocalList(status="VersionMismatch"),
+        accepted,
+        accepted,
+    ]
+    assert await cp.sync_local_list()
+    assert [
+        (req.list_version, req.update_type, len(req.local_authorization_list))
+        for req in cp.sent[6:]
+    ] == [
+        (3, "Differential", 2),
+        (4, "Differential", 2),
+        (5, "Full", 2),
+        (6, "Differential", 1),
+    ]
+    assert cp._metrics[(0, cstat.local_list_version.value)].value == 6
+
+
+async def test_sync_limits_v201():
+    """Test the size of the list is taken from the inventory report."""
+    host = StandaloneHost(config={CONF_AUTH_LIST: _auth_list(("A", {}), ("B", {}))})
+    responses = [
+        call_resultv201.GetLocalListVersion(version_number=0),
+        call_resultv201.SendLocalList(status="Accepted"),
+    ]
+    cp = _mk_cp(ChargePointv201, host, "ocpp2.0.1", responses)
+    component = {"name": "LocalAuthListCtrlr"}
+    cp.device_model.add_report(
+        {
+            "component": component,
+            "variable": {"name": "ItemsPerMessage"},
+            "variable_attribute": [{"value": "5"}],
+        }
+    )
+    cp.device_model.add_report(
+        {
+            "component": component,
+            "variable": {"name": "Entries"},
+            "variable_attribute": [{"value": "0"}],
+            "variable_characteristics": {"data_type": "integer", "max_limit": 1},
+        }
+    )
+    assert await cp.get_local_list_limits() == (5, 1)
+    assert await cp.sync_local_list()
+    assert cp.sent[1].local_authorization_list == [
+        {
+            "id_token": {"id_token": "A", "type": "ISO14443"},
+            "id_token_info": {"status": "Accepted"},
+        }
+    ]
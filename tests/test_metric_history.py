@@ -0,0 +1,203 @@
+"""Test the in-memory history of metrics."""
+
+import asyncio
+from datetime import datetime, timedelta, UTC
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.chargepoint import (
+    MeasurandValue,
+    TimeSeries,
+    _ConnectorAwareMetrics,
+)
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.enums import HAChargerServices as csvcs
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+
+from .const import MOCK_CONFIG_DATA
+
+
+def _mk_cp(host, history_memory: int):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="hist_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+        history_memory=history_memory,
+    )
+    conn = SimpleNamespace(state=State.CLOSED, close=lambda: asyncio.sleep(0))
+    return ChargePointv16("CP_hist", conn, host, HostEntry("e1"), central, charger)
+
+
+def test_time_series_ring_buffer():
+    """Test the oldest samples are overwritten and windows are applied."""
+    series = TimeSeries(3)
+    assert series.capacity == 3
+    assert series.samples() == []
+    assert series.mean() is None
+    assert series.rate() is None
+
+    for t, v in [(100, 1.0), (200, 2.0), (300, 4.0), (400, 8.0)]:
+        series.append(t, v)
+    assert len(series) == 3
+    assert series.samples() == [(200, 2.0), (300, 4.0), (400, 8.0)]
+    assert series.samples(window=150, now=400) == [(300, 4.0), (400, 8.0)]
+    assert series.mean(window=150, now=400) == 6.0
+    # 6 units in 200 seconds
+    assert series.rate() == 108.0
+    assert series.rate(window=50, now=400) is None
+
+
+def test_time_series_resize():
+    """Test a resized series keeps its newest samples."""
+    series = TimeSeries(4)
+    for t in range(4):
+        series.append(t, float(t))
+    series.resize(2)
+    assert series.capacity == 2
+    assert series.samples() == [(2, 2.0), (3, 3.0)]
+    series.append(4, 4.0)
+    assert series.samples() == [(3, 3.0), (4, 4.0)]
+    series.resize(3)
+    series.append(5, 5.0)
+    assert series.samples() == [(3, 3.0), (4, 4.0), (5, 5.0)]
+
+
+def test_history_shares_memory_budget():
+    """Test the series of a charger share its memory budget."""
+    metrics = _ConnectorAwareMetrics(history_bytes=16 * 6)
+    for meas in ("Voltage", "Current.Import", "Power.Active.Import"):
+        metrics[(1, meas)].value = 1.0
+    metrics.record(1, "Voltage", 1.0)
+    assert metrics.history(1, "Voltage").capacity == 6
+    metrics.record(1, "Current.Import", 1.0)
+    assert metrics.history(1, "Voltage").capacity == 3
+    metrics.record(1, "Power.Active.Import", 1.0)
+    capacities = [metrics.history(*key).capacity for key in metrics.history_keys()]
+    assert capacities == [2, 2, 2]
+    assert sum(capacities) * TimeSeries.SAMPLE_BYTES <= metrics.history_bytes
+
+    # no room left for a fourth series
+    metrics[(2, "Voltage")].value = 1.0
+    metrics.record(2, "Voltage", 1.0)
+    assert metrics.history(2, "Voltage") is None
+
+
+def test_record_requires_history_memory():
+    """Test values are only kept with a memory budget and when numeric."""
+    metrics = _ConnectorAwareMetrics()
+    metrics[(1, "Voltage")].value = 230.0
+    metrics.record(1, "Voltage")
+    assert metrics.history(1, "Voltage") is None
+
+    metrics = _ConnectorAwareMetrics(history_bytes=64)
+    metrics[(1, "Status")].value = "Charging"
+    metrics.record(1, "Status")
+    metrics[(1, "Voltage")].value = 230
+    metrics.record(1, "Voltage", 10.0)
+    assert metrics.history(1, "Status") is None
+    assert metrics.history(1, "Voltage").samples() == [(10.0, 230.0)]
+    assert metrics.history_keys() == [(1, "Voltage")]
+    metrics.clear()
+    assert metrics.history_keys() == []
+
+
+async def test_process_measurands_feeds_history():
+    """Test phase totals and other values are kept with their sample time."""
+    cp = _mk_cp(StandaloneHost(), history_memory=1)
+    t0 = datetime.now(tz=UTC) - timedelta(seconds=60)
+    buckets = [
+        [
+            MeasurandValue(
+                "Power.Active.Import", 1000.0 * (n + 1), None, "W", None, None
+            ),
+            MeasurandValue("Current.Import", 10.0 + n, "L1", "A", None, None),
+            MeasurandValue("Current.Import", 10.0 + n, "L2", "A", None, None),
+        ]
+        for n in range(3)
+    ]
+    cp.process_measurands(
+        buckets, False, 1, timestamps=[t0 + timedelta(seconds=20 * n) for n in range(3)]
+    )
+
+    power = cp._metrics.history(1, "Power.Active.Import")
+    assert [v for _, v in power.samples()] == [1.0, 2.0, 3.0]
+    assert power.samples()[0][0] == t0.timestamp()
+    current = cp._metrics.history(1, "Current.Import")
+    assert [v for _, v in current.samples()] == [10.0, 11.0, 12.0]
+    # 2 A over 40 seconds
+    assert current.rate() == 180.0
+
+    # without timestamps the time of processing is used
+    cp.process_measurands(
+        [[MeasurandValue("Voltage", 230.0, None, "V", None, None)]], False, 1
+    )
+    (t, v) = cp._metrics.history(1, "Voltage").samples()[0]
+    assert v == 230.0
+    assert abs(t - datetime.now(tz=UTC).timestamp()) < 5
+
+
+async def test_get_history_service():
+    """Test the service returns recent values, also without a history."""
+    host = StandaloneHost()
+    entry = HostEntry("hist", {**MOCK_CONFIG_DATA, CONF_CSID: "hist", CONF_CPIDS: []})
+    cs = CentralSystem(None, entry, host)
+    cp = _mk_cp(host, history_memory=1)
+    cs.charge_points[cp.id] = cp
+    cs.cpids[cp.settings.cpid] = cp.id
+
+    now = datetime.now(tz=UTC)
+    for n, value in enumerate([2.0, 4.0, 6.0]):
+        cp._metrics[(1, "Power.Active.Import")].value = value
+        cp._metrics[(1, "Power.Active.Import")].unit = "kW"
+        cp._metrics.record(
+            1,
+            "Power.Active.Import",
+            (now - timedelta(seconds=200 - 60 * n)).timestamp(),
+        )
+
+    result = await host.async_call_service(
+        csvcs.service_get_history.value,
+        {"devid": "hist_cpid", "measurand": "Power.Active.Import", "conn_id": 1},
+    )
+    assert result["unit"] == "kW"
+    assert [s["value"] for s in result["samples"]] == [2.0, 4.0, 6.0]
+    assert datetime.fromisoformat(result["samples"][0]["time"]) < now
+    assert result["mean"] == 4.0
+
+    result = await host.async_call_service(
+        csvcs.service_get_history.value,
+        {"measurand": "Power.Active.Import", "conn_id": 1, "window": 100},
+    )
+    assert [s["value"] for s in result["samples"]] == [6.0]
+    assert result["rate"] is None
+
+    result = await host.async_call_service(
+        csvcs.service_get_history.value, {"devid": "hist_cpid", "measurand": "Voltage"}
+    )
+    assert result == {"unit": None, "samples": [], "mean": None, "rate": None}
+    assert cs.get_history("unknown", "Voltage") is None
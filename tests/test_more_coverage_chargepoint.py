@@ -202,7 +202,7 @@ async def test_update_returns_early_when_root_device_missing(
             srv = cs.charge_points[cp_id]
 
             # Fake registries: no device returned.
-            import custom_components.ocpp.chargepoint as mod
+            import custom_components.ocpp.host as mod
 
             class FakeDR:
                 """Fake DR."""
@@ -286,7 +286,7 @@ async def test_update_traverses_children_and_skips_visited(
 
             # Build a tiny fake device graph:
             # root -> child (twice in the values() list to create a duplicate push)
-            import custom_components.ocpp.chargepoint as mod
+            import custom_components.ocpp.host as mod
 
             class Dev:
                 """Fake Dev."""
@@ -294,6 +294,7 @@ async def test_update_traverses_children_and_skips_visited(
                 def __init__(self, id, via=None):
                     self.id = id
                     self.via_device_id = via
+                    self.config_entries = {"entry"}
 
             root = Dev("root", via=None)
             child = Dev("child", via="root")
@@ -313,21 +314,16 @@ async def test_update_traverses_children_and_skips_visited(
                 def async_get_device(self, identifiers):
                     return root
 
-                @property
-                def devices(self):
-                    # Duplicate the child to force the same ID to be appended twice -> will hit continue (L612)
-                    class Container:
-                        def values(self_inner):
-                            return [root, child, child]
-
-                    return Container()
-
             class FakeER:
                 """Fake ER."""
 
                 def async_clear_config_entry(self, config_entry_id):
                     return None
 
+            def fake_entries_for_config_entry(_dr, _entry_id):
+                # Duplicate the child to force the same ID to be appended twice -> will hit continue (L612)
+                return [root, child, child]
+
             def fake_entries_for_device(_er, _dev_id):
                 # No entities to update; the loop is exercised anyway.
                 return []
@@ -336,6 +332,12 @@ async def test_update_traverses_children_and_skips_visited(
             monkeypatch.setattr(
                 mod.device_registry, "async_get", lambda _: FakeDR(), raising=True
             )
+            monkeypatch.setattr(
+                mod.device_registry,
+                "async_entries_for_config_entry",
+                fake_entries_for_config_entry,
+                raising=True,
+            )
             monkeypatch.setattr(
                 mod.entity_registry, "async_get", lambda _: FakeER(), raising=True
             )
@@ -0,0 +1,214 @@
+"""Test outbound requests are sent by priority class."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from websockets.protocol import State
+
+from ocpp.charge_point import ChargePoint as LibChargePoint
+from ocpp.v16 import call
+
+from custom_components.ocpp.chargepoint import CallPriority, OutboundQueue
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.enums import HAChargerStatuses as cstat
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+
+
+def _mk_cp():
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="queue_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(state=State.CLOSED, close=lambda: asyncio.sleep(0))
+    return ChargePointv16(
+        "CP_queue", conn, StandaloneHost(), HostEntry("e1"), central, charger
+    )
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record the action and response timeout of requests sent to the charger."""
+    sent = []
+    release = asyncio.Event()
+
+    async def lib_call(self, payload, *args):
+        sent.append((payload.__class__.__name__, self._response_timeout))
+        await release.wait()
+        if isinstance(payload, call.ClearCache):
+            raise TimeoutError("no response")
+        return payload.__class__.__name__
+
+    monkeypatch.setattr(LibChargePoint, "call", lib_call)
+    return SimpleNamespace(actions=sent, release=release)
+
+
+async def test_urgent_requests_are_sent_first(sent):
+    """Test waiting requests are sent by class, with the timeout of their class."""
+    cp = _mk_cp()
+    first = asyncio.create_task(cp.call(call.GetConfiguration(key=["A"])))
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.create_task(cp.call(req))
+        for req in (
+            call.GetDiagnostics(location="ftp://example.com"),
+            call.GetConfiguration(key=["B"]),
+            call.SetChargingProfile(connector_id=0, cs_charging_profiles={}),
+            call.RemoteStopTransaction(transaction_id=1),
+            call.GetConfiguration(key=["C"]),
+        )
+    ]
+    await asyncio.sleep(0)
+    cp._update_queue_metrics()
+    metric = cp._metrics[(0, cstat.outbound_queue.value)]
+    assert metric.value == 5
+    assert metric.extra_attr["waiting"] == {
+        "safety": 1,
+        "control": 1,
+        "configuration": 2,
+        "diagnostics": 1,
+    }
+
+    sent.release.set()
+    await asyncio.gather(first, *waiting)
+    assert sent.actions == [
+        ("GetConfiguration", 10),
+        ("RemoteStopTransaction", 5),
+        ("SetChargingProfile", 10),
+        ("GetConfiguration", 10),
+        ("GetConfiguration", 10),
+        ("GetDiagnostics", 30),
+    ]
+    assert await waiting[1] == "GetConfiguration"
+
+    with pytest.raises(TimeoutError):
+        await cp.call(call.ClearCache())
+    cp._update_queue_metrics()
+    assert metric.value == 0
+    assert metric.extra_attr["sent"] == {
+        "configuration": 4,
+        "safety": 1,
+        "control": 1,
+        "diagnostics": 1,
+    }
+    assert metric.extra_attr["timeouts"] == {"configuration": 1}
+
+
+async def test_reset_not_delayed_by_diagnostics(sent):
+    """Test a reset cancels a diagnostics request the charger is slow to answer."""
+    cp = _mk_cp()
+    report = asyncio.create_task(cp.call(call.GetDiagnostics(location="ftp://x")))
+    await asyncio.sleep(0)
+    control = asyncio.create_task(
+        cp.call(call.SetChargingProfile(connector_id=0, cs_charging_profiles={}))
+    )
+    await asyncio.sleep(0)
+    assert not report.done()
+
+    reset = asyncio.create_task(cp.call(call.Reset(type="Soft")))
+    await asyncio.wait([report], timeout=1)
+    with pytest.raises(TimeoutError):
+        report.result()
+    await asyncio.sleep(0)
+    assert sent.actions == [("GetDiagnostics", 30), ("Reset", 5)]
+
+    sent.release.set()
+    assert await reset == "Reset"
+    assert await control == "SetChargingProfile"
+    cp._update_queue_metrics()
+    assert cp._metrics[(0, cstat.outbound_queue.value)].extra_attr["preempted"] == 1
+
+    # a reset waits for requests of other classes in flight
+    sent.release.clear()
+    config = asyncio.create_task(cp.call(call.GetConfiguration(key=["A"])))
+    await asyncio.sleep(0)
+    reset = asyncio.create_task(cp.call(call.Reset(type="Hard")))
+    await asyncio.sleep(0)
+    assert not config.done()
+    sent.release.set()
+    assert await config == "GetConfiguration"
+    assert await reset == "Reset"
+
+
+async def test_cancelled_request_is_not_preempted(sent):
+    """Test cancelling the caller of a request in flight propagates."""
+    cp = _mk_cp()
+    report = asyncio.create_task(cp.call(call.GetDiagnostics(location="ftp://x")))
+    await asyncio.sleep(0)
+    report.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await report
+    assert cp._outbound.preempted == 0
+    sent.release.set()
+    assert await cp.call(call.Reset(type="Soft")) == "Reset"
+
+
+async def test_disconnect_drops_stale_requests(sent):
+    """Test configuration and diagnostics waiting on a disconnect fail."""
+    cp = _mk_cp()
+    cp.tasks = []
+    first = asyncio.create_task(cp.call(call.Reset(type="Soft")))
+    await asyncio.sleep(0)
+    stale = asyncio.create_task(cp.call(call.GetConfiguration(key=["A"])))
+    report = asyncio.create_task(cp.call(call.GetDiagnostics(location="ftp://x")))
+    urgent = asyncio.create_task(cp.call(call.UnlockConnector(connector_id=1)))
+    await asyncio.sleep(0)
+
+    await cp.stop()
+    sent.release.set()
+    with pytest.raises(ConnectionError):
+        await stale
+    with pytest.raises(ConnectionError):
+        await report
+    assert await urgent == "UnlockConnector"
+    await first
+    assert [a for a, _ in sent.actions] == ["Reset", "UnlockConnector"]
+    assert cp._outbound.dropped == 2
+
+
+async def test_cancelled_waiters_are_skipped():
+    """Test a request cancelled while waiting does not hold up the others."""
+    queue = OutboundQueue()
+    order = []
+    gate = asyncio.Event()
+
+    async def send(name, priority):
+        async with queue.slot(priority):
+            order.append(name)
+            await gate.wait()
+
+    first = asyncio.create_task(send("first", CallPriority.control))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(send("cancelled", CallPriority.safety))
+    later = asyncio.create_task(send("later", CallPriority.diagnostics))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    gate.set()
+    await asyncio.gather(first, later)
+    assert cancelled.cancelled()
+    assert order == ["first", "later"]
+    assert queue.depth() == dict.fromkeys(
+        ("safety", "control", "configuration", "diagnostics"), 0
+    )
+    # nothing in flight, the next request is sent at once
+    await send("next", CallPriority.diagnostics)
+    assert order[-1] == "next"
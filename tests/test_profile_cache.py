@@ -0,0 +1,181 @@
+"""Test that charging profiles the charger already accepted are not sent again."""
+
+import asyncio
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from ocpp.v16 import call as callv16
+from ocpp.v16.enums import ChargingProfileStatus
+from ocpp.v201 import call as callv201
+from ocpp.v201.enums import ChargingProfileStatusEnumType
+
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.enums import Profiles as prof
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+
+
+def _mk_cp(cls, subprotocol=None):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="cache_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol=subprotocol, close=lambda: asyncio.sleep(0)
+    )
+    cp = cls("CP_cache", conn, StandaloneHost(), HostEntry("e1"), central, charger)
+    cp._attr_supported_features = prof.SMART
+    return cp
+
+
+def _recording_v16(cp, status=ChargingProfileStatus.accepted):
+    sent = []
+
+    async def fake_call(req):
+        sent.append(req)
+        if isinstance(req, callv16.GetConfiguration):
+            value = "Current" if "Unit" in req.key[0] else "3"
+            return SimpleNamespace(configuration_key=[{"value": value}])
+        if isinstance(req, callv16.ClearChargingProfile):
+            return SimpleNamespace(status="Accepted")
+        return SimpleNamespace(status=status)
+
+    cp.call = fake_call
+    return sent
+
+
+def _profiles(sent):
+    return [r for r in sent if isinstance(r, callv16.SetChargingProfile)]
+
+
+async def test_v16_identical_limit_is_sent_once():
+    """Test a re-asserted limit neither reads the configuration nor is sent."""
+    cp = _mk_cp(ChargePointv16)
+    sent = _recording_v16(cp)
+
+    assert await cp.set_charge_rate(limit_amps=16)
+    assert len(_profiles(sent)) == 1
+    assert len(sent) == 3  # the charging rate unit and max stack level are read
+
+    sent.clear()
+    assert await cp.set_charge_rate(limit_amps=16)
+    assert sent == []
+
+    assert await cp.set_charge_rate(limit_amps=10)
+    [req] = _profiles(sent)
+    assert (
+        req.cs_charging_profiles["chargingSchedule"]["chargingSchedulePeriod"][0][
+            "limit"
+        ]
+        == 10.0
+    )
+    assert len(sent) == 1
+
+
+async def test_v16_cache_is_invalidated():
+    """Test clearing profiles, a reboot and a reconnect send the limit again."""
+    cp = _mk_cp(ChargePointv16)
+    sent = _recording_v16(cp)
+    await cp.set_charge_rate(limit_amps=16)
+
+    assert await cp.clear_profile()
+    sent.clear()
+    await cp.set_charge_rate(limit_amps=16)
+    assert len(_profiles(sent)) == 1
+
+    cp.post_connect_success = True
+    cp.triggered_boot_notification = True
+    cp._register_boot_notification()
+    sent.clear()
+    await cp.set_charge_rate(limit_amps=16)
+    assert len(_profiles(sent)) == 1
+
+    async def stop():
+        return None
+
+    async def run(coroutines):
+        for coro in coroutines:
+            coro.close()
+
+    cp.stop = stop
+    cp.run = run
+    await cp.reconnect(SimpleNamespace(state=State.OPEN))
+    sent.clear()
+    await cp.set_charge_rate(limit_amps=16)
+    assert len(_profiles(sent)) == 1
+
+
+async def test_v16_rejected_and_custom_profiles():
+    """Test rejected profiles are not cached and custom profiles are."""
+    cp = _mk_cp(ChargePointv16)
+    sent = _recording_v16(cp, status=ChargingProfileStatus.rejected)
+    assert not await cp.set_charge_rate(limit_amps=16, conn_id=1)
+    assert not await cp.set_charge_rate(limit_amps=16, conn_id=1)
+    # ChargePointMaxProfile and TxDefaultProfile, twice
+    assert len(_profiles(sent)) == 4
+
+    sent = _recording_v16(cp)
+    profile = {
+        "chargingProfileId": 7,
+        "stackLevel": 1,
+        "chargingProfileKind": "Relative",
+        "chargingProfilePurpose": "TxDefaultProfile",
+        "chargingSchedule": {
+            "chargingRateUnit": "A",
+            "chargingSchedulePeriod": [{"startPeriod": 0, "limit": 8}],
+        },
+    }
+    assert await cp.set_charge_rate(profile=profile, conn_id=1)
+    profile["chargingSchedule"]["chargingSchedulePeriod"][0]["limit"] = 8
+    assert await cp.set_charge_rate(profile=profile, conn_id=1)
+    assert len(_profiles(sent)) == 1
+    # the same profile for another connector is sent
+    assert await cp.set_charge_rate(profile=profile, conn_id=2)
+    assert len(_profiles(sent)) == 2
+
+
+async def test_v201_identical_limit_is_sent_once():
+    """Test the 2.0.1 station limit is only sent when it changed."""
+    cp = _mk_cp(ChargePointv201, "ocpp2.0.1")
+    sent = []
+
+    async def fake_call(req):
+        sent.append(req)
+        return SimpleNamespace(
+            status=ChargingProfileStatusEnumType.accepted, status_info=None
+        )
+
+    cp.call = fake_call
+
+    await cp.set_charge_rate(limit_amps=16)
+    await cp.set_charge_rate(limit_amps=16)
+    assert [type(r) for r in sent] == [callv201.SetChargingProfile]
+
+    # a limit of 32 A and more clears the profile
+    await cp.set_charge_rate(limit_amps=32)
+    await cp.set_charge_rate(limit_amps=16)
+    assert [type(r) for r in sent] == [
+        callv201.SetChargingProfile,
+        callv201.ClearChargingProfile,
+        callv201.SetChargingProfile,
+    ]
@@ -0,0 +1,223 @@
+"""Test per action schema validation policy."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from websockets.protocol import State
+
+from homeassistant import config_entries, data_entry_flow
+
+from custom_components.ocpp.chargepoint import (
+    ActionValidationPolicy,
+    ValidationMode,
+    parse_validation_policy,
+)
+from custom_components.ocpp.const import (
+    CONF_SCHEMA_VALIDATION_POLICY,
+    DOMAIN,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.enums import HAChargerStatuses as cstat
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+from ocpp.charge_point import ChargePoint as LibCP
+from ocpp.exceptions import FormatViolationError, TypeConstraintViolationError
+from ocpp.messages import Call
+from ocpp.v16 import call_result
+
+from .const import MOCK_CONFIG_CP, MOCK_CONFIG_CS
+
+
+def _mk_cp(hass, policy: str, skip: bool = False):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="test_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=skip,
+        force_smart_charging=False,
+        schema_validation_policy=policy,
+    )
+    conn = SimpleNamespace(state=State.CLOSED, close=lambda: asyncio.sleep(0))
+    return ChargePointv16(
+        "CP_ID",
+        conn,
+        hass,
+        SimpleNamespace(entry_id="e1", data={}),
+        central,
+        charger,
+    )
+
+
+def test_parse_validation_policy():
+    """Test parsing of policy strings."""
+    actions, default = parse_validation_policy("")
+    assert actions == {}
+    assert default.mode == ValidationMode.always
+
+    actions, default = parse_validation_policy(None, skip_schema_validation=True)
+    assert default.mode == ValidationMode.never
+
+    actions, default = parse_validation_policy(
+        " MeterValues:10, BootNotification:Always,Heartbeat:never,Authorize:1,*:5"
+    )
+    assert actions["MeterValues"].mode == ValidationMode.sampled
+    assert actions["MeterValues"].every == 10
+    assert actions["BootNotification"].mode == ValidationMode.always
+    assert actions["Heartbeat"].mode == ValidationMode.never
+    assert actions["Authorize"].mode == ValidationMode.always
+    assert default.mode == ValidationMode.sampled
+    assert default.every == 5
+
+    for bad in ["MeterValues", "MeterValues:", ":always", "MeterValues:0", "X:-1"]:
+        with pytest.raises(ValueError):
+            parse_validation_policy(bad)
+
+
+def test_sampled_policy_validates_one_in_n():
+    """Test sampled policy validates first and then every nth request."""
+    policy = ActionValidationPolicy(ValidationMode.sampled, every=3)
+    results = [policy.should_validate() for _ in range(7)]
+    assert results == [True, False, False, True, False, False, True]
+    assert policy.received == 7
+
+
+async def test_handle_call_applies_policy(hass):
+    """Test invalid payloads are only rejected when the policy validates."""
+    cp = _mk_cp(hass, "MeterValues:2,Heartbeat:never")
+    assert all(r["_skip_schema_validation"] for r in cp.route_map.values())
+
+    handled = []
+
+    async def parent_handle(self, msg):
+        handled.append(msg.action)
+
+    bad_meter = Call("1", "MeterValues", {"connectorId": "one", "meterValue": []})
+    with patch.object(LibCP, "_handle_call", parent_handle):
+        # first sampled request is validated and rejected
+        with pytest.raises((FormatViolationError, TypeConstraintViolationError)):
+            await cp._handle_call(bad_meter)
+        # second one is not sampled and passes through
+        await cp._handle_call(bad_meter)
+        await cp._handle_call(Call("2", "Heartbeat", {"bad": 1}))
+        # actions without an entry follow skip_schema_validation (False)
+        await cp._handle_call(Call("3", "Heartbeat", {}))
+        await cp._handle_call(Call("4", "Authorize", {"idTag": "abc"}))
+
+    assert handled == ["MeterValues", "Heartbeat", "Heartbeat", "Authorize"]
+    stats = cp._metrics[(0, cstat.schema_validation.value)]
+    assert stats.unit == "ms"
+    assert stats.value >= 0
+    assert stats.extra_attr["MeterValues"]["received"] == 2
+    assert stats.extra_attr["MeterValues"]["validated"] == 1
+    assert stats.extra_attr["Authorize"]["mode"] == "always"
+    assert stats.extra_attr["Authorize"]["validated"] == 1
+    assert cp._validation_policy["Heartbeat"].validated == 0
+
+
+async def test_skip_schema_validation_default(hass):
+    """Test skip_schema_validation still disables validation without a policy."""
+    cp = _mk_cp(hass, "", skip=True)
+
+    async def parent_handle(self, msg):
+        return None
+
+    with patch.object(LibCP, "_handle_call", parent_handle):
+        await cp._handle_call(Call("1", "MeterValues", {"connectorId": "one"}))
+    assert cp._validation_policy["MeterValues"].validated == 0
+
+
+async def test_config_flow_rejects_invalid_policy(hass, bypass_get_data):
+    """Test the charger config flow reports an invalid policy."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_CONFIG_CS,
+        entry_id="test_cms_policy",
+        title="test_cms_policy",
+        version=2,
+    )
+    hass.data.setdefault(DOMAIN, {})
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    info = {"cp_id": "test_cp_policy", "entry": config_entry}
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": config_entries.SOURCE_INTEGRATION_DISCOVERY},
+        data=info,
+    )
+    cp_input = {**MOCK_CONFIG_CP, CONF_SCHEMA_VALIDATION_POLICY: "MeterValues:x"}
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input=cp_input
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["errors"] == {
+        CONF_SCHEMA_VALIDATION_POLICY: "invalid_validation_policy"
+    }
+
+    cp_input[CONF_SCHEMA_VALIDATION_POLICY] = "MeterValues:10,*:always"
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input=cp_input
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.ABORT
+    cp_data = config_entry.data["cpids"][-1]["test_cp_policy"]
+    assert cp_data[CONF_SCHEMA_VALIDATION_POLICY] == "MeterValues:10,*:always"
+
+
+@pytest.mark.parametrize("skip", [False, True])
+async def test_responses_follow_skip_schema_validation(hass, skip):
+    """Test responses are validated unless skip_schema_validation is set."""
+    cp = _mk_cp(hass, "Heartbeat:never", skip=skip)
+    sent = []
+
+    async def fake_send(message):
+        sent.append(message)
+
+    validated = []
+
+    async def fake_validate(message, ocpp_version):
+        validated.append(type(message).__name__)
+
+    cp._send = fake_send
+    with patch("custom_components.ocpp.chargepoint.validate_payload", fake_validate):
+        await cp._handle_call(Call("1", "Heartbeat", {}))
+        await cp._handle_call(Call("2", "Heartbeat", {}))
+    assert len(sent) == 2
+    assert validated == ([] if skip else ["CallResult", "CallResult"])
+    assert cp._validation_policy["Heartbeat"].validated == 0
+    # the library never validates, the flags are left alone
+    assert all(r["_skip_schema_validation"] for r in cp.route_map.values())
+
+
+async def test_invalid_response_rejected(hass):
+    """Test an invalid response raises, so a CallError is sent instead."""
+    cp = _mk_cp(hass, "")
+
+    def bad_heartbeat():
+        return call_result.Heartbeat(current_time=123)
+
+    with pytest.raises((FormatViolationError, TypeConstraintViolationError)):
+        await cp._validating_response("Heartbeat", bad_heartbeat)()
+
+    cp.settings.skip_schema_validation = True
+    assert (await cp._validating_response("Heartbeat", bad_heartbeat)()) == (
+        bad_heartbeat()
+    )
@@ -1,6 +1,7 @@
 """Test sensor for ocpp integration."""
 
 import asyncio
+import pytest
 import websockets
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
@@ -12,6 +13,7 @@ from homeassistant.components.sensor.const import (
 )
 
 from custom_components.ocpp.const import CONF_NUM_CONNECTORS, DOMAIN as OCPP_DOMAIN
+from custom_components.ocpp.sensor import SENSOR_CLASSES, sensor_description
 
 from .const import (
     MOCK_CONFIG_DATA,
@@ -52,6 +54,13 @@ async def test_sensor(hass, socket_enabled):
     ) as ws:
         # Wait for setup to complete
         await asyncio.sleep(1)
+        # Measurand sensors are added once the measurand has a value
+        assert hass.states.get(f"sensor.{cpid}_power_reactive_import") is None
+        cp = hass.data[OCPP_DOMAIN][config_entry.entry_id].charge_points[cp_id]
+        cp._metrics[(1, "Power.Reactive.Import")].value = 1.5
+        cp._metrics[(1, "Energy.Reactive.Import.Register")].value = 2.5
+        await cp.update(cpid)
+        await hass.async_block_till_done()
         # Test reactive power sensor
         state = hass.states.get(f"sensor.{cpid}_power_reactive_import")
         assert (
@@ -65,6 +74,12 @@ async def test_sensor(hass, socket_enabled):
 
         await ws.close()
 
+    # Sensors added before are set up again, without waiting for a value
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert hass.states.get(f"sensor.{cpid}_power_reactive_import") is not None
+    assert hass.states.get(f"sensor.{cpid}_voltage") is None
+
     await remove_configuration(hass, config_entry)
 
 
@@ -100,16 +115,35 @@ async def test_sensor_entities_per_connector_created(hass, socket_enabled):
         # Give HA a tick to register entities
         await asyncio.sleep(0.5)
 
+        # Connector sensors are added with the first status of the connector
+        assert hass.states.get(f"sensor.{cpid}_connector_1_status_connector") is None
+        cp = hass.data[OCPP_DOMAIN][config_entry.entry_id].charge_points[cp_id]
+        for conn in (1, 2, 3):
+            cp._metrics[(conn, "Status.Connector")].value = "Available"
+        await cp.update(cpid)
+        await hass.async_block_till_done()
+
         # Per-connector entities should include <cpid> in the entity_id
         s1 = hass.states.get(f"sensor.{cpid}_connector_1_status_connector")
         s2 = hass.states.get(f"sensor.{cpid}_connector_2_status_connector")
         assert s1 is not None, "missing sensor for connector 1"
         assert s2 is not None, "missing sensor for connector 2"
 
-        # There must not be any entity for a non-existent connector 3
+        # A connector beyond the configured number gets its sensors once seen
         s3 = hass.states.get(f"sensor.{cpid}_connector_3_status_connector")
-        assert s3 is None, "unexpected sensor for connector 3"
-
+        assert s3 is not None, "missing sensor for connector 3"
+        assert hass.states.get(f"sensor.{cpid}_connector_3_voltage") is None
+        cp._metrics[(3, "Voltage")].value = 230.0
+        await cp.update(cpid)
+        await hass.async_block_till_done()
+        assert hass.states.get(f"sensor.{cpid}_connector_3_voltage") is not None
+
+        # Root-level sensors are added with their first value, the charger
+        # has not booted
+        assert hass.states.get(f"sensor.{cpid}_connectors") is None
+        cp._metrics[(0, "Connectors")].value = 2
+        await cp.update(cpid)
+        await hass.async_block_till_done()
         # Root-level sensor still includes <cpid>
         root = hass.states.get(f"sensor.{cpid}_connectors")
         assert root is not None, "missing root-level 'connectors' sensor"
@@ -117,3 +151,24 @@ async def test_sensor_entities_per_connector_created(hass, socket_enabled):
         await ws.close()
 
     await remove_configuration(hass, config_entry)
+
+
+def test_sensor_description_classification():
+    """Test sensors are classified from the table, or once if not listed."""
+    desc = sensor_description("Voltage")
+    assert desc.device_class == SensorDeviceClass.VOLTAGE
+    assert desc.state_class == SensorStateClass.MEASUREMENT
+    assert desc.native_unit_of_measurement == "V"
+    assert SENSOR_CLASSES["Energy.Active.Import.Register"][:2] == (
+        SensorDeviceClass.ENERGY,
+        SensorStateClass.TOTAL_INCREASING,
+    )
+    with pytest.raises(TypeError):
+        SENSOR_CLASSES["Voltage"] = (None, None, None)
+
+    # a configured variable the table does not list
+    assert "Temperature.Inlet" not in SENSOR_CLASSES
+    desc = sensor_description(" Temperature.Inlet ", cat_diag=True)
+    assert desc.key == "temperature.inlet"
+    assert desc.device_class == SensorDeviceClass.TEMPERATURE
+    assert desc.native_unit_of_measurement == "°C"
@@ -0,0 +1,254 @@
+"""Test the ledger of completed charging sessions."""
+
+import asyncio
+from datetime import datetime, timedelta, UTC
+from types import SimpleNamespace
+
+import pytest
+from websockets.protocol import State
+
+from ocpp.v201.enums import TransactionEventEnumType, TriggerReasonEnumType
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.enums import HAChargerServices as csvcs
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ledger import SessionLedger, SessionRecord
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+
+from .const import MOCK_CONFIG_DATA
+
+T0 = datetime(2024, 3, 1, 8, 0, tzinfo=UTC)
+
+
+def _record(cpid="cp_a", conn=1, tag="tag1", hours=0, energy=10.0):
+    start = T0 + timedelta(hours=hours)
+    return SessionRecord(
+        cpid=cpid,
+        connector_id=conn,
+        transaction_id=str(hours),
+        id_tag=tag,
+        start=start,
+        stop=start + timedelta(minutes=90),
+        energy_kwh=energy,
+        duration_min=90.0,
+        stop_reason="Local",
+    )
+
+
+def _mk_cp(cls, host, subprotocol=None):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="ledger_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol=subprotocol, close=lambda: asyncio.sleep(0)
+    )
+    return cls("CP_ledger", conn, host, HostEntry("e1"), central, charger)
+
+
+def test_ledger_query_and_aggregate(tmp_path):
+    """Test filtering, paging and totals."""
+    ledger = SessionLedger(str(tmp_path / "sessions.db"))
+    assert ledger.query() == []
+    ledger.add(_record(hours=0))
+    ledger.add(_record(hours=30, tag="tag2", energy=5.0))
+    ledger.add(_record(hours=50, conn=2, energy=2.5))
+    ledger.add(_record(cpid="cp_b", hours=60, energy=1.0))
+
+    sessions = ledger.query()
+    assert [s["transaction_id"] for s in sessions] == ["60", "50", "30", "0"]
+    assert sessions[-1]["start"] == T0.isoformat()
+    assert sessions[-1]["id_tag"] == "tag1"
+    assert [s["transaction_id"] for s in ledger.query(limit=2, offset=1)] == [
+        "50",
+        "30",
+    ]
+    assert [s["transaction_id"] for s in ledger.query(id_tag="tag1")] == [
+        "60",
+        "50",
+        "0",
+    ]
+    assert len(ledger.query(cpid="cp_a", connector_id=1)) == 2
+    assert [
+        s["transaction_id"]
+        for s in ledger.query(
+            start=T0 + timedelta(hours=24), end=T0 + timedelta(days=2)
+        )
+    ] == ["30"]
+
+    assert ledger.aggregate("id_tag") == [
+        {"id_tag": "tag1", "sessions": 3, "energy_kwh": 13.5, "duration_min": 270.0},
+        {"id_tag": "tag2", "sessions": 1, "energy_kwh": 5.0, "duration_min": 90.0},
+    ]
+    assert ledger.aggregate("connector", cpid="cp_a") == [
+        {
+            "cpid": "cp_a",
+            "connector_id": 1,
+            "sessions": 2,
+            "energy_kwh": 15.0,
+            "duration_min": 180.0,
+        },
+        {
+            "cpid": "cp_a",
+            "connector_id": 2,
+            "sessions": 1,
+            "energy_kwh": 2.5,
+            "duration_min": 90.0,
+        },
+    ]
+    assert [(d["day"], d["sessions"]) for d in ledger.aggregate("day")] == [
+        ("2024-03-01", 1),
+        ("2024-03-02", 1),
+        ("2024-03-03", 2),
+    ]
+    assert ledger.aggregate("month")[0]["month"] == "2024-03"
+
+
+async def test_v16_stop_transaction_records_session(tmp_path):
+    """Test a v1.6 session is added to the ledger when it stops."""
+    host = StandaloneHost()
+    cp = _mk_cp(ChargePointv16, host)
+    cp.ledger = SessionLedger(str(tmp_path / "sessions.db"))
+
+    start = datetime.now(tz=UTC) - timedelta(minutes=30)
+    result = await cp.on_start_transaction(
+        connector_id=1, id_tag="tag1", meter_start=1000, timestamp=start.isoformat()
+    )
+    tx_id = result.transaction_id
+    # a charger retransmits the stop when it missed the response
+    for _ in range(2):
+        cp.on_stop_transaction(
+            meter_stop=6000,
+            timestamp=(start + timedelta(minutes=30)).isoformat(),
+            transaction_id=tx_id,
+            reason="EVDisconnected",
+        )
+        await asyncio.gather(*host._tasks)
+
+    [session] = cp.ledger.query()
+    assert session["cpid"] == "ledger_cpid"
+    assert session["connector_id"] == 1
+    assert session["transaction_id"] == str(tx_id)
+    assert session["id_tag"] == "tag1"
+    assert session["energy_kwh"] == 5.0
+    assert session["duration_min"] == 30.0
+    assert session["stop_reason"] == "EVDisconnected"
+
+
+async def test_v201_ended_transaction_records_session(tmp_path):
+    """Test a v2.0.1 session is added to the ledger when it ends."""
+    host = StandaloneHost()
+    cp = _mk_cp(ChargePointv201, host, "ocpp2.0.1")
+    cp.ledger = SessionLedger(str(tmp_path / "sessions.db"))
+
+    start = datetime.now(tz=UTC)
+    for event, minutes, wh, info in [
+        (TransactionEventEnumType.started, 0, 2000, {}),
+        (TransactionEventEnumType.ended, 45, 9000, {"stopped_reason": "Local"}),
+    ]:
+        t = (start + timedelta(minutes=minutes)).isoformat()
+        cp.on_transaction_event(
+            event.value,
+            t,
+            TriggerReasonEnumType.authorized.value,
+            minutes,
+            {"transaction_id": "tx201", **info},
+            id_token={"id_token": "abc", "type": "ISO14443"},
+            meter_value=[
+                {
+                    "timestamp": t,
+                    "sampled_value": [{"value": wh, "unit_of_measure": {"unit": "Wh"}}],
+                }
+            ],
+        )
+    await asyncio.gather(*host._tasks)
+
+    [session] = cp.ledger.query()
+    assert session["transaction_id"] == "tx201"
+    assert session["id_tag"] == "ISO14443:abc"
+    assert session["energy_kwh"] == 7.0
+    assert session["duration_min"] == 45.0
+    assert session["stop_reason"] == "Local"
+
+
+async def test_ledger_errors_are_logged(tmp_path, caplog):
+    """Test a ledger that cannot be written does not break the charger."""
+    host = StandaloneHost()
+    cp = _mk_cp(ChargePointv16, host)
+    cp.ledger = SessionLedger(str(tmp_path))  # a directory cannot be opened
+    cp.record_session(1, 1, None, datetime.now(tz=UTC), None)
+    await asyncio.gather(*host._tasks)
+    assert "failed to store session" in caplog.text
+
+    cp.ledger = None
+    cp.record_session(1, 1, None, datetime.now(tz=UTC), None)
+    assert not host._tasks
+
+
+@pytest.mark.parametrize("storage", [True, False])
+async def test_get_sessions_service(tmp_path, storage):
+    """Test the service returns pages of sessions or totals."""
+    host = StandaloneHost(storage_dir=str(tmp_path) if storage else None)
+    entry = HostEntry(
+        "ledger", {**MOCK_CONFIG_DATA, CONF_CSID: "ledger", CONF_CPIDS: []}
+    )
+    cs = CentralSystem(None, entry, host)
+    service = csvcs.service_get_sessions.value
+    if not storage:
+        assert cs.ledger is None
+        assert await host.async_call_service(service) == {"sessions": []}
+        return
+
+    cp = _mk_cp(ChargePointv16, host)
+    cs.charge_points[cp.id] = cp
+    cs.cpids[cp.settings.cpid] = cp.id
+    for hours in range(5):
+        cs.ledger.add(_record(cpid="ledger_cpid", hours=hours))
+    cs.ledger.add(_record(cpid="old_cpid", hours=10))
+
+    result = await host.async_call_service(service, {"devid": "CP_ledger", "limit": 2})
+    assert [s["transaction_id"] for s in result["sessions"]] == ["4", "3"]
+    result = await host.async_call_service(
+        service, {"devid": "ledger_cpid", "limit": 2, "offset": 4}
+    )
+    assert [s["transaction_id"] for s in result["sessions"]] == ["0"]
+    result = await host.async_call_service(service, {"devid": "old_cpid"})
+    assert len(result["sessions"]) == 1
+    result = await host.async_call_service(
+        service,
+        {
+            "start": (T0 + timedelta(hours=2)).isoformat(),
+            "end": (T0 + timedelta(hours=4)).isoformat(),
+        },
+    )
+    assert [s["transaction_id"] for s in result["sessions"]] == ["2", "1"]
+    result = await host.async_call_service(service, {"group_by": "cpid"})
+    assert [(t["cpid"], t["sessions"]) for t in result["totals"]] == [
+        ("ledger_cpid", 5),
+        ("old_cpid", 1),
+    ]
@@ -38,6 +38,8 @@ def cp_v16():
     cp._ocpp_version = "1.6"
     cp.active_transaction_id = 0
     cp._active_tx = {}
+    cp._accepted_profiles = {}
+    cp._rate_settings = None
     # set_charge_rate calls these (we’ll monkeypatch per-test):
     # - cp.get_configuration(key)
     # - cp.call(req)
@@ -53,7 +55,7 @@ async def test_custom_profile_path_exception_triggers_notify_and_returns_false(
     # notify capture
     notices = []
 
-    async def fake_notify(msg, title="Ocpp integration"):
+    async def fake_notify(msg, title="Ocpp integration", immediate=False):
         notices.append(msg)
         return True
 
@@ -94,7 +96,7 @@ async def test_smart_charging_not_supported_returns_false_no_notify(
 
     notices = []
 
-    async def fake_notify(msg, title="Ocpp integration"):
+    async def fake_notify(msg, title="Ocpp integration", immediate=False):
         notices.append(msg)
         return True
 
@@ -139,7 +141,7 @@ async def test_cpmax_exception_falls_back_to_txdefault_accepted_returns_true(
 
     notices = []
 
-    async def fake_notify(msg, title="Ocpp integration"):
+    async def fake_notify(msg, title="Ocpp integration", immediate=False):
         notices.append(msg)
         return True
 
@@ -174,7 +176,7 @@ async def test_cpmax_rejected_txdefault_accepted_returns_true(cp_v16, monkeypatc
 
     notices = []
 
-    async def fake_notify(msg, title="Ocpp integration"):
+    async def fake_notify(msg, title="Ocpp integration", immediate=False):
         notices.append(msg)
         return True
 
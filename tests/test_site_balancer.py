@@ -0,0 +1,273 @@
+"""Test site level load balancing."""
+
+import asyncio
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.balancer import SiteLoadBalancer
+from custom_components.ocpp.chargepoint import MeasurandValue
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CONF_SITE_MAX_CURRENT,
+    CentralSystemSettings,
+    ChargerSystemSettings,
+)
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv16 import ChargePoint as ChargePointv16
+
+from .const import MOCK_CONFIG_DATA
+
+
+class FakeCharger:
+    """Charger recording the limits pushed to it."""
+
+    def __init__(self, id, max_current=32, ok=True, log=None):
+        """Initialize."""
+        self.id = id
+        self.settings = SimpleNamespace(max_current=max_current)
+        self.pushed = []
+        self.ok = ok
+        self.log = log if log is not None else []
+
+    async def request_charge_rate(self, limit_amps, conn_id):
+        """Record the limit."""
+        self.log.append(("start", self.id, limit_amps))
+        await asyncio.sleep(0.01)
+        self.log.append(("end", self.id, limit_amps))
+        self.pushed.append(limit_amps)
+        if isinstance(self.ok, Exception):
+            raise self.ok
+        return self.ok
+
+
+async def _settle(host):
+    while host._tasks:
+        await asyncio.gather(*host._tasks)
+
+
+async def test_fair_share_and_redistribution():
+    """Test the limit is shared and unused current goes to other chargers."""
+    host = StandaloneHost()
+    balancer = SiteLoadBalancer(host, 40)
+    a, b, c = FakeCharger("a"), FakeCharger("b"), FakeCharger("c", max_current=10)
+
+    balancer.session_started(a, 1)
+    await _settle(host)
+    assert balancer.limits == {"a": 32.0}
+
+    balancer.session_started(b, 1)
+    await _settle(host)
+    assert balancer.limits == {"a": 20.0, "b": 20.0}
+    assert a.pushed == [32.0, 20.0]
+
+    # c cannot use its share, what it leaves goes to a and b
+    balancer.session_started(c, 1)
+    await _settle(host)
+    assert balancer.limits == {"a": 15.0, "b": 15.0, "c": 10.0}
+
+    # b is limited by the vehicle and left some headroom
+    balancer.update_current(b, 1, 4.0)
+    await _settle(host)
+    assert balancer.limits == {"a": 24.0, "b": 6.0, "c": 10.0}
+    # and stays limited while it draws less than its limit
+    balancer.update_current(b, 1, 4.5)
+    await _settle(host)
+    assert b.pushed == [20.0, 15.0, 6.0]
+
+    balancer.session_stopped(c, 1)
+    await _settle(host)
+    assert balancer.limits == {"a": 32.0, "b": 6.0}
+    assert c.pushed == [10.0]
+    assert not balancer.is_active("c")
+
+
+async def test_deadband_and_changed_limits_only():
+    """Test small changes neither rebalance nor push."""
+    host = StandaloneHost()
+    balancer = SiteLoadBalancer(host, 64, deadband=1.0)
+    a, b = FakeCharger("a"), FakeCharger("b")
+    balancer.session_started(a, 1)
+    balancer.session_started(b, 1)
+    await _settle(host)
+    assert a.pushed == [32.0] and b.pushed == [32.0]
+
+    balancer.update_current(a, 1, 31.5)
+    balancer.update_current(b, 1, 31.0)
+    await _settle(host)
+    balancer.update_current(a, 1, 31.0)
+    assert not host._tasks
+    # rebalanced, but nothing changed
+    assert a.pushed == [32.0] and b.pushed == [32.0]
+
+    # measured current of chargers without a session is only kept
+    other = FakeCharger("other")
+    balancer.update_current(other, 1, 10.0)
+    assert not host._tasks
+
+
+async def test_decreases_first_with_bounded_parallelism():
+    """Test lower limits are pushed before higher ones, max_parallel at a time."""
+    host = StandaloneHost()
+    balancer = SiteLoadBalancer(host, 60, max_parallel=2)
+    log = []
+    chargers = [FakeCharger(f"cp{n}", log=log) for n in range(4)]
+    for charger in chargers:
+        balancer.session_started(charger, 1)
+    await _settle(host)
+    assert balancer.limits == dict.fromkeys(("cp0", "cp1", "cp2", "cp3"), 15.0)
+    in_flight = peak = 0
+    for event, _, _ in log:
+        in_flight += 1 if event == "start" else -1
+        peak = max(peak, in_flight)
+    assert peak == 2
+    assert len(log) == 8
+
+    # cp3 needs less, cp0 to cp2 get more once cp3 was lowered
+    log.clear()
+    balancer.update_current(chargers[3], 1, 3.0)
+    await _settle(host)
+    assert log[:2] == [("start", "cp3", 5.0), ("end", "cp3", 5.0)]
+    assert balancer.limits == {"cp0": 18.3, "cp1": 18.3, "cp2": 18.4, "cp3": 5.0}
+
+    # drawing close to its limit again gives it a full share
+    balancer.update_current(chargers[3], 1, 4.5)
+    await _settle(host)
+    assert balancer.limits["cp3"] == 15.0
+
+
+async def test_failed_push_is_retried_and_caps():
+    """Test a rejected limit is pushed again and caps limit the share."""
+    host = StandaloneHost()
+    balancer = SiteLoadBalancer(host, 40)
+    a, b = FakeCharger("a", ok=False), FakeCharger("b", ok=RuntimeError("offline"))
+    balancer.session_started(a, 1)
+    balancer.session_started(b, 1)
+    await _settle(host)
+    assert balancer.limits == {}
+
+    a.ok, b.ok = True, None  # OCPP 2.0.1 returns None when accepted
+    balancer.set_cap("a", 10)
+    await _settle(host)
+    assert balancer.limits == {"a": 10.0, "b": 30.0}
+
+    balancer.set_cap("idle", 6)
+    assert not host._tasks
+
+
+def _mk_cp(host):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="site_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(state=State.CLOSED, close=lambda: asyncio.sleep(0))
+    return ChargePointv16("CP_site", conn, host, HostEntry("e1"), central, charger)
+
+
+async def test_central_system_balances_chargers():
+    """Test sessions, meter values and sliders of a charger reach the balancer."""
+    host = StandaloneHost()
+    entry = HostEntry(
+        "site",
+        {
+            **MOCK_CONFIG_DATA,
+            CONF_CSID: "site",
+            CONF_CPIDS: [],
+            CONF_SITE_MAX_CURRENT: 16,
+        },
+    )
+    cs = CentralSystem(None, entry, host)
+    assert cs.balancer.site_limit == 16.0
+    cp = _mk_cp(host)
+    cp.balancer = cs.balancer
+    cs.charge_points[cp.id] = cp
+    cs.cpids[cp.settings.cpid] = cp.id
+    pushed = []
+
+    async def set_charge_rate(limit_amps=None, conn_id=0, **kwargs):
+        pushed.append(limit_amps)
+        return True
+
+    cp.set_charge_rate = set_charge_rate
+
+    # without a session the slider sets the limit directly
+    assert await cs.set_max_charge_rate_amps("site_cpid", 20)
+    assert pushed == [20]
+
+    result = await cp.on_start_transaction(connector_id=1, id_tag="tag", meter_start=0)
+    await _settle(host)
+    assert pushed == [20, 16.0]
+
+    # while charging the slider caps the share of the charger
+    assert await cs.set_max_charge_rate_amps("site_cpid", 10)
+    await _settle(host)
+    assert pushed == [20, 16.0, 10.0]
+
+    cp.process_measurands(
+        [[MeasurandValue("Current.Import", 3.0, None, "A", None, None)]], True, 1
+    )
+    await _settle(host)
+    assert pushed == [20, 16.0, 10.0, 5.0]
+
+    cp.on_stop_transaction(
+        meter_stop=1000, timestamp=None, transaction_id=result.transaction_id
+    )
+    await _settle(host)
+    assert cs.balancer.limits == {}
+
+
+async def test_site_limits_queued_with_other_requests():
+    """Test a site limit and a service call on one charger are sent in turn."""
+    host = StandaloneHost()
+    balancer = SiteLoadBalancer(host, 16)
+    cp = _mk_cp(host)
+    sent = []
+    release = asyncio.Event()
+
+    async def set_charge_rate(limit_amps=None, conn_id=0, **kwargs):
+        sent.append(limit_amps)
+        await release.wait()
+        return True
+
+    cp.set_charge_rate = set_charge_rate
+
+    balancer.session_started(cp, 1)
+    await asyncio.sleep(0.01)
+    service = asyncio.create_task(cp.request_charge_rate(limit_amps=10, conn_id=0))
+    await asyncio.sleep(0.01)
+    # the service call waits for the site limit in flight
+    assert sent == [16.0]
+
+    release.set()
+    assert await service is True
+    await _settle(host)
+    assert sent == [16.0, 10]
+    assert balancer.limits == {"CP_site": 16.0}
+
+
+async def test_balancing_disabled_by_default():
+    """Test no balancer is created without a site limit."""
+    host = StandaloneHost()
+    entry = HostEntry("nosite", {**MOCK_CONFIG_DATA, CONF_CSID: "ns", CONF_CPIDS: []})
+    cs = CentralSystem(None, entry, host)
+    assert cs.balancer is None
@@ -0,0 +1,157 @@
+"""Benchmark setting up the integration with many chargers and writing states.
+
+The timings are logged. The large cases only run with --benchmark, e.g.
+pytest tests/test_startup_benchmark.py --benchmark --log-cli-level=INFO -o addopts="--allow-unix-socket --allow-hosts=127.0.0.1"
+"""
+
+import asyncio
+import logging
+import time
+
+import pytest
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import async_get_platforms
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.ocpp.const import CONF_NUM_CONNECTORS, DOMAIN as OCPP_DOMAIN
+from custom_components.ocpp.sensor import SENSOR_CLASSES
+
+from .charge_point_test import create_configuration, remove_configuration
+from .const import (
+    CONF_CPID,
+    CONF_CPIDS,
+    CONF_PORT,
+    MOCK_CONFIG_CP_APPEND,
+    MOCK_CONFIG_DATA,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Measure the longest time the event loop was blocked."""
+
+    def __init__(self):
+        """Initialize."""
+        self.max_block = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t = loop.time()
+            await asyncio.sleep(0)
+            self.max_block = max(self.max_block, loop.time() - t)
+
+    def __enter__(self):
+        """Start measuring."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        """Stop measuring."""
+        self._task.cancel()
+
+
+@pytest.mark.parametrize(
+    ("chargers", "port"),
+    [
+        (1, 9425),
+        pytest.param(50, 9427, marks=pytest.mark.benchmark),
+        pytest.param(500, 9428, marks=pytest.mark.benchmark),
+    ],
+)
+async def test_startup(hass, socket_enabled, chargers, port):
+    """Measure the setup time and the longest event loop block."""
+    data = {
+        **MOCK_CONFIG_DATA,
+        CONF_PORT: port,
+        CONF_CPIDS: [
+            {
+                f"CP_bench_{n}": {
+                    **MOCK_CONFIG_CP_APPEND,
+                    CONF_CPID: f"bench_{n}",
+                    # every other charger has two connectors
+                    CONF_NUM_CONNECTORS: 1 + n % 2,
+                }
+            }
+            for n in range(chargers)
+        ],
+    }
+    entry = MockConfigEntry(
+        domain=OCPP_DOMAIN,
+        data=data,
+        entry_id=f"bench_{chargers}",
+        title="bench",
+        version=2,
+        minor_version=0,
+    )
+
+    with LoopMonitor() as monitor:
+        start = time.perf_counter()
+        await create_configuration(hass, entry)
+        elapsed = time.perf_counter() - start
+    entities = len(hass.states.async_all())
+    _LOGGER.info(
+        "%d chargers: setup %.2f s, %d entities, %.1f ms per charger, "
+        "event loop blocked up to %.0f ms",
+        chargers,
+        elapsed,
+        entities,
+        elapsed / chargers * 1000,
+        monitor.max_block * 1000,
+    )
+    assert entry.state is ConfigEntryState.LOADED
+    # sensors are added once the charger reports a value
+    assert hass.states.get(f"sensor.bench_{chargers - 1}_status") is None
+
+    await remove_configuration(hass, entry)
+
+
+async def test_state_write(hass, socket_enabled):
+    """Measure the cost of writing the state of every sensor of a charger."""
+    data = {
+        **MOCK_CONFIG_DATA,
+        CONF_PORT: 9429,
+        CONF_CPIDS: [{"CP_write": {**MOCK_CONFIG_CP_APPEND, CONF_CPID: "write"}}],
+    }
+    entry = MockConfigEntry(
+        domain=OCPP_DOMAIN,
+        data=data,
+        entry_id="bench_write",
+        title="bench",
+        version=2,
+        minor_version=0,
+    )
+    # sensors added before are set up without waiting for a value
+    ent_reg = er.async_get(hass)
+    for metric in SENSOR_CLASSES:
+        ent_reg.async_get_or_create(
+            SENSOR_DOMAIN,
+            OCPP_DOMAIN,
+            f"{OCPP_DOMAIN}.write.{metric.lower()}.{SENSOR_DOMAIN}",
+        )
+    await create_configuration(hass, entry)
+    sensors = [
+        entity
+        for platform in async_get_platforms(hass, OCPP_DOMAIN)
+        if platform.domain == "sensor"
+        for entity in platform.entities.values()
+    ]
+    assert sensors
+
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for entity in sensors:
+            entity.async_write_ha_state()
+    elapsed = time.perf_counter() - start
+    _LOGGER.info(
+        "%d sensors: %.1f us per state write",
+        len(sensors),
+        elapsed / (rounds * len(sensors)) * 1e6,
+    )
+
+    await remove_configuration(hass, entry)
@@ -0,0 +1,121 @@
+"""Test reloading the TLS certificate without restarting the listener."""
+
+import asyncio
+import contextlib
+from datetime import datetime, timedelta, UTC
+import ssl
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+import pytest
+import websockets
+from websockets.protocol import State
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CONF_PORT,
+    CONF_SSL,
+    CONF_SSL_CERTFILE_PATH,
+    CONF_SSL_KEYFILE_PATH,
+)
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+
+from .const import MOCK_CONFIG_CP_APPEND, MOCK_CONFIG_DATA
+
+
+def _write_certificate(certfile, keyfile, name: str) -> bytes:
+    """Write a self signed certificate and its key, return the certificate."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)])
+    now = datetime.now(tz=UTC)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    keyfile.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    certfile.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    return cert.public_bytes(serialization.Encoding.DER)
+
+
+def _peer_certificate(ws) -> bytes:
+    return ws.transport.get_extra_info("ssl_object").getpeercert(binary_form=True)
+
+
+@pytest.mark.timeout(20)
+async def test_certificate_reloaded_for_new_connections(socket_enabled, tmp_path):
+    """Test new handshakes use a renewed certificate and old connections stay."""
+    port = 9430
+    cp_id = "CP_tls"
+    certfile, keyfile = tmp_path / "fullchain.pem", tmp_path / "privkey.pem"
+    first = _write_certificate(certfile, keyfile, "first")
+    entry = HostEntry(
+        "tls",
+        {
+            **MOCK_CONFIG_DATA,
+            CONF_CSID: "tls",
+            CONF_PORT: port,
+            CONF_SSL: True,
+            CONF_SSL_CERTFILE_PATH: str(certfile),
+            CONF_SSL_KEYFILE_PATH: str(keyfile),
+            CONF_CPIDS: [{cp_id: {**MOCK_CONFIG_CP_APPEND, "cpid": "tls_cpid"}}],
+        },
+    )
+    client_ssl = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client_ssl.check_hostname = False
+    client_ssl.verify_mode = ssl.CERT_NONE
+    url = f"wss://127.0.0.1:{port}/{cp_id}"
+
+    host = StandaloneHost()
+    cs = await CentralSystem.create(None, entry, host)
+    try:
+        assert not await cs.async_reload_tls()
+        async with websockets.connect(
+            url, subprotocols=["ocpp1.6"], ssl=client_ssl
+        ) as ws:
+            assert _peer_certificate(ws) == first
+
+            second = _write_certificate(certfile, keyfile, "second")
+            assert await cs.async_reload_tls()
+            assert not await cs.async_reload_tls()
+            # another charger, the same one connecting again replaces the first
+            async with websockets.connect(
+                f"wss://127.0.0.1:{port}/CP_other",
+                subprotocols=["ocpp1.6"],
+                ssl=client_ssl,
+            ) as renewed:
+                assert _peer_certificate(renewed) == second
+
+            # the connection opened before the reload is still usable
+            assert ws.state is State.OPEN
+            await asyncio.wait_for(await ws.ping(), 5)
+
+        # a file being replaced is skipped, the loaded certificate is kept
+        certfile.write_text("renewal in progress")
+        assert not await cs.async_reload_tls()
+        async with websockets.connect(
+            url, subprotocols=["ocpp1.6"], ssl=client_ssl
+        ) as ws:
+            assert _peer_certificate(ws) == second
+    finally:
+        await cs.async_stop()
+        for task in list(host._tasks):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    assert cs._tls_watcher.cancelled()
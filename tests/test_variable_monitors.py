@@ -0,0 +1,153 @@
+"""Test OCPP 2.0.1 variable monitors and the events they push."""
+
+import asyncio
+from types import SimpleNamespace
+
+from websockets.protocol import State
+
+from ocpp.v201 import call, call_result
+
+from custom_components.ocpp.const import CentralSystemSettings, ChargerSystemSettings
+from custom_components.ocpp.enums import HAChargerStatuses as cstat
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+from custom_components.ocpp.ocppv201 import ChargePoint as ChargePointv201
+from custom_components.ocpp.ocppv201 import InventoryReport
+
+
+def _mk_cp(host, statuses):
+    central = CentralSystemSettings(
+        csid="cs",
+        host="127.0.0.1",
+        port=9999,
+        ssl=False,
+        ssl_certfile_path="",
+        ssl_keyfile_path="",
+        websocket_close_timeout=1,
+        websocket_ping_interval=0.1,
+        websocket_ping_timeout=0.1,
+        websocket_ping_tries=0,
+    )
+    charger = ChargerSystemSettings(
+        cpid="monitor_cpid",
+        max_current=32,
+        idle_interval=60,
+        meter_interval=60,
+        monitored_variables="",
+        monitored_variables_autoconfig=False,
+        skip_schema_validation=False,
+        force_smart_charging=False,
+    )
+    conn = SimpleNamespace(
+        state=State.CLOSED, subprotocol="ocpp2.0.1", close=lambda: asyncio.sleep(0)
+    )
+    cp = ChargePointv201("CP_monitor", conn, host, HostEntry("e1"), central, charger)
+    cp._inventory = InventoryReport(evse_count=2, connector_count=[1, 1])
+    cp._build_connector_map()
+    cp._fingerprint = "ACME|Wall|SN1|1.0"
+    cp.sent = []
+
+    async def fake_call(req, *args, **kwargs):
+        assert isinstance(req, call.SetVariableMonitoring)
+        cp.sent.append(req.set_monitoring_data)
+        return call_result.SetVariableMonitoring(
+            [
+                {"status": status, "id": 10 * len(cp.sent) + n}
+                for n, status in enumerate(statuses.pop(0))
+            ]
+        )
+
+    cp.call = fake_call
+    return cp
+
+
+async def test_monitors_installed_and_replaced(tmp_path):
+    """Test monitors are set once per EVSE and replaced after a restart."""
+    host = StandaloneHost(storage_dir=str(tmp_path))
+    cp = _mk_cp(host, [["Accepted", "Accepted", "UnknownVariable"]])
+    await cp.set_monitoring()
+    assert cp.sent == [
+        [
+            {
+                "value": 0,
+                "type": "Delta",
+                "severity": 7,
+                "component": {"name": "ChargingStation"},
+                "variable": {"name": "Problem"},
+            },
+            {
+                "value": 100,
+                "type": "Delta",
+                "severity": 8,
+                "component": {"name": "EVSE", "evse": {"id": 1}},
+                "variable": {"name": "Power"},
+            },
+            {
+                "value": 100,
+                "type": "Delta",
+                "severity": 8,
+                "component": {"name": "EVSE", "evse": {"id": 2}},
+                "variable": {"name": "Power"},
+            },
+        ]
+    ]
+    assert cp._monitor_ids == {"ChargingStation/Problem": 10, "EVSE(1)/Power": 11}
+
+    # a restart replaces the monitors it set, a stale id is set again without
+    restarted = _mk_cp(host, [["Duplicate", "Rejected", "Accepted"], ["Accepted"]])
+    restarted._inventory = None
+    assert await restarted._load_inventory() is not None
+    restarted._inventory = cp._inventory
+    await restarted.set_monitoring()
+    assert [d.get("id") for d in restarted.sent[0]] == [10, 11, None]
+    assert restarted.sent[1] == [cp.sent[0][1]]
+    assert restarted._monitor_ids == {
+        "ChargingStation/Problem": 10,
+        "EVSE(1)/Power": 20,
+        "EVSE(2)/Power": 12,
+    }
+
+
+async def test_events_update_metrics():
+    """Test pushed events update the metrics and the device model."""
+    host = StandaloneHost()
+    cp = _mk_cp(host, [])
+
+    def event(component, variable, value, **kwargs):
+        return {
+            "event_id": 1,
+            "timestamp": "2025-01-01T00:00:00Z",
+            "trigger": "Delta",
+            "actual_value": value,
+            "event_notification_type": "CustomMonitor",
+            "component": component,
+            "variable": {"name": variable},
+            **kwargs,
+        }
+
+    cp.on_notify_event(
+        generated_at="2025-01-01T00:00:00Z",
+        seq_no=0,
+        event_data=[
+            event({"name": "EVSE", "evse": {"id": 2}}, "Power", "7400"),
+            event({"name": "ChargingStation"}, "Problem", "true", tech_code="E42"),
+            event({"name": "EVSE", "evse": {"id": 1}}, "Power", "n/a"),
+        ],
+    )
+    assert cp._metrics[(2, "Power.Active.Import")].value == 7.4
+    assert cp._metrics[(2, "Power.Active.Import")].unit == "kW"
+    assert cp._metrics[(0, cstat.error_code.value)].value == "E42"
+    assert cp.device_model.get({"name": "ChargingStation"}, {"name": "Problem"}) == (
+        "true"
+    )
+    assert len(host._tasks) == 1
+
+    cp.on_notify_event(
+        generated_at="2025-01-01T00:00:01Z",
+        seq_no=1,
+        event_data=[
+            event({"name": "ChargingStation"}, "Problem", "false", cleared=True),
+            event({"name": "Other"}, "Variable", "1"),
+        ],
+    )
+    assert cp._metrics[(0, cstat.error_code.value)].value == "NoError"
+    await asyncio.gather(*host._tasks, return_exceptions=True)
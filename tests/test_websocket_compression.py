@@ -0,0 +1,146 @@
+"""Test websocket compression, frame size limits and traffic accounting."""
+
+import asyncio
+import contextlib
+
+import pytest
+import websockets
+
+from ocpp.v16 import call
+
+from custom_components.ocpp.api import CentralSystem
+from custom_components.ocpp.const import (
+    CONF_CPIDS,
+    CONF_CSID,
+    CONF_PORT,
+    CONF_WEBSOCKET_COMPRESSION,
+    CONF_WEBSOCKET_COMPRESSION_OVERRIDE,
+    CONF_WEBSOCKET_MAX_SIZE,
+)
+from custom_components.ocpp.enums import HAChargerStatuses as cstat
+from custom_components.ocpp.host import HostEntry, StandaloneHost
+
+from .charge_point_test import wait_ready
+from .const import MOCK_CONFIG_CP_APPEND, MOCK_CONFIG_DATA
+from .test_charge_point_v16 import ChargePoint
+
+
+async def _create_cs(port: int, compression: bool, cpids: dict, **extra):
+    entry = HostEntry(
+        f"ws_{port}",
+        {
+            **MOCK_CONFIG_DATA,
+            CONF_CSID: f"ws_{port}",
+            CONF_PORT: port,
+            CONF_WEBSOCKET_COMPRESSION: compression,
+            CONF_CPIDS: [
+                {cp_id: {**MOCK_CONFIG_CP_APPEND, "cpid": cp_id.lower(), **cfg}}
+                for cp_id, cfg in cpids.items()
+            ],
+            **extra,
+        },
+    )
+    return await CentralSystem.create(None, entry, StandaloneHost())
+
+
+async def _negotiated_extensions(port: int, cp_id: str) -> str | None:
+    async with websockets.connect(
+        f"ws://127.0.0.1:{port}/{cp_id}", subprotocols=["ocpp1.6"]
+    ) as ws:
+        return ws.response.headers.get("Sec-WebSocket-Extensions")
+
+
+@pytest.mark.timeout(20)
+async def test_compression_override_per_charger(socket_enabled):
+    """Test chargers can override the central compression setting."""
+    port = 9421
+    cs = await _create_cs(
+        port,
+        True,
+        {
+            "CP_default": {},
+            "CP_off": {CONF_WEBSOCKET_COMPRESSION_OVERRIDE: "off"},
+        },
+    )
+    try:
+        assert "permessage-deflate" in await _negotiated_extensions(port, "CP_default")
+        assert await _negotiated_extensions(port, "CP_off") is None
+    finally:
+        await cs.async_stop()
+
+    cs = await _create_cs(
+        port,
+        False,
+        {
+            "CP_default": {},
+            "CP_on": {CONF_WEBSOCKET_COMPRESSION_OVERRIDE: "on"},
+        },
+    )
+    try:
+        assert await _negotiated_extensions(port, "CP_default") is None
+        assert "permessage-deflate" in await _negotiated_extensions(port, "CP_on")
+    finally:
+        await cs.async_stop()
+
+
+@pytest.mark.timeout(20)
+async def test_max_size_closes_connection(socket_enabled):
+    """Test messages above the configured size close the connection."""
+    port = 9422
+    cs = await _create_cs(port, True, {"CP_small": {}}, **{CONF_WEBSOCKET_MAX_SIZE: 64})
+    try:
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}/CP_small", subprotocols=["ocpp1.6"]
+        ) as ws:
+            await ws.send('[2,"1","DataTransfer",{"vendorId":"' + "x" * 200 + '"}]')
+            with pytest.raises(websockets.exceptions.ConnectionClosed) as exc:
+                await ws.recv()
+            assert exc.value.rcvd.code == 1009
+    finally:
+        await cs.async_stop()
+
+
+@pytest.mark.timeout(20)
+async def test_traffic_counters(socket_enabled):
+    """Test raw and wire bytes are counted per charger."""
+    port = 9423
+    cp_id = "CP_traffic"
+    cs = await _create_cs(port, True, {cp_id: {}})
+    try:
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}/{cp_id}", subprotocols=["ocpp1.6"]
+        ) as ws:
+            client = ChargePoint(f"{cp_id}_client", ws)
+            task = asyncio.create_task(client.start())
+            try:
+                await client.send_boot_notification()
+                srv = cs.charge_points[cp_id]
+                await wait_ready(srv)
+                before = srv._traffic.received_raw
+                await client.call(
+                    call.DataTransfer(vendor_id="test", data="abcd" * 500)
+                )
+                await srv.update(srv.settings.cpid)
+            finally:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+
+        # post connect requests may still be sent after the update above
+        await srv.update(srv.settings.cpid)
+        traffic = srv._traffic
+        assert traffic.compressed
+        assert traffic.received_raw - before > 2000
+        assert traffic.received_wire < traffic.received_raw
+        assert 0 < traffic.sent_wire <= traffic.sent_raw
+
+        received = srv._metrics[(0, cstat.traffic_received.value)]
+        assert received.value == traffic.received_wire
+        assert received.unit == "B"
+        assert received.extra_attr["raw_bytes"] == traffic.received_raw
+        assert received.extra_attr["compressed"] is True
+        assert received.extra_attr["compression_ratio"] < 1
+        sent = srv._metrics[(0, cstat.traffic_sent.value)]
+        assert sent.value == traffic.sent_wire
+    finally:
+        await cs.async_stop()